@@ -0,0 +1,132 @@
+"""Time and peak memory of native-PDF layout extraction.
+
+Builds a large native PDF by repeating the pages of data/raw/*.pdf with a
+text layer, then runs each variant in a fresh process:
+
+- ``legacy``: the original loop, "dict" extraction for every page with all
+  blocks accumulated in one list
+- ``list``: detect_layout_elements (blocks extraction, still a list)
+- ``stream``: iter_layout_elements consumed page by page
+- ``stream_spans``: iter_layout_elements with span detail ("dict" extraction)
+
+and reports elements, seconds, pages/sec and peak RSS growth during the
+run (sampled every 10 ms, so import-time peaks do not mask it).
+
+On a 1000-page copy of data/raw (35k blocks, 130 MB), 4-core Linux VM:
+
+    legacy         32.6 s   31 pages/s   peak RSS +573 MB
+    list           10.0 s  100 pages/s   peak RSS +463 MB
+    stream         10.0 s  100 pages/s   peak RSS +453 MB
+    stream_spans   16.3 s   61 pages/s   peak RSS +444 MB
+
+Most of the remaining RSS is MuPDF's resource store (fonts, decoded
+images), which MuPDF caps on its own; "dict" extraction also copied every
+image's bytes. Streaming keeps the Python side to one page of elements.
+
+Usage:
+    python benchmarks/layout.py --input data/raw --pages 1000
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from pipeline.executor import rss_mb  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+VARIANTS = ('legacy', 'list', 'stream', 'stream_spans')
+
+
+def legacy_layout(pdf_path: str) -> list:
+    """The original _process_pymupdf_layout"""
+    elements = []
+    doc = fitz.open(pdf_path)
+    for page in doc:
+        blocks = page.get_text("dict").get("blocks", [])
+        for block in blocks:
+            elements.append({
+                "type": "text" if block["type"] == 0 else "image",
+                "bbox": block["bbox"],
+                "text": block.get("text", "")
+            })
+    return elements
+
+
+def run_variant(variant: str, pdf_path: str) -> dict:
+    from extraction.layout_analysis import detect_layout_elements, iter_layout_elements
+
+    base_rss = rss_mb(os.getpid())
+    peak = [base_rss]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(0.01):
+            peak[0] = max(peak[0], rss_mb(os.getpid()) or 0.0)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    if variant == 'legacy':
+        count = len(legacy_layout(pdf_path))
+    elif variant == 'list':
+        count = len(detect_layout_elements(pdf_path))
+    elif variant == 'stream':
+        count = sum(1 for _ in iter_layout_elements(pdf_path))
+    else:
+        count = sum(1 for _ in iter_layout_elements(pdf_path, fields=('type', 'bbox', 'text', 'spans')))
+    seconds = time.perf_counter() - start
+    done.set()
+    sampler.join()
+    return {'elements': count, 'seconds': seconds, 'rss_growth_mb': peak[0] - base_rss}
+
+
+def build_document(input_dir: Path, pages: int, path: Path) -> None:
+    sources = []
+    for pdf_path in sorted(input_dir.glob("*.pdf")):
+        with fitz.open(pdf_path) as doc:
+            if any(len(page.get_text("text").strip()) > 50 for page in doc):
+                sources.append(pdf_path)
+    if not sources:
+        raise SystemExit(f"No PDFs with a text layer in {input_dir}")
+    with fitz.open() as out:
+        while out.page_count < pages:
+            for pdf_path in sources:
+                with fitz.open(pdf_path) as src:
+                    out.insert_pdf(src, to_page=min(src.page_count, pages - out.page_count) - 1)
+                if out.page_count >= pages:
+                    break
+        out.save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark layout extraction")
+    parser.add_argument('--input', default='data/raw', help="Directory of PDFs")
+    parser.add_argument('--pages', type=int, default=1000)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / f"layout_{args.pages}.pdf"
+        build_document(Path(args.input), args.pages, pdf_path)
+        logger.info(f"{args.pages} pages, {pdf_path.stat().st_size / (1024 * 1024):.1f} MB")
+        for variant in VARIANTS:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(run_variant, (variant, str(pdf_path)))
+            logger.info(
+                f"{variant:13s} {result['elements']:8d} elements  {result['seconds']:7.2f} s  "
+                f"{args.pages / result['seconds']:8.1f} pages/s  peak RSS +{result['rss_growth_mb']:.0f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare the in-process tesserocr backend with pytesseract on data/raw.
+
+Each page of every PDF is rendered once to a grayscale array, then OCR'd
+by every available backend. Reports seconds/page and pages/sec per backend
+and how closely the outputs agree.
+
+Usage:
+    python benchmarks/ocr_backends.py --input data/raw --dpi 300 --max-pages 20
+"""
+import argparse
+import difflib
+import logging
+import sys
+import time
+from pathlib import Path
+
+import fitz
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from extraction.ocr_engines import PytesseractBackend, TesserocrBackend  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+
+def render_pages(input_dir: Path, dpi: int, max_pages: int) -> list:
+    """Render up to max_pages grayscale pages from the PDFs in input_dir"""
+    pages = []
+    for pdf_path in sorted(input_dir.glob("*.pdf")):
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                if len(pages) >= max_pages:
+                    return pages
+                pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+                image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+                pages.append((f"{pdf_path.name}:{page.number + 1}", image[:, :pix.width].copy()))
+    return pages
+
+
+def run_backend(backend, pages: list, repeat: int) -> dict:
+    texts = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name, image in pages:
+            texts[name] = backend.image_to_string(image, psm=6)
+    elapsed = time.perf_counter() - start
+    count = len(pages) * repeat
+    return {
+        'texts': texts,
+        'seconds_per_page': elapsed / count if count else 0.0,
+        'pages_per_sec': count / elapsed if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Tesseract OCR backends")
+    parser.add_argument('--input', default='data/raw', help="Directory of PDFs")
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--max-pages', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    pages = render_pages(Path(args.input), args.dpi, args.max_pages)
+    if not pages:
+        logger.error(f"No PDF pages found in {args.input}")
+        sys.exit(1)
+    logger.info(f"Rendered {len(pages)} pages at {args.dpi} DPI")
+
+    results = {}
+    for backend_cls in (PytesseractBackend, TesserocrBackend):
+        try:
+            backend = backend_cls()
+            # One warm-up page so traineddata loading is not counted for tesserocr
+            backend.image_to_string(pages[0][1], psm=6)
+        except Exception as e:
+            logger.warning(f"{backend_cls.name}: unavailable ({str(e)})")
+            continue
+        results[backend.name] = run_backend(backend, pages, args.repeat)
+        logger.info(
+            f"{backend.name:12s} {results[backend.name]['seconds_per_page']:.3f} s/page  "
+            f"{results[backend.name]['pages_per_sec']:.2f} pages/s"
+        )
+
+    if len(results) == 2:
+        base, fast = results['pytesseract'], results['tesserocr']
+        agreement = [
+            difflib.SequenceMatcher(None, base['texts'][name], fast['texts'][name]).ratio()
+            for name, _ in pages
+        ]
+        logger.info(f"Speedup: {base['seconds_per_page'] / fast['seconds_per_page']:.2f}x")
+        logger.info(f"Text agreement: mean {np.mean(agreement):.3f}, min {min(agreement):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Reproducible benchmark suite with a JSON baseline and regression thresholds.
+
+Cases:
+
+- ``native``: TextExtractor.extract on documents whose pages all have a text layer
+- ``ocr``: TextExtractor with force_ocr and the Tesseract engine on scanned documents
+- ``hybrid``: as ``ocr`` with the hybrid Tesseract + EasyOCR engine
+- ``cleaner``: TextCleaner.clean on the extracted text
+- ``tables``: table_handling.extract_page_tables on the native pages
+
+The corpus is data/raw/*.pdf plus a synthetic scaled corpus built from it:
+native pages repeated to --scale pages, and the same pages rasterised into
+image-only "scans". Each case runs --repeat times in a fresh process, so
+peak RSS is per case; the median run is reported with pages/sec (MB/s for
+the cleaner) and per-stage times from the extractor.
+
+Cases that need a missing engine (Tesseract, EasyOCR) are reported as
+skipped. With --save-baseline the results are written to --baseline;
+otherwise they are compared with it and the suite exits with status 1 if
+any case's throughput drops by more than --threshold or its peak RSS
+grows by more than --rss-threshold.
+
+Usage:
+    python benchmarks/suite.py --save-baseline
+    python benchmarks/suite.py --threshold 0.15
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+import numpy as np
+import yaml
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+CASES = ('native', 'ocr', 'hybrid', 'cleaner', 'tables')
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+
+
+def build_corpus(input_dir: Path, out_dir: Path, scale: int, config: dict) -> dict:
+    """Sort data/raw into native/scanned groups and add the synthetic documents"""
+    from extraction.text_extraction import TextExtractor
+
+    extractor = TextExtractor(config)
+    corpus = {'native': [], 'scanned': []}
+    native_pages = []
+    for pdf_path in sorted(input_dir.glob("*.pdf")):
+        pages, _ = extractor._classify_pages(str(pdf_path))
+        group = 'native' if all(p['route'] == 'native' for p in pages) else 'scanned'
+        corpus[group].append(str(pdf_path))
+        if group == 'native':
+            native_pages.append(str(pdf_path))
+
+    if native_pages and scale > 0:
+        with fitz.open() as scaled:
+            while scaled.page_count < scale:
+                for pdf_path in native_pages:
+                    with fitz.open(pdf_path) as src:
+                        scaled.insert_pdf(src, to_page=min(src.page_count, scale - scaled.page_count) - 1)
+                    if scaled.page_count >= scale:
+                        break
+            scaled_path = out_dir / f"synthetic_native_{scale}.pdf"
+            scaled.save(scaled_path)
+        corpus['native'].append(str(scaled_path))
+
+        # Image-only copies of the first pages: OCR ground truth from a known text layer
+        scan_pages = max(1, scale // 10)
+        with fitz.open(scaled_path) as src, fitz.open() as scan:
+            for page in src.pages(0, min(scan_pages, src.page_count)):
+                pix = page.get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+                new_page = scan.new_page(width=page.rect.width, height=page.rect.height)
+                new_page.insert_image(new_page.rect, pixmap=pix)
+            scan_path = out_dir / f"synthetic_scan_{scan_pages}.pdf"
+            scan.save(scan_path)
+        corpus['scanned'].append(str(scan_path))
+    return corpus
+
+
+def _engine_available(config: dict, engine: str) -> str:
+    """Empty string if the engine loads, else the reason it does not"""
+    from extraction.ocr_engines import EngineRegistry
+    try:
+        loaded = EngineRegistry(config).get(engine)
+        if engine == 'tesseract':
+            loaded.image_to_string(np.full((32, 32), 255, np.uint8), psm=6)
+        return ''
+    except Exception as e:
+        return f"{engine} unavailable: {str(e).splitlines()[0]}"
+
+
+def _extract_case(config: dict, files: list, profile_overrides: dict) -> dict:
+    from extraction.text_extraction import TextExtractor
+
+    profile = config.get('profile', config.get('default_profile', 'standard'))
+    config['profiles'][profile] = {**config['profiles'].get(profile, {}), **profile_overrides}
+    extractor = TextExtractor(config)
+    stages = {}
+    pages = 0
+    start = time.perf_counter()
+    for pdf_path in files:
+        result = extractor.extract(pdf_path)
+        if result is None:
+            raise RuntimeError(f"Extraction failed for {pdf_path}")
+        pages += len(result['pages'])
+        for stage, seconds in result['timings'].items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+    return {'units': 'pages', 'items': pages, 'seconds': time.perf_counter() - start, 'stages': stages}
+
+
+def _tables_case(files: list) -> dict:
+    from extraction.table_handling import extract_page_tables
+
+    pages = 0
+    start = time.perf_counter()
+    for pdf_path in files:
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                extract_page_tables(page)
+                pages += 1
+    return {'units': 'pages', 'items': pages, 'seconds': time.perf_counter() - start, 'stages': {}}
+
+
+def _text_case(config: dict, files: list, scale: int) -> dict:
+    from postprocessing.text_cleaner import TextCleaner
+
+    text = ""
+    for pdf_path in files:
+        with fitz.open(pdf_path) as doc:
+            text += "\n".join(page.get_text() for page in doc)
+    # About 64 KB per page of --scale, so the cleaner runs long enough to time
+    copies = max(1, scale * 64 * 1024 // max(1, len(text.encode('utf-8'))))
+    text = "\n".join([text] * copies)
+    cleaner = TextCleaner(config.get('text_cleaning', {}))
+    start = time.perf_counter()
+    cleaner.clean(text)
+    return {
+        'units': 'MB',
+        'items': len(text.encode('utf-8')) / (1024 * 1024),
+        'seconds': time.perf_counter() - start,
+        'stages': {}
+    }
+
+
+def run_case(case: str, config: dict, corpus: dict, scale: int) -> dict:
+    """Run one case in this (fresh) process and return its measurements"""
+    if case == 'native':
+        result = _extract_case(config, corpus['native'], {})
+    elif case in ('ocr', 'hybrid'):
+        for engine in ('tesseract', 'easyocr') if case == 'hybrid' else ('tesseract',):
+            reason = _engine_available(config, engine)
+            if reason:
+                return {'status': 'skipped', 'reason': reason}
+        result = _extract_case(config, corpus['scanned'], {
+            'force_ocr': True,
+            'ocr_engine': 'tesseract' if case == 'ocr' else 'hybrid'
+        })
+    elif case == 'tables':
+        result = _tables_case(corpus['native'])
+    else:
+        result = _text_case(config, corpus['native'], scale)
+    result['status'] = 'ok'
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def measure(case: str, config: dict, corpus: dict, scale: int, repeat: int) -> dict:
+    """Median of ``repeat`` runs, each in its own process"""
+    ctx = multiprocessing.get_context('spawn')
+    runs = []
+    for _ in range(repeat):
+        with ctx.Pool(1) as pool:
+            run = pool.apply(run_case, (case, config, corpus, scale))
+        if run['status'] != 'ok':
+            return run
+        runs.append(run)
+    runs.sort(key=lambda run: run['seconds'])
+    median = runs[len(runs) // 2]
+    median['throughput'] = median['items'] / median['seconds'] if median['seconds'] else 0.0
+    median['peak_rss_mb'] = max(run['peak_rss_mb'] for run in runs)
+    median['runs'] = [round(run['seconds'], 4) for run in runs]
+    return median
+
+
+def compare(current: dict, baseline: dict, threshold: float, rss_threshold: float) -> list:
+    """Regressions of current vs baseline, as human-readable strings"""
+    regressions = []
+    for case, result in current['cases'].items():
+        base = baseline.get('cases', {}).get(case)
+        if result['status'] != 'ok' or not base or base.get('status') != 'ok':
+            continue
+        if result['throughput'] < base['throughput'] * (1 - threshold):
+            regressions.append(
+                f"{case}: {result['throughput']:.2f} {result['units']}/s vs baseline "
+                f"{base['throughput']:.2f} (-{1 - result['throughput'] / base['throughput']:.0%}, "
+                f"limit -{threshold:.0%})"
+            )
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + rss_threshold):
+            regressions.append(
+                f"{case}: peak RSS {result['peak_rss_mb']:.0f} MB vs baseline {base['peak_rss_mb']:.0f} MB "
+                f"(limit +{rss_threshold:.0%})"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument('--input', default=str(ROOT / 'data' / 'raw'), help="Directory of PDFs")
+    parser.add_argument('--config', default=str(ROOT / 'configs' / 'batch_config.yaml'))
+    parser.add_argument('--cases', default=','.join(CASES), help="Comma-separated cases to run")
+    parser.add_argument('--scale', type=int, default=100, help="Pages in the synthetic native document")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=str(ROOT / 'benchmarks' / 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--output', help="Also write this run's results to a JSON file")
+    parser.add_argument('--threshold', type=float, default=0.15, help="Allowed throughput drop (fraction)")
+    parser.add_argument('--rss-threshold', type=float, default=0.25, help="Allowed peak RSS growth (fraction)")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as f:
+        config = yaml.safe_load(f)
+    # One worker: the suite measures a single extraction process
+    config['max_workers'] = 1
+
+    corpus_dir = Path(tempfile.mkdtemp(prefix='pdf_mining_bench_'))
+    try:
+        corpus = build_corpus(Path(args.input), corpus_dir, args.scale, config)
+        logger.info(f"Corpus: {len(corpus['native'])} native, {len(corpus['scanned'])} scanned documents")
+
+        current = {
+            'meta': {
+                'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'scale': args.scale,
+                'repeat': args.repeat
+            },
+            'cases': {}
+        }
+        for case in args.cases.split(','):
+            result = measure(case, config, corpus, args.scale, args.repeat)
+            current['cases'][case] = result
+            if result['status'] != 'ok':
+                logger.info(f"{case:8s} skipped ({result['reason']})")
+                continue
+            stages = ', '.join(f"{stage}={seconds:.2f}s" for stage, seconds in result['stages'].items() if seconds)
+            logger.info(
+                f"{case:8s} {result['throughput']:9.2f} {result['units']}/s  {result['seconds']:7.2f} s  "
+                f"peak RSS {result['peak_rss_mb']:6.0f} MB  {stages}"
+            )
+    finally:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2))
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(current, indent=2))
+        logger.info(f"Baseline written to {args.baseline}")
+        return
+
+    if not Path(args.baseline).exists():
+        logger.warning(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    baseline = json.loads(Path(args.baseline).read_text())
+    regressions = compare(current, baseline, args.threshold, args.rss_threshold)
+    for regression in regressions:
+        logger.error(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    logger.info(f"No regressions against baseline from {baseline.get('meta', {}).get('date', 'unknown')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Geometry-based table extraction on synthetic bank statements.
+
+Writes whitespace-aligned statements (date, description, right-aligned
+debit/credit/balance, empty cells where a transaction has no debit or
+credit) with PyMuPDF, so the expected cells are known, then compares:
+
+- ``text``: the original detect_tables on the page text
+- ``geometry``: extract_page_tables on the page's word boxes
+
+reporting rows recovered exactly and ms/page. A second pass stacks the
+word boxes of several pages into one table of up to --max-rows rows to
+show that time per row stays flat as tables grow.
+
+Usage:
+    python benchmarks/tables.py --rows 2000 --max-rows 16000
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from extraction.table_handling import (  # noqa: E402
+    detect_tables, detect_tables_from_words, extract_page_tables, table_to_rows
+)
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+FONT_SIZE = 9
+LINE_HEIGHT = 12
+ROWS_PER_PAGE = 60
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+# (x, alignment) per column: date, description, debit, credit, balance
+COLUMNS = [(40, 'left'), (110, 'left'), (420, 'right'), (490, 'right'), (570, 'right')]
+MERCHANTS = ["Card payment TESCO STORES", "Direct debit COUNCIL TAX", "Transfer to savings",
+             "Salary ACME LTD", "ATM withdrawal", "Card payment AMAZON MKTPLACE", "Interest"]
+
+
+def make_rows(count: int, rng: random.Random) -> list:
+    rows = [["Date", "Description", "Debit", "Credit", "Balance"]]
+    balance = 2500.0
+    for i in range(count - 1):
+        amount = round(rng.uniform(1, 900), 2)
+        credit = rng.random() < 0.2
+        balance += amount if credit else -amount
+        rows.append([
+            f"{1 + i % 28:02d}/{1 + i // 28 % 12:02d}/2024",
+            rng.choice(MERCHANTS),
+            "" if credit else f"{amount:,.2f}",
+            f"{amount:,.2f}" if credit else "",
+            f"{balance:,.2f}"
+        ])
+    return rows
+
+
+def write_statement(rows: list, path: Path) -> None:
+    with fitz.open() as doc:
+        for first in range(0, len(rows), ROWS_PER_PAGE):
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            for i, row in enumerate(rows[first:first + ROWS_PER_PAGE]):
+                y = 50 + i * LINE_HEIGHT
+                for (x, align), text in zip(COLUMNS, row):
+                    if not text:
+                        continue
+                    if align == 'right':
+                        x -= fitz.get_text_length(text, fontsize=FONT_SIZE)
+                    page.insert_text((x, y), text, fontsize=FONT_SIZE)
+        doc.save(path)
+
+
+def score(found: list, expected: list) -> int:
+    """Expected rows that appear exactly (cell for cell) in the found rows"""
+    found = {tuple(cell.strip() for cell in row) for row in found}
+    return sum(1 for row in expected if tuple(row) in found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark table extraction")
+    parser.add_argument('--rows', type=int, default=2000, help="Statement rows, header included")
+    parser.add_argument('--max-rows', type=int, default=16000, help="Largest stacked table for the scaling pass")
+    parser.add_argument('--output', default='/tmp/statement.pdf')
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, random.Random(0))
+    write_statement(rows, Path(args.output))
+
+    with fitz.open(args.output) as doc:
+        # Every page repeats no header, so score against all rows
+        for name in ('text', 'geometry'):
+            found = []
+            start = time.perf_counter()
+            for page in doc:
+                if name == 'text':
+                    found += [row for table in detect_tables(page.get_text()) for row in table]
+                else:
+                    found += [row for table in extract_page_tables(page) for row in table_to_rows(table)]
+            seconds = time.perf_counter() - start
+            logger.info(f"{name:9s} {score(found, rows):6d}/{len(rows)} rows exact  "
+                        f"{1000 * seconds / doc.page_count:7.2f} ms/page")
+
+        # Scaling: one tall table built from the word boxes of consecutive pages
+        words = []
+        for page in doc:
+            words += [(w[0], w[1] + page.number * PAGE_HEIGHT, w[2], w[3] + page.number * PAGE_HEIGHT, *w[4:])
+                      for w in page.get_text("words")]
+    logger.info("")
+    size = 1000
+    while True:
+        per_page = [w for w in words if w[3] < (size / ROWS_PER_PAGE + 1) * PAGE_HEIGHT]
+        start = time.perf_counter()
+        tables = detect_tables_from_words(per_page)
+        seconds = time.perf_counter() - start
+        table_rows = sum(len(table['cells']) for table in tables)
+        logger.info(f"{table_rows:6d} rows in {len(tables)} table(s): {1000 * seconds:8.1f} ms "
+                    f"({1e6 * seconds / max(table_rows, 1):6.1f} us/row)")
+        if size >= min(args.max_rows, len(rows)):
+            break
+        size = min(size * 2, args.max_rows, len(rows))
+
+
+if __name__ == "__main__":
+    main()
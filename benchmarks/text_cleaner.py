@@ -0,0 +1,104 @@
+"""Compare the compiled TextCleaner with the original per-rule re.sub loop.
+
+Builds a multi-MB corpus from the text layers of the PDFs in data/raw,
+cleans it with the original implementation, TextCleaner.clean and
+TextCleaner.iter_clean, checks all three outputs are byte-identical and
+reports MB/s for each.
+
+Usage:
+    python benchmarks/text_cleaner.py --input data/raw --size-mb 20
+"""
+import argparse
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+
+import fitz
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from postprocessing.text_cleaner import TextCleaner  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+# Extra rules on top of the built-in OCR fixes: a run of literals plus a
+# few regexes
+BENCH_PATTERNS = [[f"Tabel {n}", f"Table {n}"] for n in range(1, 9)] + [
+    [r'[ \t]+\n', '\n'],
+    [r'(\d),(\d{3})', r'\1\2'],
+    ['ﬁ', 'fi'],
+    ['ﬂ', 'fl'],
+]
+
+# Text that exercises every rule, checked for identity but not timed
+EDGE_CASES = (
+    "\r\n  Neugi wrote to foo@bar-com and x@y-comz@w-com o\r\n"
+    "Tabel 1, Tabel 8 and 1,000,000 items  \t\n0 ﬁnal ﬂow ¢\n\n  \n"
+)
+
+
+def legacy_clean(text: str, replace_patterns: list, common_errors: dict) -> str:
+    """TextCleaner.clean as it was before rules were compiled"""
+    text = text.replace('\r\n', '\n')
+    for pattern, replacement in replace_patterns:
+        text = re.sub(pattern, replacement, text)
+    for error, fix in common_errors.items():
+        text = re.sub(error, fix, text)
+    return text.strip()
+
+
+def build_corpus(input_dir: Path, size_mb: float) -> str:
+    pages = []
+    for pdf_path in sorted(input_dir.glob("*.pdf")):
+        with fitz.open(pdf_path) as doc:
+            pages.extend(page.get_text() for page in doc)
+    seed = "\r\n".join(pages) or "Neugi wrote to foo@bar-com o Tabel 3 lists 1,000 items\n"
+    repeat = max(1, int(size_mb * 1024 * 1024 / len(seed)))
+    return "\n".join([seed] * repeat)
+
+
+def timed(func, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TextCleaner")
+    parser.add_argument('--input', default='data/raw', help="Directory of PDFs")
+    parser.add_argument('--size-mb', type=float, default=20)
+    parser.add_argument('--chunk-mb', type=float, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    text = build_corpus(Path(args.input), args.size_mb)
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    cleaner = TextCleaner({'replace_patterns': BENCH_PATTERNS, 'chunk_size': int(args.chunk_mb * 1024 * 1024)})
+    logger.info(f"Corpus: {size_mb:.1f} MB, {len(BENCH_PATTERNS) + len(cleaner.common_errors)} rules")
+
+    # Feed the streaming mode in page-sized pieces, as an extractor would
+    pieces = [text[i:i + 4096] for i in range(0, len(text), 4096)]
+    runs = {
+        'legacy': lambda: legacy_clean(text, BENCH_PATTERNS, cleaner.common_errors),
+        'clean': lambda: cleaner.clean(text),
+        'iter_clean': lambda: "".join(cleaner.iter_clean(pieces)),
+    }
+    outputs = {}
+    for name, func in runs.items():
+        outputs[name], seconds = timed(func, args.repeat)
+        logger.info(f"{name:12s} {seconds:.3f} s  {size_mb / seconds:.1f} MB/s")
+
+    identical = all(output == outputs['legacy'] for output in outputs.values())
+    expected = legacy_clean(EDGE_CASES, BENCH_PATTERNS, cleaner.common_errors)
+    small = TextCleaner({'replace_patterns': BENCH_PATTERNS, 'chunk_size': 8})
+    identical &= cleaner.clean(EDGE_CASES) == expected
+    identical &= "".join(small.iter_clean(EDGE_CASES[i:i + 5] for i in range(0, len(EDGE_CASES), 5))) == expected
+    logger.info(f"Byte-identical to legacy: {'yes' if identical else 'NO'}")
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,16 @@ Key Features:
 - Directory rotation for organized output storage
 - Detailed logging and reporting
 - YAML configuration support
+- Content-addressed extraction cache so unchanged PDFs are not re-extracted
+- Persistent job manifest for resuming interrupted or failed runs
+- Streaming, deduplicated input discovery with include/exclude globs
+- Page-range splitting of large PDFs with longest-first scheduling
+- Supervised workers with per-file timeouts, memory caps and recycling
+- Per-stage timings and counters, exportable as JSON or a Prometheus textfile
+- Serve mode: a warm worker pool behind a local HTTP job API
+- Distributed mode: worker nodes sharing a lease-based queue on shared disk
+- Optional partitioned Parquet dataset of layout elements for analytics
+- Output as one .txt per PDF or rolling compressed JSONL shards with an index
 - Progress tracking and error handling
 Classes:
     PDFProcessor: Core PDF batch processing engine with parallel execution support
@@ -15,11 +25,31 @@ Functions:
     setup_directories: Create required directory structure
     main: CLI entry point and orchestration
 Command Line Arguments:
-    --input: Path to input PDF file or directory (required)
+    --input: Path to input PDF file or directory
+    --file-list: Text file with one PDF path per line ('-' for stdin), instead of --input
+    --include, --exclude: Globs selecting files under --input (repeatable)
     --config: Path to YAML config file (default: configs/batch_config.yaml) 
     --workers: Override number of worker processes
+    --no-cache: Disable the content-addressed extraction cache
+    --refresh: Re-extract every file and overwrite its cache entry
+    --manifest: Path of the persistent job manifest
+    --resume: Only process files not marked done in the manifest
+    --metrics-json: Write batch stage metrics as JSON
+    --metrics-prom: Write batch stage metrics as a Prometheus textfile
+    --serve: Run as a daemon accepting jobs over HTTP (see pipeline/server.py)
+    --host, --port, --socket: Where the daemon listens
+    --queue: Shared queue file; with --input, coordinate a run by worker nodes
+    --queue-worker: Run as a worker node on --queue (with --node NAME)
+    --startup-report: Print import times of the CLI and a worker, then exit
+        (status 1 if the native-text path loads torch/easyocr/layoutparser
+        or a phase exceeds startup.budget_ms)
 Example Usage:
     python cli.py --input /path/to/pdfs --workers 4
+    python cli.py --input /share --exclude "archive/*" --workers 8
+    find /share -name "*.pdf" | python cli.py --file-list - --resume
+    python cli.py --serve --port 8765
+    python cli.py --input /share/pdfs --queue /share/queue.sqlite     # coordinator
+    python cli.py --queue-worker --queue /share/queue.sqlite --workers 8  # each node
 Directory Structure:
     data/
         raw/
@@ -27,14 +57,16 @@ Directory Structure:
         out/
             logs/  # Processing logs and reports
             YYYYMMDD/  # Daily output folders
+            elements/  # Parquet element dataset (structured_output.enabled)
 """
 import argparse
 import logging
 import multiprocessing
 import os
+import socket
 import time
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
 import sys
 
 
@@ -59,97 +91,717 @@ logger = logging.getLogger(__name__)
 
 from typing import List, Dict, Tuple  # Add this at the top
 
+# Per-worker extraction state, populated by init_worker
+_worker_state = {}
+
+def init_worker(config: dict) -> None:
+    """Pool initializer: build the worker's engine registry, extractor and cleaner once"""
+    import sys
+    from pathlib import Path
+    
+    project_root = Path(__file__).parent.parent
+    sys.path.insert(0, str(project_root))
+    
+    from extraction import ocr_engines
+    from extraction.text_extraction import TextExtractor
+    from postprocessing.text_cleaner import TextCleaner
+    
+    engines = ocr_engines.init_worker(config)
+    # Reported with this worker's first result; per-document model_load excludes it
+    _worker_state['warm_up'] = {'worker': f"{socket.gethostname()}-{os.getpid()}",
+                                'seconds': engines.total_load_time()}
+    _worker_state['extractor'] = TextExtractor(config, engines=engines)
+    _worker_state['cleaner'] = TextCleaner(config.get('text_cleaning', {}))
+    
+    cache_config = config.get('cache', {})
+    if cache_config.get('enabled', False):
+        from pipeline.cache import ExtractionCache
+        _worker_state['cache'] = ExtractionCache(
+            cache_config.get('path', 'data/cache/extraction.sqlite'),
+            max_size_mb=cache_config.get('max_size_mb', 1024)
+        )
+    
+    manifest_path = config.get('manifest', {}).get('path')
+    if manifest_path:
+        from pipeline.manifest import JobManifest
+        _worker_state['manifest'] = JobManifest(manifest_path)
+
+def open_element_sink(config: dict):
+    """ElementSink for structured_output, or None if disabled or pyarrow is missing"""
+    sink_config = config.get('structured_output', {})
+    if not sink_config.get('enabled', False):
+        return None
+    try:
+        from postprocessing.element_sink import ElementSink
+        return ElementSink(
+            sink_config.get('path', 'data/out/elements'),
+            row_group_size=sink_config.get('row_group_size', 50000),
+            max_rows_per_file=sink_config.get('max_rows_per_file', 1000000),
+            compression=sink_config.get('compression', 'zstd'),
+            max_file_seconds=sink_config.get('max_file_seconds', 300)
+        )
+    except ImportError as e:
+        logger.warning(f"Structured output disabled, pyarrow is not available: {str(e)}")
+        return None
+
+def save_output(pdf_path: Path, clean_text: Union[str, Iterable[str]]) -> Path:
+    """Write cleaned text (a string or an iterable of chunks) to the daily output folder"""
+    date_str = time.strftime("%Y%m%d")
+    output_dir = Path(f"data/out/{date_str}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    txt_path = output_dir / f"{pdf_path.stem}.txt"
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        if isinstance(clean_text, str):
+            f.write(clean_text)
+        else:
+            f.writelines(clean_text)
+    return txt_path
+
+def _clean_text(text: str, cleaner, metrics) -> str:
+    """Clean text for the output store, charging the time to the clean stage"""
+    with metrics.timer('clean'):
+        return cleaner.clean(text)
+
+def _uses_output_store(config: dict) -> bool:
+    return config.get('output', {}).get('mode', 'files') == 'shards'
+
+def _save_cleaned(pdf_path: Path, text: str, cleaner, metrics) -> Path:
+    """Clean and write text, charging the time to the clean and write stages"""
+    clean_before = metrics.stages.get('clean', 0.0)
+    start = time.perf_counter()
+    txt_path = save_output(pdf_path, metrics.timed_iter('clean', cleaner.iter_clean([text])))
+    clean_time = metrics.stages.get('clean', 0.0) - clean_before
+    metrics.add_time('write', time.perf_counter() - start - clean_time)
+    metrics.count('bytes_written', txt_path.stat().st_size)
+    return txt_path
+
+def _doc_id(pdf_path: Path, cache_key: str = None) -> str:
+    """Content id shared by the element sink and the output store"""
+    from pipeline.cache import file_hash
+    # The cache key already starts with the content hash
+    return (cache_key.split(':')[0] if cache_key else file_hash(str(pdf_path)))[:16]
+
+def _write_elements(sink, result: dict, elements: list, metrics) -> None:
+    """Append a document's layout elements to the Parquet sink; ``result`` returns from sink.committed()"""
+    from postprocessing.element_sink import document_type
+    with metrics.timer('structured_write'):
+        doc_id = result.get('store_id') or _doc_id(Path(result['input']), result.get('cache_key'))
+        rows = sink.add(doc_id, result['input'], document_type(result['pages']), elements, token=result)
+    metrics.count('elements', rows)
+
 def process_single_file(args: tuple) -> dict:
-    """Standalone function for processing individual PDF files"""
+    """Standalone function for processing individual PDF files.
+    
+    ``args`` is (task, config) where task is a path or a scheduler task
+    dict. Page-range tasks return their raw text for the parent to stitch;
+    whole-document tasks are cleaned and saved here, or with ``output.mode:
+    shards`` cleaned and returned for the parent's output store. Tasks from
+    serve mode (``stream`` set) return their cleaned text instead of saving
+    it. Layout elements are returned for the parent's Parquet sink. Either
+    way the result carries the task's stage metrics.
+    """
     import sys
     from pathlib import Path
     
     # Add the src directory to Python path
     project_root = Path(__file__).parent.parent
     sys.path.insert(0, str(project_root))
+    from utils.metrics import StageMetrics
+    
+    task, config = args
+    if not isinstance(task, dict):
+        task = {'input': str(task), 'pages': None, 'part': 0, 'parts': 1}
+    pdf_path = Path(task['input'])
+    start_time = time.time()
+    metrics = StageMetrics()
     
     try:
-        from extraction.text_extraction import TextExtractor
-        from postprocessing.text_cleaner import TextCleaner
-        
-        pdf_path_str, config = args
-        pdf_path = Path(pdf_path_str)
-        
-        extractor = TextExtractor(config)
-        text = extractor.extract_text(str(pdf_path))
-        if not text:
-            return {'input': str(pdf_path), 'status': 'failed', 'error': 'No text extracted'}
-        
-        cleaner = TextCleaner(config.get('text_cleaning', {}))
-        clean_text = cleaner.clean(text)
+        if not _worker_state:
+            init_worker(config)
+        if 'manifest' in _worker_state and task['part'] == 0:
+            _worker_state['manifest'].mark_running(str(pdf_path))
         
-        # Save output
-        date_str = time.strftime("%Y%m%d")
-        output_dir = Path(f"data/out/{date_str}")
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        txt_path = output_dir / f"{pdf_path.stem}.txt"
-        with open(txt_path, 'w', encoding='utf-8') as f:
-            f.write(clean_text)
-            
-        return {
-            'input': str(pdf_path),
-            'output': str(txt_path),
-            'status': 'success'
-        }
+        if task['part'] == 0:
+            metrics.count('bytes_read', pdf_path.stat().st_size)
+        if task['parts'] > 1 or task.get('stream'):
+            result = _extract_part(pdf_path, task, metrics)
+        else:
+            result = _process_document(pdf_path, config, metrics)
     except Exception as e:
-        return {
+        result = {
             'input': str(pdf_path),
             'status': 'failed',
             'error': str(e)
         }
+    
+    metrics.add_time('total', time.time() - start_time)
+    result.update({
+        'part': task['part'],
+        'parts': task['parts'],
+        'elapsed': time.time() - start_time,
+        'metrics': metrics.as_dict()
+    })
+    for key in ('doc_id', 'cache_key', 'queue_id'):
+        if task.get(key) is not None:
+            result[key] = task[key]
+    if 'warm_up' in _worker_state:
+        result['warm_up'] = _worker_state.pop('warm_up')
+    return result
+
+def task_failure(args: tuple, status: str, error: str) -> dict:
+    """Result for a task the executor had to abandon (timeout, memory, crash)"""
+    task, _ = args
+    if not isinstance(task, dict):
+        task = {'input': str(task), 'part': 0, 'parts': 1}
+    result = {
+        'input': task['input'],
+        'status': status,
+        'error': error,
+        'part': task['part'],
+        'parts': task['parts'],
+        'elapsed': 0.0
+    }
+    for key in ('doc_id', 'cache_key', 'queue_id'):
+        if task.get(key) is not None:
+            result[key] = task[key]
+    return result
+
+def _add_extraction_metrics(metrics, extracted: dict) -> None:
+    for stage, seconds in extracted['timings'].items():
+        if seconds:
+            metrics.add_time(stage, seconds)
+    metrics.add_pages(extracted['pages'])
+
+def _extract_part(pdf_path: Path, task: dict, metrics) -> dict:
+    """Extract one page range of a split document"""
+    extracted = _worker_state['extractor'].extract(str(pdf_path), page_range=tuple(task['pages']),
+                                                   thin_text=task.get('thin_text'))
+    if extracted is None:
+        return {'input': str(pdf_path), 'status': 'failed', 'error': f"No text extracted from pages {task['pages']}"}
+    _add_extraction_metrics(metrics, extracted)
+    text = extracted['text']
+    if task.get('stream'):
+        with metrics.timer('clean'):
+            text = _worker_state['cleaner'].clean(text)
+    result = {
+        'input': str(pdf_path),
+        'status': 'success',
+        'text': text,
+        'pages': extracted['pages'],
+        'timings': extracted['timings']
+    }
+    # Elements of split documents are written by the parent once all parts are in
+    if 'elements' in extracted:
+        result['elements'] = extracted['elements']
+    return result
+
+def _cache_metadata(extracted: dict) -> dict:
+    metadata = {'pages': extracted['pages']}
+    if 'elements' in extracted:
+        metadata['elements'] = extracted['elements']
+    return metadata
+
+def _process_document(pdf_path: Path, config: dict, metrics) -> dict:
+    """Extract, clean and save a whole document, using the cache if enabled"""
+    extractor = _worker_state['extractor']
+    cleaner = _worker_state['cleaner']
+    cache = _worker_state.get('cache')
+    
+    # Cache hits skip opening the PDF entirely
+    extracted = None
+    cache_key = None
+    cache_status = 'disabled'
+    if cache is not None:
+        with metrics.timer('cache_lookup'):
+            cache_key = cache.make_key(str(pdf_path), config)
+            cached = None if config['cache'].get('refresh') else cache.get(cache_key)
+        # Entries stored without elements cannot feed the structured sink
+        if cached and (not extractor.collect_elements or 'elements' in cached['metadata']):
+            extracted = {
+                'text': cached['text'],
+                'pages': cached['metadata'].get('pages', []),
+                'elements': cached['metadata'].get('elements', []),
+                'timings': dict.fromkeys(extractor.TIMING_KEYS, 0.0)
+            }
+            cache_status = 'hit'
+            metrics.route = 'cache'
+        else:
+            cache_status = 'miss'
+    
+    if extracted is None:
+        extracted = extractor.extract(str(pdf_path))
+        if not extracted:
+            return {'input': str(pdf_path), 'status': 'failed', 'error': 'No text extracted'}
+        if cache is not None:
+            with metrics.timer('cache_store'):
+                cache.put(cache_key, extracted['text'], _cache_metadata(extracted))
+    _add_extraction_metrics(metrics, extracted)
+    
+    result = {
+        'input': str(pdf_path),
+        'status': 'success',
+        'pages': extracted['pages'],
+        'timings': extracted['timings'],
+        'cache': cache_status
+    }
+    if extractor.collect_elements or _uses_output_store(config):
+        result['store_id'] = _doc_id(pdf_path, cache_key)
+    if extractor.collect_elements:
+        # Written by the parent, which records the document once its Parquet file is final
+        result['elements'] = extracted.get('elements', [])
+    if _uses_output_store(config):
+        # The parent's writer thread appends it to a shard
+        result['text'] = _clean_text(extracted['text'], cleaner, metrics)
+    else:
+        result['output'] = str(_save_cleaned(pdf_path, extracted['text'], cleaner, metrics))
+    return result
 
 class PDFProcessor:
     """Handles parallel PDF processing"""
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, manifest=None, resume: bool = False):
         self.config = config
+        self.manifest = manifest
+        self.resume = resume
         self.max_workers = min(
             config.get('max_workers', os.cpu_count() - 1 or 1),
             61  # Windows limit for multiprocessing
         )
-        self.chunk_size = config.get('chunk_size', 5)
+        self.limits = config.get('resource_limits', {})
+        self.scheduling = config.get('scheduling', {}).get('enabled', True)
+        self._cache = None
+        self._cleaner = None
+        self._sink = None
+        self._store = None
+        self._store_pending: Dict[int, Dict] = {}  # id -> result queued in the output store, not yet durable
+        self._output_error: Optional[Exception] = None  # Set once the output store's writer has stopped
+        from utils.metrics import MetricsAggregator
+        self.metrics = MetricsAggregator()
+        
+    def process_batch(self, pdf_files: Iterable) -> Dict:
+        """Process multiple PDFs in parallel.
+        
+        ``pdf_files`` is a list of paths or an InputDiscovery; either way files
+        are planned and dispatched in windows while discovery is still
+        running (see _iter_tasks). Files over the size limit are skipped. With
+        scheduling enabled, large documents are split into page-range tasks
+        and each window is dispatched longest-first. Workers run under the
+        supervised executor, which enforces resource_limits. Each document is
+        recorded in the job manifest (if any) as soon as it completes. Ctrl-C
+        stops the workers but still returns what finished; so does a failed
+        output store, after recording its unwritten documents as failed.
+        """
+        from pipeline.executor import SupervisedExecutor
+        from pipeline.scheduler import DocumentAssembler
+        
+        results = self._new_results()
+        assembler = DocumentAssembler()
+        self._open_outputs()
+        
+        executor = SupervisedExecutor(
+            process_single_file,
+            processes=self.max_workers,
+            initializer=init_worker,
+            initargs=(self.config,),
+            timeout=self.limits.get('timeout_per_file'),
+            max_memory_mb=self.limits.get('max_memory_per_worker'),
+            max_tasks_per_worker=self.limits.get('max_tasks_per_worker'),
+            failure_result=task_failure
+        )
+        try:
+            for result in executor.imap_unordered(self._iter_tasks(pdf_files, results)):
+                self._handle_result(results, result, assembler)
+                if self._output_error is not None:
+                    logger.error("Stopping the batch; unfinished files stay in the manifest for --resume")
+                    break
+        except KeyboardInterrupt:
+            logger.warning("Interrupted; unfinished files stay in the manifest for --resume")
+            results['interrupted'] = True
+        finally:
+            executor.shutdown()
+            self._close_outputs(results)
+        results['workers_recycled'] = executor.stats['recycled']
+        
+        return results
+    
+    def process_distributed(self, pdf_files: Iterable, queue_path: str) -> Dict:
+        """Coordinate a batch run by worker nodes through a shared lease queue.
+        
+        Tasks are planned exactly as in process_batch, with absolute input
+        paths, and enqueued as a new batch in the queue at ``queue_path``;
+        nodes started with --queue-worker claim and run them. Results are
+        read back in completion order and go through the same assembly,
+        output and manifest steps, so the report covers the whole batch.
+        Ctrl-C cancels the tasks no node has claimed yet.
+        """
+        from pipeline.executor import NO_TASK
+        from pipeline.scheduler import DocumentAssembler
+        from pipeline.work_queue import BatchLease, open_queue
+        
+        results = self._new_results()
+        results['nodes'] = {}
+        assembler = DocumentAssembler()
+        self._open_outputs()
+        distributed = self.config.get('distributed', {})
+        poll_seconds = distributed.get('poll_seconds', 1.0)
+        queue = open_queue(queue_path, self.config)
+        batch = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        queue.create_batch(batch, {key: value for key, value in self.config.items() if key != 'manifest'})
+        # Nodes abandon the batch if this process dies and stops renewing it
+        lease = BatchLease(queue, batch, distributed.get('heartbeat_seconds', queue.lease_seconds / 4))
+        logger.info(f"Batch {batch} queued at {queue_path}; start nodes with --queue-worker --queue {queue_path}")
+        
+        # Nodes run from their own working directory, so tasks carry absolute paths
+        pdf_files = (
+            (os.path.abspath(pdf), None) if isinstance(pdf, (str, Path)) else (os.path.abspath(pdf[0]), pdf[1])
+            for pdf in pdf_files
+        )
+        tasks = self._iter_tasks(pdf_files, results)
+        enqueuing = True
+        last_seq = 0
+        try:
+            while True:
+                chunk = []
+                if enqueuing:
+                    for item in tasks:
+                        if item is NO_TASK:
+                            break
+                        task = item[0] if isinstance(item[0], dict) else {
+                            'input': item[0], 'pages': None, 'part': 0, 'parts': 1
+                        }
+                        chunk.append(task)
+                        if len(chunk) >= 500:
+                            break
+                    else:
+                        enqueuing = False
+                    queue.enqueue(batch, chunk)
+                    if not enqueuing:
+                        queue.close_batch(batch)
+                
+                finished = queue.results(batch, after=last_seq)
+                if not enqueuing and not finished:
+                    counts = queue.counts(batch)
+                    if not counts['pending'] and not counts['leased']:
+                        # Catch results posted since the read above
+                        finished = queue.results(batch, after=last_seq)
+                        if not finished:
+                            break
+                for seq, task, result, owner, error in finished:
+                    last_seq = seq
+                    if result is None:
+                        result = task_failure((task, None), 'lease_expired', error)
+                    results['nodes'][owner] = results['nodes'].get(owner, 0) + 1
+                    self._handle_result(results, result, assembler)
+                if self._output_error is not None:
+                    cancelled = queue.cancel(batch)
+                    logger.error(f"Stopping the batch; cancelled {cancelled} queued tasks, unfinished files "
+                                 f"stay in the manifest for --resume")
+                    break
+                if not finished and not chunk:
+                    time.sleep(poll_seconds)
+        except KeyboardInterrupt:
+            cancelled = queue.cancel(batch)
+            logger.warning(f"Interrupted; cancelled {cancelled} queued tasks, unfinished files stay in the "
+                           f"manifest for --resume")
+            results['interrupted'] = True
+        finally:
+            lease.stop()
+            self._close_outputs(results)
+            results['expired_leases'] = queue.counts(batch)['expired_leases']
+            queue.close()
         
-    def process_batch(self, pdf_files: List[Path]) -> Dict:
-        """Process multiple PDFs in parallel"""
-        results = {
+        return results
+    
+    def _new_results(self) -> Dict:
+        return {
+            'discovered': 0,
+            'skipped_done': 0,
             'processed': 0,
             'failed': 0,
+            'interrupted': False,
+            'model_load_seconds': 0.0,
+            'warm_up': {},
+            'ocr_inference_seconds': 0.0,
+            'preprocess_seconds': 0.0,
+            'blank_pages_skipped': 0,
+            'cache_hits': 0,
+            'outcomes': {},
             'files': []
         }
+    
+    def _handle_result(self, results: Dict, result: Dict, assembler) -> None:
+        """Assemble split documents, hand text to the output store and record the document"""
+        warm_up = result.pop('warm_up', None)
+        if warm_up:
+            # Engines a worker loaded before its first task
+            results['warm_up'][warm_up['worker']] = warm_up['seconds']
+            results['model_load_seconds'] += warm_up['seconds']
+        if result['parts'] > 1:
+            result = assembler.add(result)
+            if result is None:
+                return
+            result = self._finalize_document(result)
+        if result['status'] == 'success' and 'elements' in result:
+            self._store_elements(result)
+        if result['status'] == 'success' and 'text' in result:
+            self._store_output(result)
+        self._record(results, result)
+        self._mark_written(results)
+    
+    def _open_outputs(self) -> None:
+        """Open the output store up front, so a root locked by another run fails before any work"""
+        if _uses_output_store(self.config):
+            self._get_store()
+    
+    def _close_outputs(self, results: Dict) -> None:
+        if self._sink:
+            self._sink.close()
+        if self._store:
+            self._store.close()
+        self._mark_written(results)
+        if self._store:
+            results['output_store'] = dict(self._store.stats, path=self._store.root, error=results.get('output_error'))
+    
+    def _iter_tasks(self, pdf_files: Iterable, results: Dict) -> Iterator:
+        """Executor tasks for the files, planned window by window as they are found.
+        
+        Discovery runs in a background thread. Each time a worker is free,
+        the files found so far (up to ``discovery.window``) are registered in
+        the manifest, filtered for --resume, ordered largest first if
+        ``discovery.size_order`` is set and planned. While discovery has
+        nothing ready the executor gets NO_TASK and keeps collecting results.
+        """
+        from pipeline.discovery import Prefetcher
+        from pipeline.executor import NO_TASK
+        from pipeline.scheduler import plan_tasks
         
-        # Prepare arguments for workers
-        tasks = [(str(pdf), self.config) for pdf in pdf_files]
-        
-        with multiprocessing.Pool(processes=self.max_workers) as pool:
-            for result in pool.imap_unordered(
-                process_single_file, 
-                tasks,
-                chunksize=self.chunk_size
-            ):
-                results['files'].append(result)
-                if result['status'] == 'success':
-                    results['processed'] += 1
+        discovery = self.config.get('discovery', {})
+        window = max(1, discovery.get('window', 1000))
+        prefetcher = Prefetcher(
+            ((pdf, None) if isinstance(pdf, (str, Path)) else pdf for pdf in pdf_files),
+            maxsize=discovery.get('prefetch', 10000)
+        )
+        try:
+            while True:
+                batch = prefetcher.take(window)
+                if not batch:
+                    if prefetcher.done:
+                        return
+                    yield NO_TASK
+                    continue
+                batch = [(str(pdf), size) for pdf, size in batch]
+                first_doc_id = results['discovered']
+                results['discovered'] += len(batch)
+                if self.manifest is not None:
+                    self.manifest.register(pdf for pdf, _ in batch)
+                    if self.resume:
+                        remaining = set(self.manifest.unfinished(pdf for pdf, _ in batch))
+                        results['skipped_done'] += len(batch) - len(remaining)
+                        batch = [item for item in batch if item[0] in remaining]
+                if discovery.get('size_order', True):
+                    batch.sort(key=lambda item: item[1] or 0, reverse=True)
+                accepted = self._skip_oversize(batch, results)
+                if self.scheduling:
+                    planned = plan_tasks(accepted, self.config, cache=self._get_cache(),
+                                         first_doc_id=first_doc_id)
+                    logger.debug(f"Planned {len(planned)} tasks for {len(accepted)} files")
                 else:
-                    logger.error(f"Failed {Path(result['input']).name}: {result.get('error', 'Unknown error')}")
-                    results['failed'] += 1
+                    planned = accepted
+                for task in planned:
+                    yield (task, self.config)
+        finally:
+            prefetcher.close()
+    
+    def _skip_oversize(self, pdf_files: List[Tuple[str, Optional[int]]], results: Dict) -> List[str]:
+        """Record files over the size limit as skipped and return the rest.
         
-        return results
+        ``pdf_files`` holds (path, size) pairs; a size of None is read here.
+        """
+        limits = [
+            self.limits.get('max_file_size_mb'),
+            self.config.get('memory', {}).get('max_pdf_size_mb')
+        ]
+        limits = [limit for limit in limits if limit]
+        if not limits:
+            return [pdf for pdf, _ in pdf_files]
+        max_bytes = min(limits) * 1024 * 1024
+        
+        accepted = []
+        for pdf, size in pdf_files:
+            try:
+                size = os.path.getsize(pdf) if size is None else size
+            except OSError as e:
+                self._record(results, {'input': str(pdf), 'status': 'failed', 'error': str(e), 'elapsed': 0.0})
+                continue
+            if size > max_bytes:
+                self._record(results, {
+                    'input': str(pdf),
+                    'status': 'skipped_oversize',
+                    'error': f"{size / (1024 * 1024):.1f} MB exceeds {min(limits)} MB limit",
+                    'elapsed': 0.0
+                })
+            else:
+                accepted.append(pdf)
+        return accepted
+    
+    def _record(self, results: Dict, result: Dict) -> None:
+        """Add one finished document to the running totals and the manifest"""
+        results['files'].append(result)
+        results['outcomes'][result['status']] = results['outcomes'].get(result['status'], 0) + 1
+        self.metrics.add(result)
+        # Documents still queued for the sink or output store are marked once written (_mark_written)
+        if self.manifest is not None and not result.get('output_pending'):
+            self.manifest.mark_finished(result)
+        if result['status'] == 'success':
+            results['processed'] += 1
+            results['model_load_seconds'] += result['timings']['model_load']
+            results['ocr_inference_seconds'] += result['timings']['ocr_inference']
+            results['preprocess_seconds'] += result['timings'].get('preprocess', 0.0)
+            results['blank_pages_skipped'] += sum(1 for p in result.get('pages', []) if p['route'] == 'blank')
+            results['cache_hits'] += result['cache'] == 'hit'
+        else:
+            logger.error(f"Failed ({result['status']}) {Path(result['input']).name}: {result.get('error', 'Unknown error')}")
+            results['failed'] += 1
+    
+    def _store_elements(self, result: Dict) -> None:
+        """Buffer a document's layout elements in the Parquet sink"""
+        elements = result.pop('elements')
+        sink = self._get_sink()
+        if sink is None:
+            return
+        from utils.metrics import StageMetrics, merge_metrics
+        metrics = StageMetrics()
+        result['output_pending'] = result.get('output_pending', 0) + 1
+        try:
+            _write_elements(sink, result, elements, metrics)
+        except Exception as e:
+            result['output_pending'] -= 1
+            result.update({'status': 'failed', 'error': f"Element write failed: {str(e)}"})
+            return
+        result['metrics'] = merge_metrics([result.get('metrics'), metrics.as_dict()])
+    
+    def _store_output(self, result: Dict) -> None:
+        """Queue a document's cleaned text for the output store's writer thread"""
+        store = self._get_store()
+        result['output_pending'] = result.get('output_pending', 0) + 1
+        self._store_pending[id(result)] = result
+        if self._output_error is not None:
+            result.pop('text')
+            return  # Failed by _mark_written with the rest
+        try:
+            store.put(result['store_id'], result['input'], result.pop('text'),
+                      {'pages': len(result.get('pages', []))}, token=result)
+        except Exception as e:
+            self._output_error = e
+            return
+        result['output'] = f"{store.index_path}#{result['store_id']}"
+    
+    def _mark_written(self, results: Dict) -> None:
+        """Record documents whose sink and store output is durable (or failed to write).
+        
+        Once the output store's writer has stopped, every document still
+        queued in it is recorded as failed and ``results['output_error']``
+        is set; the caller stops the batch.
+        """
+        committed = []
+        if self._sink:
+            committed.extend(self._sink.committed())
+        if self._store and self._output_error is None:
+            try:
+                committed.extend(self._store.committed())
+            except Exception as e:
+                self._output_error = e
+        for result, _ in committed:
+            self._store_pending.pop(id(result), None)
+        if self._output_error is not None:
+            if 'output_error' not in results:
+                logger.error(f"Output store failed: {str(self._output_error)}")
+                results['output_error'] = str(self._output_error)
+            # Nothing still queued in the store will be written
+            committed.extend((result, str(self._output_error)) for result in self._store_pending.values())
+            self._store_pending.clear()
+        for result, error in committed:
+            if error is not None and result['status'] == 'success':
+                result.update({'status': 'failed', 'error': f"Output write failed: {error}"})
+                results['processed'] -= 1
+                results['failed'] += 1
+                results['outcomes']['success'] -= 1
+                results['outcomes']['failed'] = results['outcomes'].get('failed', 0) + 1
+            result['output_pending'] -= 1
+            if result['output_pending'] == 0:
+                del result['output_pending']
+                if self.manifest is not None:
+                    self.manifest.mark_finished(result)
+    
+    def _finalize_document(self, merged: Dict) -> Dict:
+        """Clean, save and cache a document stitched from page-range tasks"""
+        if merged['status'] != 'success':
+            return merged
+        try:
+            text = merged.pop('text')
+            if not text.strip():
+                merged.update({'status': 'failed', 'error': 'No text extracted'})
+                return merged
+            from utils.metrics import StageMetrics, merge_metrics
+            metrics = StageMetrics()
+            cache = self._get_cache()
+            if cache is not None and merged.get('cache_key'):
+                with metrics.timer('cache_store'):
+                    cache.put(merged['cache_key'], text, _cache_metadata(merged))
+            if _uses_output_store(self.config):
+                merged['text'] = _clean_text(text, self._get_cleaner(), metrics)
+                merged['store_id'] = _doc_id(Path(merged['input']), merged.get('cache_key'))
+            else:
+                merged['output'] = str(_save_cleaned(Path(merged['input']), text, self._get_cleaner(), metrics))
+            merged['metrics'] = merge_metrics([merged.get('metrics'), metrics.as_dict()])
+        except Exception as e:
+            merged.update({'status': 'failed', 'error': str(e)})
+        return merged
+    
+    def _get_cache(self):
+        cache_config = self.config.get('cache', {})
+        if self._cache is None and cache_config.get('enabled', False):
+            from pipeline.cache import ExtractionCache
+            self._cache = ExtractionCache(
+                cache_config.get('path', 'data/cache/extraction.sqlite'),
+                max_size_mb=cache_config.get('max_size_mb', 1024)
+            )
+        return self._cache
+    
+    def _get_sink(self):
+        if self._sink is None:
+            self._sink = open_element_sink(self.config) or False  # False: disabled, do not retry
+        return self._sink or None
+    
+    def _get_store(self):
+        if self._store is None:
+            from postprocessing.output_store import open_output_store
+            self._store = open_output_store(self.config)
+        return self._store
+    
+    def _get_cleaner(self):
+        if self._cleaner is None:
+            from postprocessing.text_cleaner import TextCleaner
+            self._cleaner = TextCleaner(self.config.get('text_cleaning', {}))
+        return self._cleaner
 
 def load_config(config_path: str = None) -> dict:
     """Load configuration with defaults"""
     default_config = {
         'max_workers': os.cpu_count() - 1 or 1,
-        'chunk_size': 5,
         'text_extraction': {
             'min_text_length': 50,
             'dpi': 300,
             'poppler_path': None
+        },
+        'cache': {
+            'enabled': True,
+            'path': 'data/cache/extraction.sqlite',
+            'max_size_mb': 1024
+        },
+        'manifest': {
+            'path': 'data/out/logs/manifest.sqlite'
         }
     }
     
@@ -164,12 +816,39 @@ def load_config(config_path: str = None) -> dict:
         logger.error(f"Config error: {str(e)}")
         return default_config
 
+def _format_nodes(results: dict) -> str:
+    if 'nodes' not in results:
+        return ""
+    nodes = ', '.join(f"{node}={tasks}" for node, tasks in sorted(results['nodes'].items())) or 'none'
+    return f"Nodes (tasks): {nodes}\nLeases expired: {results.get('expired_leases', 0)}\n"
+
+def _format_store_stats(stats: dict) -> str:
+    if not stats:
+        return ""
+    return (
+        f"Output: {stats['documents']} documents in {stats['shards']} shards under {stats['path']} "
+        f"({stats['bytes_in'] / (1024 * 1024):.1f} MB -> {stats['bytes_out'] / (1024 * 1024):.1f} MB, "
+        f"{stats['errors']} write errors)\n"
+        + (f"Output writer stopped: {stats['error']}\n" if stats.get('error') else "")
+    )
+
 def main():
     parser = argparse.ArgumentParser(
         description="Large-scale PDF Processing Pipeline",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
-    parser.add_argument('--input', required=True, help="Input PDF file or directory")
+    parser.add_argument('--input', help="Input PDF file or directory")
+    parser.add_argument('--file-list', help="File with one PDF path per line ('-' for stdin), instead of --input")
+    parser.add_argument(
+        '--include',
+        action='append',
+        help="Glob of files to process under --input, repeatable (default: discovery.include from config)"
+    )
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        help="Glob of files or directories to skip, repeatable (default: discovery.exclude from config)"
+    )
     parser.add_argument('--config', default='configs/batch_config.yaml', help="Configuration file")
     parser.add_argument('--workers', type=int, help="Override max worker processes")
     parser.add_argument(
@@ -178,7 +857,34 @@ def main():
         default='standard',
         help="Extraction profile to use"
     )
+    parser.add_argument('--no-cache', action='store_true', help="Disable the extraction cache")
+    parser.add_argument('--refresh', action='store_true', help="Ignore cached results and re-extract every file")
+    parser.add_argument('--manifest', help="Job manifest path (default: manifest.path from config)")
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help="Only process files the manifest does not record as done"
+    )
+    parser.add_argument('--metrics-json', help="Write stage metrics as JSON (default: metrics.json_path from config)")
+    parser.add_argument(
+        '--metrics-prom',
+        help="Write stage metrics as a Prometheus textfile (default: metrics.prometheus_path from config)"
+    )
+    parser.add_argument('--serve', action='store_true', help="Run as a daemon with a warm worker pool and job API")
+    parser.add_argument('--host', help="Serve mode: address to listen on (default: serve.host from config)")
+    parser.add_argument('--port', type=int, help="Serve mode: TCP port (default: serve.port from config)")
+    parser.add_argument('--socket', help="Serve mode: listen on this Unix socket instead of TCP")
+    parser.add_argument('--queue', help="Shared queue file (default: distributed.queue from config)")
+    parser.add_argument('--queue-worker', action='store_true', help="Run as a worker node on the shared queue")
+    parser.add_argument('--node', help="Worker node name (default: <hostname>-<pid>)")
+    parser.add_argument(
+        '--startup-report',
+        action='store_true',
+        help="Print an import-time breakdown of the CLI and a worker, then exit"
+    )
     args = parser.parse_args()
+    if not (args.input or args.file_list or args.serve or args.startup_report or args.queue_worker):
+        parser.error("--input or --file-list is required unless --serve, --queue-worker or --startup-report is given")
 
     # Setup directories
     Path("data/raw").mkdir(parents=True, exist_ok=True)
@@ -188,54 +894,163 @@ def main():
     config = load_config(args.config)
     if args.workers:
         config['max_workers'] = args.workers
+    config['cache'] = {
+        **config.get('cache', {}),
+        'enabled': config.get('cache', {}).get('enabled', True) and not args.no_cache,
+        'refresh': args.refresh
+    }
     
-    # Get input files
-    input_path = Path(args.input)
-    if input_path.is_file():
-        pdf_files = [input_path]
-    else:
-        pdf_files = list(input_path.glob("*.pdf")) + list(input_path.glob("**/*.pdf"))
+    if args.startup_report:
+        from utils.startup import format_report, startup_report
+        report = startup_report({**config, 'profile': args.profile}, config.get('startup', {}).get('budget_ms'))
+        print(format_report(report))
+        sys.exit(1 if report['problems'] else 0)
     
-    if not pdf_files:
-        logger.error("No PDF files found")
-        sys.exit(1)
+    queue_path = args.queue or config.get('distributed', {}).get('queue')
+    if args.queue_worker:
+        if not queue_path:
+            parser.error("--queue-worker needs --queue or distributed.queue in the config")
+        from pipeline.work_queue import run_node
+        completed = run_node(queue_path, config, process_single_file, init_worker, task_failure,
+                             processes=config['max_workers'], owner=args.node)
+        logger.info(f"Node finished: {sum(completed.values())} tasks in {len(completed)} batches")
+        return
+    
+    if args.serve:
+        from pipeline.server import serve
+        # Served files are not batch entries; workers must not touch the batch manifest
+        serve_config = {key: value for key, value in config.items() if key != 'manifest'}
+        serve({**serve_config, 'profile': args.profile}, process_single_file, init_worker, task_failure,
+              host=args.host, port=args.port, socket_path=args.socket)
+        return
+    
+    # Input files are discovered while the batch runs
+    from pipeline.discovery import discover
+    config['discovery'] = {
+        **config.get('discovery', {}),
+        **({'include': args.include} if args.include else {}),
+        **({'exclude': args.exclude} if args.exclude else {})
+    }
+    pdf_files = discover(args.input, config, file_list=args.file_list)
+
+    # Job manifest: a fresh run starts over, --resume skips finished files
+    from pipeline.manifest import JobManifest
+    config['manifest'] = {
+        **config.get('manifest', {}),
+        'path': args.manifest or config.get('manifest', {}).get('path', 'data/out/logs/manifest.sqlite')
+    }
+    manifest = JobManifest(config['manifest']['path'])
+    if not args.resume:
+        manifest.reset()
 
-    logger.info(f"Starting batch processing of {len(pdf_files)} files with {config['max_workers']} workers")
+    logger.info(
+        f"Starting batch processing of {args.file_list or args.input} with {config['max_workers']} workers"
+        f"{' (resuming)' if args.resume else ''}"
+    )
 
     # Process files
     processor = PDFProcessor({
         **config,
         'profile': args.profile
-    })
+    }, manifest=manifest, resume=args.resume)
     start_time = time.time()
-    results = processor.process_batch(pdf_files)
+    if queue_path:
+        results = processor.process_distributed(pdf_files, queue_path)
+    else:
+        results = processor.process_batch(pdf_files)
     elapsed = time.time() - start_time
+    manifest_counts = manifest.counts()
+    manifest.close()
+    
+    if not results['discovered'] and not results['interrupted']:
+        logger.error("No PDF files found")
+        sys.exit(1)
+    
+    from pipeline.scheduler import tail_latency_summary
+    tail = tail_latency_summary(results['files'])
 
     # Generate report
     report = (
         f"\n{'='*40}\n"
         f"BATCH PROCESSING REPORT\n"
         f"{'='*40}\n"
-        f"Total files: {len(pdf_files)}\n"
+        f"Total files: {results['discovered']}\n"
+        f"Discovery: {pdf_files.stats['directories']} directories, {pdf_files.stats['duplicates']} duplicates, "
+        f"{pdf_files.stats['excluded']} excluded, {pdf_files.stats['errors']} unreadable\n"
         f"Processed: {results['processed']}\n"
         f"Failed: {results['failed']}\n"
+        f"Skipped (already done): {results['skipped_done']}\n"
+        f"Interrupted: {'yes' if results['interrupted'] else 'no'}\n"
+        f"Outcomes: {', '.join(f'{status}={count}' for status, count in sorted(results['outcomes'].items())) or 'none'}\n"
+        f"Workers recycled: {results.get('workers_recycled', 0)}\n"
+        f"Manifest: {manifest_counts['done']} done, {manifest_counts['failed']} failed, "
+        f"{manifest_counts['pending'] + manifest_counts['running']} unfinished\n"
+        f"Cache hits: {results['cache_hits']}\n"
+        f"{_format_store_stats(results.get('output_store'))}"
+        f"{_format_nodes(results)}"
         f"Elapsed time: {elapsed:.2f} seconds\n"
-        f"Files/sec: {len(pdf_files)/elapsed:.2f}\n"
+        f"Files/sec: {len(results['files'])/elapsed:.2f}\n"
+        f"Model load time: {results['model_load_seconds']:.2f} seconds "
+        f"({sum(results['warm_up'].values()):.2f} in warm-up of {len(results['warm_up'])} workers)\n"
+        f"OCR inference time: {results['ocr_inference_seconds']:.2f} seconds\n"
+        f"Preprocess time: {results['preprocess_seconds']:.2f} seconds\n"
+        f"Blank pages skipped: {results['blank_pages_skipped']}\n"
+        f"Tasks: {tail['tasks']} ({tail['split_documents']} documents split by page range)\n"
+        f"Task time p50/p95: {tail['p50_task_seconds']:.2f}/{tail['p95_task_seconds']:.2f} seconds\n"
+        f"Longest task: {tail['longest_task_seconds']:.2f} seconds "
+        f"(longest document unsplit: {tail['longest_document_seconds']:.2f} seconds)\n"
+        f"{'-'*40}\n"
+        f"Stage times per document:\n"
+        f"{processor.metrics.format_table()}\n"
         f"{'='*40}"
     )
     
     logger.info(report)
     
+    # Export stage metrics
+    metrics_config = config.get('metrics', {})
+    batch_stats = {
+        'batch_elapsed_seconds': round(elapsed, 3),
+        'batch_files_per_second': round(len(results['files']) / elapsed, 4) if elapsed else 0.0,
+        'last_run_timestamp_seconds': int(time.time())
+    }
+    try:
+        json_path = args.metrics_json or metrics_config.get('json_path')
+        if json_path:
+            processor.metrics.to_json(json_path, extra=batch_stats)
+        prom_path = args.metrics_prom or metrics_config.get('prometheus_path')
+        if prom_path:
+            processor.metrics.to_prometheus(prom_path, extra=batch_stats)
+    except Exception as e:
+        logger.error(f"Metrics export failed: {str(e)}")
+    
     # Save detailed report
     report_path = Path(f"data/out/logs/batch_report_{time.strftime('%Y%m%d_%H%M%S')}.txt")
     with open(report_path, 'w') as f:
         f.write(report + "\n\n")
         for file in results['files']:
             f.write(f"{file['input']} - {file['status']}\n")
-            if file['status'] == 'failed':
+            if file.get('pages'):
+                ocr_pages = [str(p['page'] + 1) for p in file['pages'] if p['route'] == 'ocr']
+                blank_pages = [str(p['page'] + 1) for p in file['pages'] if p['route'] == 'blank']
+                f.write(
+                    f"Pages: {len(file['pages'])} "
+                    f"(native: {len(file['pages']) - len(ocr_pages) - len(blank_pages)}, "
+                    f"OCR: {', '.join(ocr_pages) if ocr_pages else 'none'}, "
+                    f"blank skipped: {', '.join(blank_pages) if blank_pages else 'none'})\n"
+                )
+                ocr_dpi = [f"{p['page'] + 1}@{p['dpi']}" for p in file['pages'] if p.get('dpi')]
+                if ocr_pages and ocr_dpi:
+                    f.write(f"OCR DPI: {', '.join(ocr_dpi)}\n")
+                denoise = [f"{p['page'] + 1}:{p['preprocess']}" for p in file['pages'] if p.get('preprocess')]
+                if denoise:
+                    f.write(f"Preprocessing: {', '.join(denoise)}\n")
+            if file['status'] != 'success':
                 f.write(f"ERROR: {file['error']}\n")
     
-    sys.exit(0 if results['failed'] == 0 else 1)
+    if results['interrupted']:
+        sys.exit(130)
+    sys.exit(0 if results['failed'] == 0 and not results.get('output_error') else 1)
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()  # Required for Windows
@@ -1,36 +1,43 @@
 # src/extraction/layout_analysis.py
-from tkinter import Image
-import layoutparser as lp
 import logging
 import pymupdf
 import numpy as np
-import cv2
-from utils.config_loader import config
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 from preprocessing.image_tools import enhance_image
-from preprocessing.pdf_to_image import convert_pdf_to_images
+from preprocessing.pdf_to_image import convert_pdf_to_images, render_page_bgr
+from extraction.ocr_engines import get_registry
 
 logger = logging.getLogger(__name__)
 
+# Fields an element can carry; 'page' is always included
+LAYOUT_FIELDS = ('type', 'bbox', 'text', 'block', 'lines', 'spans')
+DEFAULT_FIELDS = ('type', 'bbox', 'text')
+# Fields that need per-span detail, i.e. "dict" extraction instead of "blocks"
+SPAN_FIELDS = frozenset({'lines', 'spans'})
 
-def detect_layout_elements(image, config=None):
+
+def detect_layout_elements(image, config=None, stream: bool = False, fields: Optional[Iterable[str]] = None):
     """Detect layout elements in an image or PDF path.
     
     Args:
         image: Image array or path to PDF file
         config: Optional configuration dictionary
+        stream: For native PDFs, return a generator yielding elements page
+            by page instead of a list (see iter_layout_elements)
+        fields: Element fields to produce for native PDFs (default: type,
+            bbox, text)
     
     Returns:
-        List of detected layout elements
+        List (or, with ``stream``, iterator) of detected layout elements
     """
     elements = []
     
     try:
         if isinstance(image, str):  # PDF path
             if config and config.get('layout', {}).get('model') == 'donut':
-                return _process_donut_layout(image)
-            else:
-                doc = pymupdf.open(image)
-                return _process_pymupdf_layout(doc)
+                return _process_donut_layout(image, config)
+            elements = iter_layout_elements(image, fields=fields or DEFAULT_FIELDS)
+            return elements if stream else list(elements)
         else:  # Image array
             # Example PyMuPDF processing
             layout = {
@@ -46,32 +53,144 @@ def detect_layout_elements(image, config=None):
     
     return elements
 
-def _process_pymupdf_layout(doc):
-    """Process native PDF layout using PyMuPDF"""
-    elements = []
-    for page in doc:
-        blocks = page.get_text("dict").get("blocks", [])
-        for block in blocks:
-            elements.append({
-                "type": "text" if block["type"] == 0 else "image",
-                "bbox": block["bbox"],
-                "text": block.get("text", "")
-            })
-    return elements
+def iter_layout_elements(
+    pdf,
+    fields: Iterable[str] = DEFAULT_FIELDS,
+    page_range: Optional[Tuple[int, int]] = None
+) -> Iterator[Dict]:
+    """Yield the text and image blocks of a native PDF, one page at a time.
+
+    ``pdf`` is a path or an open document; ``page_range`` is 0-based
+    [start, end). Each element has ``page`` plus the requested ``fields``:
 
-def _process_donut_layout(pdf_path):
-    """Process scanned PDFs using Donut model"""
-    model = lp.AutoLayoutModel("donut")
-    images = convert_pdf_to_images(pdf_path)  # From your preprocessing module
+    - ``type``: 'text' or 'image'
+    - ``bbox``: (x0, y0, x1, y1) in PDF points
+    - ``text``: block text ('' for images)
+    - ``block``: block number on the page
+    - ``lines``: [{'bbox', 'text'}] per line
+    - ``spans``: [{'bbox', 'text', 'font', 'size', 'flags', 'color'}] per span
+
+    Without ``lines`` or ``spans`` the cheaper "blocks" extraction is used;
+    "dict" extraction (span and font structures) only runs when they are
+    asked for, and then without image payloads, whose bboxes come from the
+    page's image info instead. Only one page's blocks are alive at a time,
+    and a document opened here is closed when the generator finishes or is
+    closed.
+    """
+    fields = frozenset(fields)
+    unknown = fields.difference(LAYOUT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown layout fields: {', '.join(sorted(unknown))}")
+
+    doc = pymupdf.open(pdf) if isinstance(pdf, str) else pdf
+    try:
+        start, end = page_range or (0, doc.page_count)
+        for page in doc.pages(start, min(end, doc.page_count)):
+            if fields & SPAN_FIELDS:
+                yield from _dict_elements(page, fields)
+            else:
+                yield from _block_elements(page, fields)
+    finally:
+        if doc is not pdf:
+            doc.close()
+
+
+def _block_elements(page, fields: frozenset) -> Iterator[Dict]:
+    """Elements from "blocks" extraction: (x0, y0, x1, y1, text, block_no, type) tuples"""
+    for x0, y0, x1, y1, text, block_no, block_type in page.get_text("blocks"):
+        element = {'page': page.number}
+        if 'type' in fields:
+            element['type'] = 'text' if block_type == 0 else 'image'
+        if 'bbox' in fields:
+            element['bbox'] = (x0, y0, x1, y1)
+        if 'text' in fields:
+            element['text'] = text if block_type == 0 else ''
+        if 'block' in fields:
+            element['block'] = block_no
+        yield element
+
+
+def _dict_elements(page, fields: frozenset) -> Iterator[Dict]:
+    """Elements from "dict" extraction, with line and span detail"""
+    flags = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+    blocks = page.get_text("dict", flags=flags)["blocks"]
+    for block in blocks:
+        lines = [
+            {'bbox': line['bbox'], 'text': "".join(span['text'] for span in line['spans']), 'spans': line['spans']}
+            for line in block.get('lines', [])
+        ]
+        element = {'page': page.number}
+        if 'type' in fields:
+            element['type'] = 'text'
+        if 'bbox' in fields:
+            element['bbox'] = tuple(block['bbox'])
+        if 'text' in fields:
+            element['text'] = "\n".join(line['text'] for line in lines)
+        if 'block' in fields:
+            element['block'] = block['number']
+        if 'lines' in fields:
+            element['lines'] = [{'bbox': line['bbox'], 'text': line['text']} for line in lines]
+        if 'spans' in fields:
+            element['spans'] = [
+                {key: span[key] for key in ('bbox', 'text', 'font', 'size', 'flags', 'color')}
+                for line in lines for span in line['spans']
+            ]
+        yield element
+    for number, info in enumerate(page.get_image_info(), start=len(blocks)):
+        element = {'page': page.number}
+        if 'type' in fields:
+            element['type'] = 'image'
+        if 'bbox' in fields:
+            element['bbox'] = tuple(info['bbox'])
+        if 'text' in fields:
+            element['text'] = ''
+        if 'block' in fields:
+            element['block'] = number
+        if 'lines' in fields:
+            element['lines'] = []
+        if 'spans' in fields:
+            element['spans'] = []
+        yield element
+
+def _process_donut_layout(pdf_path, config=None):
+    """Layout of a scanned PDF with the worker's cached layout model.
+
+    Pages are rendered at ``layout.layout_dpi`` (default ``layout.dpi``) and
+    handed to the model ``layout.batch_size`` at a time. When layout runs on
+    a downscaled render, the detected boxes are scaled back to ``layout.dpi``
+    pixel coordinates.
+    """
+    layout_config = (config or {}).get('layout', {})
+    dpi = layout_config.get('dpi', 200)
+    layout_dpi = layout_config.get('layout_dpi') or dpi
+    batch_size = max(1, layout_config.get('batch_size', 4))
+    model = get_registry(config).get('layout')  # Loaded (and warmed up) once per worker and layout config
     layouts = []
-    for img in images:
-        np_img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-        layouts.extend(model.detect(np_img))
+    with pymupdf.open(pdf_path) as doc:
+        for first in range(0, doc.page_count, batch_size):
+            last = min(first + batch_size, doc.page_count)
+            images = [render_page_bgr(doc[num], layout_dpi) for num in range(first, last)]
+            for layout in model.detect_batch(images):
+                layouts.extend(_scale_blocks(layout, dpi / layout_dpi))
     return layouts
 
+
+def _scale_blocks(layout, factor: float) -> list:
+    """Layout blocks with coordinates multiplied by ``factor``"""
+    if factor == 1:
+        return list(layout)
+    scaled = []
+    for block in layout:
+        if hasattr(block, 'scale'):  # layoutparser TextBlock
+            scaled.append(block.scale(factor))
+        else:
+            scaled.append({**block, 'bbox': [v * factor for v in block['bbox']]})
+    return scaled
+
 # Step 2: Layout Analysis
 def analyze_layout(image: np.ndarray, config: dict) -> list:
     """Robust layout analysis with error handling"""
+    import cv2
     try:
         # Convert pure white background to transparent
         if np.mean(image) > 250:  # Mostly white
@@ -92,4 +211,4 @@ def analyze_layout(image: np.ndarray, config: dict) -> list:
 
 
 # Explicitly export the public function
-__all__ = ['detect_layout_elements']
\ No newline at end of file
+__all__ = ['detect_layout_elements', 'iter_layout_elements', 'LAYOUT_FIELDS']
\ No newline at end of file
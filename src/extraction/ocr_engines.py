@@ -0,0 +1,309 @@
+# src/extraction/ocr_engines.py
+"""Worker-lifetime registry for OCR and layout engines.
+
+Loading EasyOCR or a layout model takes seconds and hundreds of MB, so each
+worker process keeps a single EngineRegistry that loads every engine on
+first use and hands the same instance to all later pages and files.
+Engines whose handles are not thread-safe (the Tesseract backend) are
+leased from a per-worker pool instead: each OCR thread borrows a handle
+for one call and returns it, so a worker holds as many handles as it ever
+ran OCR threads at once, however many documents or stage threads come
+and go.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Engines leased for exclusive use from a per-worker pool rather than shared
+POOLED_ENGINES = {'tesseract'}
+# Config sections the engine loaders read
+ENGINE_SECTIONS = ('tesseract', 'easyocr', 'layout', 'paths')
+
+
+class EngineRegistry:
+    """Lazily loads OCR/layout engines once and reuses them"""
+
+    def __init__(self, config: Optional[dict] = None):
+        self.config = config or {}
+        self.load_times: Dict[str, float] = {}  # Seconds spent loading each engine
+        self._engines: Dict[str, Any] = {}
+        self._pools: Dict[str, List[Any]] = {}  # Loaded instances of pooled engines
+        self._idle: Dict[str, List[Any]] = {}
+        # Re-entrant: get() holds it while _load() records the load time
+        self._lock = threading.RLock()
+        self._loaders = {
+            'tesseract': self._load_tesseract,
+            'easyocr': self._load_easyocr,
+            'layout': self._load_layout
+        }
+
+    def get(self, name: str) -> Any:
+        """Return the named shared engine, loading it on first use"""
+        if name in POOLED_ENGINES:
+            raise ValueError(f"The {name} engine is not thread-safe; use lease()")
+        if name not in self._engines:
+            with self._lock:
+                if name not in self._engines:
+                    self._engines[name] = self._load(name)
+        return self._engines[name]
+
+    @contextmanager
+    def lease(self, name: str) -> Iterator[Any]:
+        """Exclusive use of an engine instance, loading one only if all are busy.
+
+        Shared engines are simply handed out as with get().
+        """
+        if name not in POOLED_ENGINES:
+            yield self.get(name)
+            return
+        with self._lock:
+            idle = self._idle.setdefault(name, [])
+            engine = idle.pop() if idle else None
+        if engine is None:
+            engine = self._load(name)
+            with self._lock:
+                self._pools.setdefault(name, []).append(engine)
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                self._idle[name].append(engine)
+
+    def _load(self, name: str) -> Any:
+        if name not in self._loaders:
+            raise KeyError(f"Unknown engine: {name}")
+        start = time.perf_counter()
+        engine = self._loaders[name]()
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.load_times[name] = self.load_times.get(name, 0.0) + elapsed
+        logger.info(f"Loaded {name} engine in {elapsed:.2f}s")
+        return engine
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._engines or bool(self._pools.get(name))
+
+    def total_load_time(self) -> float:
+        """Total seconds this registry has spent loading engines"""
+        return sum(self.load_times.values())
+
+    def warm_up(self, names) -> None:
+        """Load the given engines ahead of the first page"""
+        for name in names:
+            try:
+                with self.lease(name):
+                    pass
+            except Exception as e:
+                logger.warning(f"Warm-up of {name} engine failed: {str(e)}")
+
+    def close(self) -> None:
+        """Release pooled engine handles (e.g. End() the Tesseract APIs)"""
+        with self._lock:
+            pools, self._pools, self._idle = self._pools, {}, {}
+        for engines in pools.values():
+            for engine in engines:
+                if hasattr(engine, 'close'):
+                    engine.close()
+
+    def _load_tesseract(self):
+        """In-process tesserocr handle if available, else the pytesseract subprocess path"""
+        tesseract_config = self.config.get('tesseract', {})
+        backend = tesseract_config.get('backend', 'auto')
+        lang = tesseract_config.get('lang', 'eng')
+        if backend in ('auto', 'tesserocr'):
+            try:
+                return TesserocrBackend(lang=lang, tessdata_path=tesseract_config.get('tessdata_path'))
+            except Exception as e:
+                if backend == 'tesserocr':
+                    raise
+                logger.info(f"tesserocr unavailable, using pytesseract: {str(e)}")
+        return PytesseractBackend(lang=lang, tesseract_cmd=self.config.get('paths', {}).get('tesseract_path'))
+
+    def _load_easyocr(self):
+        from easyocr import Reader
+        ocr_config = self.config.get('easyocr', {})
+        return Reader(ocr_config.get('languages', ['en']), gpu=ocr_config.get('gpu', True))
+
+    def _load_layout(self):
+        import layoutparser as lp
+        layout_config = self.config.get('layout', {})
+        model = LayoutModel(
+            lp.AutoLayoutModel(layout_config.get('model', 'donut')),
+            threads=layout_config.get('threads')
+        )
+        if layout_config.get('warm_up', True):
+            model.warm_up(layout_config.get('warm_up_size', (1100, 850)))
+        return model
+
+
+class LayoutModel:
+    """A loaded layout model with thread-limited, batched inference.
+
+    ``threads`` caps the intra-op threads of torch-based models so several
+    workers on one CPU node do not oversubscribe it. detect_batch runs a list
+    of pages in one forward pass when the model allows it: models exposing
+    their own detect_batch, or layoutparser's Detectron2 models, whose
+    predictor takes a list of inputs. Other models fall back to one detect
+    call per page.
+    """
+
+    def __init__(self, model: Any, threads: Optional[int] = None):
+        self.model = model
+        self.threads = threads
+        if threads:
+            try:
+                import torch
+                torch.set_num_threads(threads)
+            except ImportError:
+                pass
+
+    def detect(self, image) -> Any:
+        return self.model.detect(image)
+
+    def detect_batch(self, images: Sequence) -> List[Any]:
+        """Layouts for several page images, in order"""
+        if hasattr(self.model, 'detect_batch'):
+            return list(self.model.detect_batch(images))
+        predictor = getattr(self.model, 'model', None)
+        if len(images) > 1 and hasattr(predictor, 'aug') and hasattr(self.model, 'gather_output'):
+            return self._detectron2_batch(predictor, images)
+        return [self.model.detect(image) for image in images]
+
+    def warm_up(self, size=(1100, 850)) -> None:
+        """One inference on a blank page, so lazy initialisation happens before the first document"""
+        import numpy as np
+        start = time.perf_counter()
+        self.model.detect(np.full((size[0], size[1], 3), 255, dtype=np.uint8))
+        logger.info(f"Layout model warm-up took {time.perf_counter() - start:.2f}s")
+
+    def _detectron2_batch(self, predictor, images: Sequence) -> List[Any]:
+        """DefaultPredictor.__call__ for a list of images in a single forward pass"""
+        import torch
+        inputs = []
+        for image in images:
+            if hasattr(self.model, 'image_preprocessing'):
+                image = self.model.image_preprocessing(image)
+            if predictor.input_format == 'RGB':
+                image = image[:, :, ::-1]
+            height, width = image.shape[:2]
+            transformed = predictor.aug.get_transform(image).apply_image(image)
+            inputs.append({
+                'image': torch.as_tensor(transformed.astype('float32').transpose(2, 0, 1)),
+                'height': height,
+                'width': width
+            })
+        with torch.no_grad():
+            outputs = predictor.model(inputs)
+        return [self.model.gather_output(output) for output in outputs]
+
+
+class PytesseractBackend:
+    """Tesseract via pytesseract: one subprocess and temp image per call"""
+
+    name = 'pytesseract'
+
+    def __init__(self, lang: str = 'eng', tesseract_cmd: Optional[str] = None):
+        import pytesseract
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self._pytesseract = pytesseract
+        self.lang = lang
+
+    def image_to_string(self, image, psm: int = 6, variables: Optional[Dict[str, str]] = None) -> str:
+        config = f'--psm {psm}'
+        for key, value in (variables or {}).items():
+            config += f' -c {key}={value}'
+        return self._pytesseract.image_to_string(image, lang=self.lang, config=config)
+
+
+class TesserocrBackend:
+    """Tesseract in-process via tesserocr.
+
+    Keeps one TessBaseAPI handle (traineddata loaded once) and passes the
+    numpy buffer straight to SetImageBytes, so no temp file, PNG encode or
+    process spawn happens per page. A handle is not thread-safe; the
+    registry leases each backend to one thread at a time.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, lang: str = 'eng', tessdata_path: Optional[str] = None):
+        import tesserocr
+        kwargs = {'lang': lang}
+        if tessdata_path:
+            kwargs['path'] = tessdata_path
+        self._tesserocr = tesserocr
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        self._variables: Dict[str, str] = {}
+
+    def image_to_string(self, image, psm: int = 6, variables: Optional[Dict[str, str]] = None) -> str:
+        import numpy as np
+        image = np.ascontiguousarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        self.api.SetPageSegMode(psm)
+        variables = variables or {}
+        # Reset variables left over from a previous call, then apply this call's
+        for key in self._variables.keys() - variables.keys():
+            self.api.SetVariable(key, '')
+        for key, value in variables.items():
+            self.api.SetVariable(key, value)
+        self._variables = dict(variables)
+
+        self.api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        try:
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
+
+    def close(self) -> None:
+        self.api.End()
+
+
+_registry: Optional[EngineRegistry] = None
+_registries: Dict[str, EngineRegistry] = {}  # Engine settings -> registry, for configs other than _registry's
+
+
+def _engine_settings(config: Optional[dict]) -> str:
+    return json.dumps({section: (config or {}).get(section) for section in ENGINE_SECTIONS},
+                      sort_keys=True, default=str)
+
+
+def init_worker(config: Optional[dict] = None) -> EngineRegistry:
+    """Create this process's registry; used as a multiprocessing.Pool initializer"""
+    global _registry
+    from multiprocessing.util import Finalize
+    _registry = EngineRegistry(config)
+    _registry.warm_up((config or {}).get('warm_engines', []))
+    # Ends the pooled handles when the worker exits normally (including recycling)
+    Finalize(_registry, _registry.close, exitpriority=5)
+    return _registry
+
+
+def get_registry(config: Optional[dict] = None) -> EngineRegistry:
+    """Return this process's registry, creating one from ``config`` if needed.
+
+    If ``config`` asks for other engine settings than the process's
+    registry was built with (e.g. a caller outside a worker), a registry
+    for those settings is created and kept for later calls instead.
+    """
+    global _registry
+    if _registry is None:
+        _registry = EngineRegistry(config)
+    if config is None or config is _registry.config:
+        return _registry
+    settings = _engine_settings(config)
+    if settings == _engine_settings(_registry.config):
+        return _registry
+    if settings not in _registries:
+        _registries[settings] = EngineRegistry(config)
+    return _registries[settings]
+
+
+__all__ = ['EngineRegistry', 'POOLED_ENGINES', 'ENGINE_SECTIONS', 'LayoutModel', 'PytesseractBackend', 'TesserocrBackend', 'init_worker', 'get_registry']
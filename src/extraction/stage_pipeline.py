@@ -0,0 +1,138 @@
+# src/extraction/stage_pipeline.py
+"""Bounded-queue thread pipeline for overlapping per-page work.
+
+Rendering (poppler/PyMuPDF), OpenCV preprocessing (which releases the GIL)
+and Tesseract (a subprocess or C++ call) spend most of their time outside
+the interpreter, so running them as separate stages lets page N+1 render
+while page N is being OCR'd. Every queue between stages holds at most
+``depth`` items, which bounds how many pages are in memory at once.
+"""
+import logging
+import os
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def plan_stage_threads(config: dict) -> Dict[str, int]:
+    """Resolve stage thread counts from the ``ocr_pipeline`` config section.
+
+    In ``auto`` mode each worker gets cpu_count // max_workers cores so the
+    outer process pool and the stage threads together do not oversubscribe
+    the machine; one core per worker disables the stage threads entirely.
+    """
+    pipeline_config = config.get('ocr_pipeline', {})
+    mode = pipeline_config.get('enabled', 'auto')
+    if mode in (False, 'false'):
+        return {'preprocess': 0, 'ocr': 0}
+
+    if mode == 'auto':
+        workers = max(1, int(config.get('max_workers', 1) or 1))
+        budget = max(1, (os.cpu_count() or 1) // workers)
+        if budget < 2:
+            return {'preprocess': 0, 'ocr': 0}
+        # The render stage is the source thread; split the rest between the others
+        default_preprocess = max(1, (budget - 1) // 2)
+        default_ocr = max(1, budget - 1 - default_preprocess)
+    else:
+        default_preprocess = default_ocr = 1
+    return {
+        'preprocess': pipeline_config.get('preprocess_threads', default_preprocess),
+        'ocr': pipeline_config.get('ocr_threads', default_ocr)
+    }
+
+
+def run_stages(source: Iterable, stages: List[Tuple[Callable, int]], depth: int = 2) -> Iterator:
+    """Run items from ``source`` through ``stages`` and yield the final outputs.
+
+    ``source`` is consumed by its own thread; each stage is a (function,
+    thread count) pair. Outputs arrive in completion order, not source order.
+    The first exception raised by the source or any stage stops the pipeline
+    and is re-raised to the caller.
+    """
+    depth = max(1, depth)
+    queues = [queue.Queue(maxsize=depth) for _ in range(len(stages) + 1)]
+    stop = threading.Event()
+
+    def put(q: queue.Queue, item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def feed():
+        try:
+            for item in source:
+                if not put(queues[0], item):
+                    return
+        except BaseException as e:
+            put(queues[-1], _Failure(e))
+        finally:
+            for _ in range(stages[0][1] if stages else 1):
+                put(queues[0], _DONE)
+
+    def work(index: int, func: Callable, remaining: List[int], lock: threading.Lock):
+        inbox, outbox = queues[index], queues[index + 1]
+        try:
+            while not stop.is_set():
+                try:
+                    item = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                try:
+                    result = func(item)
+                except BaseException as e:
+                    put(queues[-1], _Failure(e))
+                    return
+                if not put(outbox, result):
+                    return
+        finally:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                # The last thread of a stage tells every downstream thread to stop
+                downstream = stages[index + 1][1] if index + 1 < len(stages) else 1
+                for _ in range(downstream):
+                    put(outbox, _DONE)
+
+    threads = [threading.Thread(target=feed, name='stage-source', daemon=True)]
+    for index, (func, count) in enumerate(stages):
+        remaining, lock = [count], threading.Lock()
+        threads.extend(
+            threading.Thread(target=work, args=(index, func, remaining, lock),
+                             name=f'stage-{index}-{n}', daemon=True)
+            for n in range(count)
+        )
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+
+__all__ = ['run_stages', 'plan_stage_threads']
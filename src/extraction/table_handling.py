@@ -1,6 +1,7 @@
 import re
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -51,8 +52,153 @@ def parse_table(text: str) -> Optional[List[List[str]]]:
         delim = max(['|', ',', '\t'], 
                    key=lambda d: first_line.count(d))
         
-        return [re.split(fr'{delim}+', line.strip()) for line in lines]
+        return [re.split(fr'{re.escape(delim)}+', line.strip()) for line in lines]
     
     except Exception as e:
         logger.warning(f"Table parsing failed: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+
+def extract_page_tables(page, **options) -> List[Dict]:
+    """Tables on a PyMuPDF page, found from its word boxes.
+
+    See detect_tables_from_words for ``options`` and the table format.
+    """
+    tables = detect_tables_from_words(page.get_text("words"), **options)
+    for table in tables:
+        table['page'] = page.number
+    return tables
+
+
+def detect_tables_from_words(
+    words: Sequence,
+    min_rows: int = 3,
+    min_cols: int = 2,
+    row_tolerance: float = 0.5,
+    gap_factor: float = 1.0,
+    straddle: int = 0,
+    max_gap_rows: int = 1
+) -> List[Dict]:
+    """Find tables in ``page.get_text("words")`` output by geometry alone.
+
+    Words are grouped into rows by baseline (within ``row_tolerance`` x the
+    median word height) and, within a row, into segments split by gaps wider
+    than ``gap_factor`` x that height. Runs of at least ``min_rows`` rows with
+    ``min_cols`` or more segments are table regions; a run may bridge up to
+    ``max_gap_rows`` rows of wrapped text. Column separators are the x
+    positions crossed by at most ``straddle`` segments, so whitespace-aligned
+    statements need no ruling lines; raise it to let a spanning header cross
+    column gaps (it is a count, not a share of rows, so sparse columns such
+    as credits are not mistaken for gaps). Everything but the final cell
+    assembly is vectorised, and the cost is dominated by one sort of the
+    word coordinates.
+
+    Returns one dict per table: ``bbox``, ``columns`` (separator x positions)
+    and ``cells``, a rows x columns list of ``{'text', 'bbox'}`` dicts with
+    ``bbox`` None for empty cells.
+    """
+    count = len(words)
+    if count < min_rows * min_cols:
+        return []
+    boxes = np.array([word[:4] for word in words], dtype=np.float64)
+    x0, y0, x1, y1 = boxes.T
+    height = float(np.median(y1 - y0)) or 1.0
+
+    # Rows: consecutive baselines closer than the tolerance
+    order = np.argsort(y1, kind='stable')
+    row_of = np.empty(count, dtype=np.int64)
+    row_of[order] = np.concatenate(([0], np.cumsum(np.diff(y1[order]) > row_tolerance * height)))
+
+    # Segments: words in reading order, split at wide gaps and row changes
+    order = np.lexsort((x0, row_of))
+    rows, sx0, sx1 = row_of[order], x0[order], x1[order]
+    new_segment = np.ones(count, dtype=bool)
+    new_segment[1:] = (rows[1:] != rows[:-1]) | (sx0[1:] - sx1[:-1] > gap_factor * height)
+    starts = np.flatnonzero(new_segment)
+    segment_row = rows[starts]
+    segment_box = np.column_stack([
+        np.minimum.reduceat(sx0, starts),
+        np.minimum.reduceat(y0[order], starts),
+        np.maximum.reduceat(sx1, starts),
+        np.maximum.reduceat(y1[order], starts)
+    ])
+    words_in_order = [words[i][4] for i in order]
+    ends = np.append(starts[1:], count)
+    segment_text = [" ".join(words_in_order[a:b]) for a, b in zip(starts.tolist(), ends.tolist())]
+
+    # Table regions: runs of multi-segment rows, bridging short gaps
+    multi = np.bincount(segment_row, minlength=int(row_of.max()) + 1) >= min_cols
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], multi.astype(np.int8), [0]))))
+    runs = []
+    for start, end in edges.reshape(-1, 2).tolist():
+        if runs and start - runs[-1][1] <= max_gap_rows:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+
+    tables = []
+    for start, end in runs:
+        if end - start < min_rows:
+            continue
+        first, last = np.searchsorted(segment_row, [start, end])
+        table = _build_table(segment_row[first:last] - start, segment_box[first:last],
+                             segment_text[first:last], end - start, min_cols, straddle)
+        if table is not None:
+            tables.append(table)
+    return tables
+
+
+def _build_table(rows: np.ndarray, boxes: np.ndarray, texts: List[str], row_count: int,
+                 min_cols: int, straddle: int) -> Optional[Dict]:
+    """Column separators and the cell grid of one table region"""
+    left = float(boxes[:, 0].min())
+    starts = np.floor(boxes[:, 0] - left).astype(np.int64)
+    stops = np.ceil(boxes[:, 2] - left).astype(np.int64)
+    # Segments covering each 1pt column of the region
+    width = int(stops.max())
+    coverage = np.zeros(width + 1, dtype=np.int64)
+    np.add.at(coverage, starts, 1)
+    np.add.at(coverage, stops, -1)
+    free = np.cumsum(coverage)[:width] <= straddle
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], free.astype(np.int8), [0]))))
+    gap_starts, gap_ends = edges[0::2], edges[1::2]
+    # Runs at the region edges (allowed by ``straddle``) are margins, not gaps
+    inner = (gap_starts > 0) & (gap_ends < width)
+    gap_starts, gap_ends = gap_starts[inner], gap_ends[inner]
+    gaps = gap_starts.size
+    if gaps + 1 < min_cols:
+        return None
+    separators = left + (gap_starts + gap_ends) / 2.0
+
+    columns = np.searchsorted(separators, (boxes[:, 0] + boxes[:, 2]) / 2.0)
+    cell_text = {}
+    cell_box = {}
+    for row, column, box, text in zip(rows.tolist(), columns.tolist(), boxes.tolist(), texts):
+        key = (row, column)
+        if key in cell_text:
+            cell_text[key] += " " + text
+            previous = cell_box[key]
+            cell_box[key] = [min(previous[0], box[0]), min(previous[1], box[1]),
+                             max(previous[2], box[2]), max(previous[3], box[3])]
+        else:
+            cell_text[key] = text
+            cell_box[key] = box
+    cells = [
+        [
+            {'text': cell_text.get((row, column), ''),
+             'bbox': [round(v, 2) for v in cell_box[(row, column)]] if (row, column) in cell_box else None}
+            for column in range(gaps + 1)
+        ]
+        for row in range(row_count)
+    ]
+    bbox = [float(boxes[:, 0].min()), float(boxes[:, 1].min()), float(boxes[:, 2].max()), float(boxes[:, 3].max())]
+    return {
+        'bbox': [round(v, 2) for v in bbox],
+        'columns': [round(float(x), 2) for x in separators],
+        'cells': cells
+    }
+
+
+def table_to_rows(table: Dict) -> List[List[str]]:
+    """Cell texts of a geometry table, in the format detect_tables returns"""
+    return [[cell['text'] for cell in row] for row in table['cells']]
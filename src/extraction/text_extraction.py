@@ -1,29 +1,167 @@
 import logging
 import os
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Iterator, List, Dict, Optional, Tuple
 import numpy as np
-from PIL import Image
 import cv2
 import fitz
-from pdf2image import convert_from_path
+from extraction.ocr_engines import EngineRegistry, get_registry
+from extraction.stage_pipeline import plan_stage_threads, run_stages
+from preprocessing.pdf_to_image import render_page_gray
+from preprocessing.dpi_planner import plan_page_dpi, probe_page
+from preprocessing.blank_detector import classify_blank
+from preprocessing.denoise_planner import apply_denoise, measure_page, plan_denoise
 
 logger = logging.getLogger(__name__)
 
+def classify_page(page, profile_config: dict) -> Tuple[Dict, str, list]:
+    """Route one page from text-layer coverage, image coverage and glyph count.
+
+    Returns the page's routing record, its text-layer text and its blocks.
+    """
+    page_area = abs(page.rect) or 1.0
+    blocks = page.get_text("blocks")
+    text = "".join(b[4] for b in blocks if b[6] == 0)
+    glyphs = sum(1 for ch in text if not ch.isspace())
+
+    text_area = sum(abs(fitz.Rect(b[:4]) & page.rect) for b in blocks if b[6] == 0)
+    image_area = sum(abs(fitz.Rect(info['bbox']) & page.rect) for info in page.get_image_info())
+    text_coverage = min(text_area / page_area, 1.0)
+    image_coverage = min(image_area / page_area, 1.0)
+
+    min_glyphs = profile_config.get('min_page_glyphs', 20)
+    ocr_image_coverage = profile_config.get('ocr_image_coverage', 0.5)
+    min_text_coverage = profile_config.get('min_text_coverage', 0.05)
+
+    if glyphs < min_glyphs:
+        # Nothing usable in the text layer: only worth OCR if there is an image to read
+        route = 'ocr' if image_coverage >= profile_config.get('min_image_coverage', 0.05) else 'native'
+    elif image_coverage >= ocr_image_coverage and text_coverage < min_text_coverage:
+        # Scanned page with a sparse overlay (stamp, header, page number)
+        route = 'ocr'
+    else:
+        route = 'native'
+
+    record = {
+        'page': page.number,
+        'route': route,
+        'glyphs': glyphs,
+        'text_coverage': round(text_coverage, 4),
+        'image_coverage': round(image_coverage, 4)
+    }
+    return record, text, blocks
+
+def thin_text_layer(pdf_path: str, config: dict) -> bool:
+    """Whether the whole document falls back to OCR for its glyph-poor pages.
+
+    True when no page needs OCR on its own and the text layer of all pages
+    together is shorter than ``min_text_length``. Reading stops at the
+    first OCR page or once enough text is found, usually on page one.
+    """
+    profile = config.get('profile', config.get('default_profile', 'standard'))
+    profile_config = config.get('profiles', {}).get(profile, {})
+    if profile == 'low_res' or profile_config.get('force_ocr', False):
+        return False  # Every page is OCR'd anyway
+    min_length = profile_config.get('min_text_length', 50)
+    texts = []
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            record, text, _ = classify_page(page, profile_config)
+            if record['route'] == 'ocr':
+                return False
+            texts.append(text)
+            if len("\n".join(texts).strip()) >= min_length:
+                return False
+    return True
+
 class TextExtractor:
-    def __init__(self, config: dict):
+    # Stage timings reported with every extract() result, in seconds
+    TIMING_KEYS = ('classify', 'render', 'preprocess', 'tesseract', 'easyocr', 'ocr_inference', 'model_load')
+
+    def __init__(self, config: dict, engines: Optional[EngineRegistry] = None):
         self.config = config
         self.profile = config.get('profile', config.get('default_profile', 'standard'))
         self.profile_config = config['profiles'].get(self.profile, {})
+        self.engines = engines or get_registry(config)
+        self.timings = dict.fromkeys(self.TIMING_KEYS, 0.0)
+        self.stage_threads = plan_stage_threads(config)
+        self._timing_lock = threading.Lock()
+        self._easyocr_lock = threading.Lock()
+        # Per-page records of the last extract(), merged into its page list
+        self._render_info = {}
+        self._preprocess_info = {}
+        self._blank_info = {}
+        # Layout elements (blocks with bboxes) are only kept for structured output
+        self.collect_elements = config.get('structured_output', {}).get('enabled', False)
+        self._page_layout = {}
         
     def extract_text(self, pdf_path: str) -> Optional[str]:
         """Main extraction method with profile handling"""
+        result = self.extract(pdf_path)
+        return result['text'] if result else None
+
+    def extract(self, pdf_path: str, page_range: Optional[Tuple[int, int]] = None,
+                thin_text: Optional[bool] = None) -> Optional[Dict]:
+        """Extract text with per-page native/OCR routing.
+
+        ``page_range`` limits extraction to 0-based pages [start, end); page
+        numbers in the result stay absolute. The thin-text-layer fallback is
+        a whole-document decision: pass ``thin_text`` from thin_text_layer()
+        so every slice of a split document routes its pages like an unsplit
+        run; it is computed here if omitted. Returns a dict with the merged
+        ``text`` and a ``pages`` list recording the route taken for every
+        page, or None if extraction failed. With structured output enabled
+        it also carries ``elements``, one dict per text/image block.
+        """
+        self.timings = dict.fromkeys(self.TIMING_KEYS, 0.0)
+        self._render_info = {}
+        self._preprocess_info = {}
+        self._blank_info = {}
+        self._page_layout = {}
+        load_time_before = self.engines.total_load_time()
         try:
-            if self._should_use_direct_extraction():
-                text = self._extract_with_pymupdf(pdf_path)
-                if text and self._validate_text(text):
-                    return text
-            
-            return self._extract_with_ocr(pdf_path)
+            start = time.perf_counter()
+            pages, native_text = self._classify_pages(pdf_path, page_range)
+            self.timings['classify'] = time.perf_counter() - start
+            if not pages:
+                return None
+
+            # Documents whose text layer is too thin overall fall back to OCR
+            # for every page that lacks glyphs (e.g. outlined/vector text)
+            if page_range is None:
+                thin_text = not any(p['route'] == 'ocr' for p in pages) and \
+                    not self._validate_text("\n".join(native_text.values()))
+            elif thin_text is None:
+                thin_text = thin_text_layer(pdf_path, self.config)
+            if thin_text:
+                for p in pages:
+                    if p['glyphs'] < self.profile_config.get('min_page_glyphs', 20):
+                        p['route'] = 'ocr'
+
+            ocr_pages = [p['page'] for p in pages if p['route'] == 'ocr']
+            ocr_text = self._extract_with_ocr(pdf_path, ocr_pages) if ocr_pages else {}
+            for p in pages:
+                p.update(self._render_info.get(p['page'], {}))
+                p.update(self._preprocess_info.get(p['page'], {}))
+                blank = self._blank_info.get(p['page'])
+                if blank:
+                    p.update(blank)
+                    if blank['ocr'] == 'skipped':
+                        p['route'] = 'blank'
+            self.timings['model_load'] = self.engines.total_load_time() - load_time_before
+
+            text = "\n".join(
+                ocr_text.get(p['page'], '') if p['route'] == 'ocr' else native_text.get(p['page'], '')
+                for p in pages
+            )
+            # An empty slice of a larger document is still a valid part
+            if not text.strip() and page_range is None:
+                return None
+            result = {'text': text, 'pages': pages, 'timings': dict(self.timings)}
+            if self.collect_elements:
+                result['elements'] = self._build_elements(pages, ocr_text)
+            return result
         except Exception as e:
             logger.error(f"Extraction failed: {str(e)}")
             return None
@@ -32,6 +170,62 @@ class TextExtractor:
         """Determine if direct text extraction should be attempted"""
         return self.profile != 'low_res' and not self.profile_config.get('force_ocr', False)
 
+    def _classify_pages(self, pdf_path: str, page_range: Optional[Tuple[int, int]] = None) -> Tuple[List[Dict], Dict[int, str]]:
+        """Route every page to native extraction or OCR.
+
+        Returns the per-page routing records and the native text of the pages
+        routed natively, keyed by 0-based page number.
+        """
+        direct = self._should_use_direct_extraction()
+        pages = []
+        native_text = {}
+        with fitz.open(pdf_path) as doc:
+            start, end = page_range or (0, doc.page_count)
+            for page in doc.pages(start, min(end, doc.page_count)):
+                if self.collect_elements:
+                    self._page_layout[page.number] = (tuple(page.rect), [])
+                if not direct:
+                    pages.append({'page': page.number, 'route': 'ocr', 'glyphs': 0,
+                                  'text_coverage': 0.0, 'image_coverage': 0.0})
+                    continue
+                record, text = self._classify_page(page)
+                pages.append(record)
+                if record['route'] == 'native':
+                    native_text[page.number] = text
+        return pages, native_text
+
+    def _classify_page(self, page) -> Tuple[Dict, str]:
+        """Classify one page, keeping its blocks if elements are collected"""
+        record, text, blocks = classify_page(page, self.profile_config)
+        if self.collect_elements:
+            self._page_layout[page.number] = (tuple(page.rect), blocks)
+        return record, text
+
+    def _build_elements(self, pages: List[Dict], ocr_text: Dict[int, str]) -> List[Dict]:
+        """Element dicts for the final routes: text-layer blocks, or one block per OCR'd page"""
+        elements = []
+        for p in pages:
+            rect, blocks = self._page_layout.get(p['page'], (None, []))
+            if p['route'] == 'native':
+                elements.extend({
+                    'page': p['page'],
+                    'type': 'text' if block[6] == 0 else 'image',
+                    'bbox': [round(v, 2) for v in block[:4]],
+                    'text': block[4] if block[6] == 0 else '',
+                    'confidence': None,
+                    'route': 'native'
+                } for block in blocks)
+            elif p['route'] == 'ocr' and ocr_text.get(p['page'], '').strip():
+                elements.append({
+                    'page': p['page'],
+                    'type': 'text',
+                    'bbox': [round(v, 2) for v in rect] if rect else None,
+                    'text': ocr_text[p['page']],
+                    'confidence': None,
+                    'route': 'ocr'
+                })
+        return elements
+
     def _extract_with_pymupdf(self, pdf_path: str) -> Optional[str]:
         """Direct text extraction for native PDFs"""
         try:
@@ -41,48 +235,192 @@ class TextExtractor:
             logger.warning(f"PyMuPDF extraction failed: {str(e)}")
             return None
 
-    def _extract_with_ocr(self, pdf_path: str) -> Optional[str]:
-        """OCR-based extraction with image preprocessing"""
+    def _extract_with_ocr(self, pdf_path: str, pages: Optional[List[int]] = None) -> Dict[int, str]:
+        """OCR-based extraction with image preprocessing.
+
+        Pages stream through render -> preprocess -> OCR. With stage threads
+        configured (see ``ocr_pipeline``) the three stages overlap, joined by
+        queues of ``ocr_pipeline.depth`` pages; otherwise pages go through one
+        at a time. Either way only a bounded number of pages is in memory.
+        Only the given 0-based pages are rendered; all pages if None.
+        Returns OCR text keyed by page number. A page that fails to render
+        or OCR fails the whole call, so no document is saved with pages
+        missing.
+        """
+        results = {}
         try:
-            images = self._pdf_to_images(pdf_path)
-            if not images:
-                return None
-                
-            processed_images = [self._preprocess_image(img) for img in images]
-            return self._run_ocr(processed_images)
+            images = self._iter_page_images(pdf_path, pages)
+            if self.stage_threads['preprocess'] or self.stage_threads['ocr']:
+                stages = [
+                    (lambda item: (item[0], self._preprocess_image(item[1], item[0])), self.stage_threads['preprocess'] or 1),
+                    (lambda item: (item[0], self._ocr_page(item[1], item[0])), self.stage_threads['ocr'] or 1)
+                ]
+                depth = self.config.get('ocr_pipeline', {}).get('depth', 2)
+                for num, text in run_stages(images, stages, depth=depth):
+                    results[num] = text
+            else:
+                for num, image in images:
+                    processed = self._preprocess_image(image, num)
+                    del image
+                    results[num] = self._ocr_page(processed, num)
         except Exception as e:
             logger.error(f"OCR pipeline failed: {str(e)}")
-            return None
+            raise
+        return results
 
-    def _pdf_to_images(self, pdf_path: str) -> List[np.ndarray]:
-        """Convert PDF to images with profile-specific settings"""
+    def _iter_page_images(self, pdf_path: str, pages: Optional[List[int]] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Lazily render PDF pages to grayscale images.
+
+        PyMuPDF renders each page straight into a single-channel pixmap that
+        the yielded array views without copying. A low-DPI probe of the page
+        is rendered first to screen out blank pages (``skip_blank_pages``)
+        and, with ``adaptive_dpi``, to pick the page's render DPI. If PyMuPDF
+        fails, the remaining pages go through pdf2image/poppler at the profile
+        DPI and are screened on a downscaled copy. The DPI used for each page
+        is recorded for the result. Yields (page number, image) pairs in page
+        order; skipped pages are not yielded.
+        """
         dpi = self.profile_config.get('dpi', 300)
+        probe_dpi = self.profile_config.get('probe_dpi', 100)
+        screen = self.profile_config.get('skip_blank_pages', True)
+        adaptive = self.profile_config.get('adaptive_dpi', False)
+        if pages is None:
+            with fitz.open(pdf_path) as doc:
+                pages = list(range(doc.page_count))
+
+        rendered = set()
+        if self.profile_config.get('renderer', 'pymupdf') == 'pymupdf':
+            try:
+                with fitz.open(pdf_path) as doc:
+                    for num in pages:
+                        start = time.perf_counter()
+                        page = doc[num]
+                        probe = probe_page(page, probe_dpi) if screen or adaptive else None
+                        if screen and self._screen_blank(num, probe, probe_dpi):
+                            rendered.add(num)
+                            self._add_timing('render', time.perf_counter() - start)
+                            continue
+                        if adaptive:
+                            plan = plan_page_dpi(page, self.profile_config, probe=probe)
+                        else:
+                            plan = {'dpi': dpi, 'dpi_reason': 'profile'}
+                        del probe
+                        image = render_page_gray(page, plan['dpi'])
+                        rendered.add(num)
+                        self._render_info[num] = plan
+                        self._add_timing('render', time.perf_counter() - start)
+                        yield num, image
+                return
+            except Exception as e:
+                logger.warning(f"PyMuPDF rendering failed, falling back to pdf2image: {str(e)}")
+
+        remaining = [num for num in pages if num not in rendered]
+        for num in remaining:
+            self._render_info[num] = {'dpi': dpi, 'dpi_reason': 'profile'}
+        start = time.perf_counter()
+        for num, image in self._iter_poppler_images(pdf_path, remaining, dpi):
+            skip = False
+            if screen:
+                scale = probe_dpi / dpi
+                probe = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                skip = self._screen_blank(num, probe, probe_dpi)
+            self._add_timing('render', time.perf_counter() - start)
+            if not skip:
+                yield num, image
+            start = time.perf_counter()
+
+    def _screen_blank(self, num: int, probe: np.ndarray, probe_dpi: int) -> bool:
+        """Record blank/near-blank pages; True if the page should not be OCR'd.
+
+        Near-blank pages (a signature line, a lone total) are OCR'd with a
+        single Tesseract pass and no denoising or EasyOCR, or skipped with
+        ``near_blank: skip``.
+        """
+        kind, stats = classify_blank(probe, probe_dpi, self.profile_config)
+        if kind is None:
+            return False
+        skip = kind == 'blank' or self.profile_config.get('near_blank', 'tesseract') == 'skip'
+        self._blank_info[num] = {'blank': kind, 'ocr': 'skipped' if skip else 'light', **stats}
+        return skip
+
+    def _iter_poppler_images(self, pdf_path: str, pages: List[int], dpi: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """Render pages with pdf2image/poppler.
+
+        Contiguous runs of the requested 0-based pages are rendered in poppler
+        calls of at most ``max_pages_in_flight`` pages.
+        """
+        from pdf2image import convert_from_path
+        batch_size = max(1, int(self.profile_config.get('max_pages_in_flight', 2)))
         try:
-            images = convert_from_path(
-                pdf_path,
-                dpi=dpi,
-                poppler_path=self.config.get('poppler_path'),
-                thread_count=1  # Safer for low-memory systems
-            )
-            return [np.array(img.convert('RGB')) for img in images]
+            for first, last in self._page_runs(pages):
+                for start in range(first, last + 1, batch_size):
+                    end = min(start + batch_size - 1, last)
+                    rendered = convert_from_path(
+                        pdf_path,
+                        dpi=dpi,
+                        first_page=start + 1,
+                        last_page=end + 1,
+                        poppler_path=self.config.get('poppler_path'),
+                        thread_count=1,  # Safer for low-memory systems
+                        grayscale=True
+                    )
+                    for num in range(start, start + len(rendered)):
+                        # Drop each PIL page as soon as its array exists
+                        yield num, np.asarray(rendered.pop(0))
         except Exception as e:
             logger.error(f"PDF to image conversion failed: {str(e)}")
-            return []
+            raise
+
+    @staticmethod
+    def _page_runs(pages: List[int]) -> List[Tuple[int, int]]:
+        """Group sorted 0-based page numbers into inclusive (first, last) runs"""
+        runs = []
+        for num in sorted(pages):
+            if runs and num == runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], num)
+            else:
+                runs.append((num, num))
+        return runs
 
-    def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
-        """Apply profile-specific image enhancements"""
-        # Convert to grayscale
-        processed = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    def _preprocess_image(self, image: np.ndarray, page_num: Optional[int] = None) -> np.ndarray:
+        """Apply profile-specific image enhancements.
+
+        With ``denoise: auto`` the filter is chosen per page from measured
+        noise, contrast and speckle; ``true`` always runs full-strength NLM.
+        The choice and its cost are recorded against ``page_num``.
+        """
+        start = time.perf_counter()
+        info = {}
+        # Renderers produce grayscale already; convert anything else
+        processed = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
         
         # Profile-specific processing
-        if self.profile == 'low_res':
+        if page_num in self._blank_info:
+            info['preprocess'] = 'none'  # Near-blank page kept for a light OCR pass
+        elif self.profile == 'low_res':
             processed = self._enhance_low_res(processed)
+            info['preprocess'] = 'low_res'
         else:
-            if self.profile_config.get('denoise', True):
+            denoise = self.profile_config.get('denoise', 'auto')
+            if denoise == 'auto':
+                stats = measure_page(processed)
+                method = plan_denoise(stats, self.profile_config)
+                processed = apply_denoise(processed, method, stats, self.profile_config)
+                info.update(stats)
+            elif denoise:
+                method = 'nlm_full'
                 processed = cv2.fastNlMeansDenoising(processed, h=30)
+            else:
+                method = 'none'
+            info['preprocess'] = method
             if self.profile_config.get('binarize', False):
                 _, processed = cv2.threshold(processed, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
         
+        elapsed = time.perf_counter() - start
+        self._add_timing('preprocess', elapsed)
+        if page_num is not None:
+            info['preprocess_seconds'] = round(elapsed, 3)
+            self._preprocess_info[page_num] = info
         return processed
 
     def _enhance_low_res(self, image: np.ndarray) -> np.ndarray:
@@ -110,30 +448,47 @@ class TextExtractor:
 
     def _run_ocr(self, images: List[np.ndarray]) -> str:
         """Run OCR with profile-specific settings"""
+        return "\n".join(self._ocr_page(img) for img in images)
+
+    def _ocr_page(self, img: np.ndarray, page_num: Optional[int] = None) -> str:
+        """OCR a single preprocessed page with the worker's warm engines"""
         try:
-            import pytesseract
-            from easyocr import Reader
-            
             ocr_engine = self.profile_config.get('ocr_engine', 'hybrid')
+            if page_num in self._blank_info and ocr_engine == 'hybrid':
+                ocr_engine = 'tesseract'  # Short text is expected; skip the EasyOCR fallback
             text = []
+            page_text = ''
             
-            for img in images:
-                if ocr_engine in ['tesseract', 'hybrid']:
-                    config = '--psm 6'
-                    if self.profile == 'low_res':
-                        config += ' -c tessedit_char_blacklist=||<>"\''
-                    page_text = pytesseract.image_to_string(img, config=config)
-                    text.append(page_text)
-                
-                if ocr_engine == 'hybrid' and len(page_text.strip()) < self.profile_config.get('min_text_length', 30):
-                    reader = Reader(['en'])
+            if ocr_engine in ['tesseract', 'hybrid']:
+                variables = {}
+                if self.profile == 'low_res':
+                    variables['tessedit_char_blacklist'] = '||<>"\''
+                with self.engines.lease('tesseract') as tesseract:
+                    start = time.perf_counter()
+                    page_text = tesseract.image_to_string(img, psm=6, variables=variables)
+                    self._add_timing('tesseract', time.perf_counter() - start)
+                text.append(page_text)
+            
+            if ocr_engine == 'easyocr' or (
+                ocr_engine == 'hybrid' and len(page_text.strip()) < self.profile_config.get('min_text_length', 30)
+            ):
+                reader = self.engines.get('easyocr')
+                start = time.perf_counter()
+                with self._easyocr_lock:  # One Reader shared by all OCR threads
                     results = reader.readtext(img)
-                    text.append(" ".join([res[1] for res in results]))
+                self._add_timing('easyocr', time.perf_counter() - start)
+                text.append(" ".join([res[1] for res in results]))
             
             return "\n".join(text)
         except Exception as e:
             raise RuntimeError(f"OCR failed: {str(e)}")
 
+    def _add_timing(self, key: str, seconds: float) -> None:
+        with self._timing_lock:
+            self.timings[key] += seconds
+            if key in ('tesseract', 'easyocr'):
+                self.timings['ocr_inference'] += seconds
+
     def _validate_text(self, text: str) -> bool:
         """Validate extracted text meets quality thresholds"""
         min_length = self.profile_config.get('min_text_length', 50)
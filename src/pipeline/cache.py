@@ -0,0 +1,203 @@
+# src/pipeline/cache.py
+"""Content-addressed cache of raw extraction results.
+
+Entries are keyed on the SHA-256 of the PDF bytes plus a hash of the
+effective extraction config, so renamed or copied files still hit and any
+profile change misses. The cache is a single SQLite file shared by all
+workers; least-recently-used entries are evicted once it grows past
+``max_size_mb``. The total entry size is kept as a running sum in a meta
+table, so a write only scans entries when eviction is due. The content hash of each file is remembered with its
+size and mtime, so a file seen before is looked up without reading it.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction output changes for the same input and config
+CACHE_VERSION = 2
+
+
+def file_hash(pdf_path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_hash(config: dict) -> str:
+    """Hash of the parts of the config that affect extracted text"""
+    profile = config.get('profile', config.get('default_profile', 'standard'))
+    effective = {
+        'version': CACHE_VERSION,
+        'profile': profile,
+        'profile_config': config.get('profiles', {}).get(profile, {}),
+        'text_extraction': config.get('text_extraction', {}),
+        'poppler_path': config.get('poppler_path'),
+        # Engine settings used by EngineRegistry to build the OCR engines
+        'tesseract': config.get('tesseract', {}),
+        'tesseract_path': config.get('paths', {}).get('tesseract_path'),
+        'easyocr': config.get('easyocr', {})
+    }
+    encoded = json.dumps(effective, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed LRU cache of raw extracted text and metadata"""
+
+    def __init__(self, path: str, max_size_mb: float = 1024):
+        self.path = Path(path)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " text BLOB NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries (last_access)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " hash TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # Seeded once per cache file; put() and _evict() keep it current
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries"
+        )
+        self._conn.commit()
+
+    def make_key(self, pdf_path: str, config: dict) -> str:
+        return f"{self.content_hash(pdf_path)}:{config_hash(config)}"
+
+    def known_key(self, pdf_path: str, config: dict) -> Optional[str]:
+        """The key of a file seen before with the same size and mtime, without reading it"""
+        digest = self.content_hash(pdf_path, read=False)
+        return f"{digest}:{config_hash(config)}" if digest else None
+
+    def content_hash(self, pdf_path: str, read: bool = True) -> Optional[str]:
+        """SHA-256 of the file, remembered by path, size and mtime.
+
+        With ``read=False`` files not seen before (or changed since) give
+        None instead of being hashed.
+        """
+        path = os.path.abspath(pdf_path)
+        try:
+            stat = os.stat(path)
+            row = self._conn.execute(
+                "SELECT hash FROM files WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            if read:
+                return file_hash(pdf_path)
+            logger.debug(f"Could not look up {pdf_path}: {str(e)}")
+            return None
+        if row is not None or not read:
+            return row[0] if row else None
+        digest = file_hash(path)
+        try:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime_ns, digest)
+                )
+        except Exception as e:
+            logger.warning(f"Cache write failed: {str(e)}")
+        return digest
+
+    def contains(self, key: str) -> bool:
+        """Whether an entry exists, without touching its LRU position"""
+        try:
+            return self._conn.execute(
+                "SELECT 1 FROM entries WHERE key = ?", (key,)
+            ).fetchone() is not None
+        except Exception as e:
+            logger.warning(f"Cache read failed: {str(e)}")
+            return False
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return {'text', 'metadata'} for a cached entry, or None"""
+        try:
+            row = self._conn.execute(
+                "SELECT text, metadata FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+            return {
+                'text': zlib.decompress(row[0]).decode('utf-8'),
+                'metadata': json.loads(row[1])
+            }
+        except Exception as e:
+            logger.warning(f"Cache read failed: {str(e)}")
+            return None
+
+    def put(self, key: str, text: str, metadata: dict) -> None:
+        """Store an entry and evict old ones if the cache is over budget"""
+        try:
+            blob = zlib.compress(text.encode('utf-8'), 1)
+            encoded = json.dumps(metadata, default=str)
+            size = len(blob) + len(encoded)
+            with self._conn:
+                # Runs first, so the write lock is held before the replaced entry's size is read
+                self._conn.execute(
+                    "UPDATE meta SET value = value - COALESCE((SELECT size FROM entries WHERE key = ?), 0) + ?"
+                    " WHERE key = 'total_size'", (key, size)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, text, metadata, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, encoded, size, time.time())
+                )
+            self._evict()
+        except Exception as e:
+            logger.warning(f"Cache write failed: {str(e)}")
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until the cache fits max_bytes"""
+        total = self._conn.execute("SELECT value FROM meta WHERE key = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access"):
+            victims.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        with self._conn:
+            for key in victims:
+                # Another worker may have evicted it already; only count what is deleted here
+                self._conn.execute(
+                    "UPDATE meta SET value = value - COALESCE((SELECT size FROM entries WHERE key = ?), 0)"
+                    " WHERE key = 'total_size'", (key,)
+                )
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        logger.info(f"Evicted {len(victims)} cache entries")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+__all__ = ['ExtractionCache', 'file_hash', 'config_hash']
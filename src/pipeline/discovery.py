@@ -0,0 +1,218 @@
+# src/pipeline/discovery.py
+"""Streaming input discovery for batch runs.
+
+InputDiscovery walks the input directory with os.scandir (or reads a file
+list) and yields each PDF once, as soon as it is found, instead of
+materialising the whole tree before work starts. Files are deduplicated
+by (device, inode), falling back to the real path where the filesystem
+reports no inode. Only files that can be reached twice are remembered
+(hard links, file-list entries, everything when following symlinks), so
+memory stays flat on trees with millions of plain files. Directories are
+always deduplicated, which also stops symlink loops.
+
+Prefetcher runs the walk in a background thread so the batch loop can
+keep the pool busy while discovery is still going.
+"""
+import fnmatch
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Globs:
+    """Case-insensitive globs: patterns containing '/' match the path
+    relative to the input root, the others match the file name"""
+
+    def __init__(self, patterns: Iterable[str]):
+        patterns = list(patterns)
+        self.empty = not patterns
+        self._name = self._compile(p for p in patterns if '/' not in p)
+        self._path = self._compile(p for p in patterns if '/' in p)
+
+    @staticmethod
+    def _compile(patterns: Iterable[str]):
+        patterns = [fnmatch.translate(p) for p in patterns]
+        return re.compile('|'.join(patterns), re.IGNORECASE) if patterns else None
+
+    def match(self, rel_path: str, name: str) -> bool:
+        return bool((self._name and self._name.match(name)) or (self._path and self._path.match(rel_path)))
+
+
+class InputDiscovery:
+    """Iterable of (path, size) for every matching PDF, each yielded once"""
+
+    def __init__(self, root: Optional[str] = None, include: Iterable[str] = ('*.pdf',),
+                 exclude: Iterable[str] = (), follow_symlinks: bool = False, file_list: Optional[str] = None):
+        self.root = root
+        self.include = _Globs(include)
+        self.exclude = _Globs(exclude)
+        self.follow_symlinks = follow_symlinks
+        self.file_list = file_list
+        self.stats = {'found': 0, 'duplicates': 0, 'excluded': 0, 'errors': 0, 'directories': 0}
+        self._seen_files = set()
+        self._seen_dirs = set()
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        if self.file_list:
+            yield from self._iter_file_list()
+        elif self.root and os.path.isfile(self.root):
+            yield from self._iter_paths([self.root])
+        elif self.root:
+            yield from self._walk(self.root)
+
+    def _key(self, path: str, st: os.stat_result):
+        return (st.st_dev, st.st_ino) if st.st_ino else os.path.realpath(path)
+
+    def _accept(self, path: str, st: os.stat_result, remember: bool = False) -> bool:
+        """False if the file was already yielded"""
+        if remember or self.follow_symlinks or st.st_nlink > 1:
+            key = self._key(path, st)
+            if key in self._seen_files:
+                self.stats['duplicates'] += 1
+                return False
+            self._seen_files.add(key)
+        self.stats['found'] += 1
+        return True
+
+    def _walk(self, root: str) -> Iterator[Tuple[str, int]]:
+        stack = [(root, '')]  # (directory, path relative to root)
+        while stack:
+            directory, rel_dir = stack.pop()
+            try:
+                st = os.stat(directory)
+                key = self._key(directory, st)
+                if key in self._seen_dirs:
+                    continue
+                self._seen_dirs.add(key)
+                self.stats['directories'] += 1
+                entries = os.scandir(directory)
+            except OSError as e:
+                logger.warning(f"Cannot read directory {directory}: {str(e)}")
+                self.stats['errors'] += 1
+                continue
+            with entries:
+                for entry in entries:
+                    name = entry.name
+                    rel_path = rel_dir + name
+                    try:
+                        if entry.is_symlink() and not self.follow_symlinks:
+                            continue
+                        if entry.is_dir():
+                            # Pruned by its name ("archive") or as "path/" ("archive/*")
+                            if not self.exclude.empty and self.exclude.match(rel_path + '/', name):
+                                self.stats['excluded'] += 1
+                                continue
+                            stack.append((entry.path, rel_path + '/'))
+                            continue
+                        if not entry.is_file() or not self.include.match(rel_path, name):
+                            continue
+                        if not self.exclude.empty and self.exclude.match(rel_path, name):
+                            self.stats['excluded'] += 1
+                            continue
+                        st = entry.stat()
+                    except OSError as e:
+                        logger.warning(f"Cannot stat {entry.path}: {str(e)}")
+                        self.stats['errors'] += 1
+                        continue
+                    if self._accept(entry.path, st):
+                        yield entry.path, st.st_size
+
+    def _iter_file_list(self) -> Iterator[Tuple[str, int]]:
+        """One path per line ('-' reads stdin); blank lines and # comments are skipped"""
+        if self.file_list == '-':
+            yield from self._iter_paths(line.strip() for line in sys.stdin)
+            return
+        with open(self.file_list, 'r', encoding='utf-8') as f:
+            yield from self._iter_paths(line.strip() for line in f)
+
+    def _iter_paths(self, paths: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        for path in paths:
+            if not path or path.startswith('#'):
+                continue
+            name = os.path.basename(path)
+            if not self.include.match(path.replace(os.sep, '/'), name):
+                continue
+            if not self.exclude.empty and self.exclude.match(path.replace(os.sep, '/'), name):
+                self.stats['excluded'] += 1
+                continue
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                logger.warning(f"Cannot stat {path}: {str(e)}")
+                self.stats['errors'] += 1
+                continue
+            if self._accept(path, st, remember=True):
+                yield path, st.st_size
+
+
+class Prefetcher:
+    """Runs an iterable in a background thread, buffering up to ``maxsize`` items"""
+
+    _DONE = object()
+
+    def __init__(self, iterable: Iterable, maxsize: int = 10000):
+        self._queue = queue.Queue(maxsize=max(1, maxsize))
+        self._stop = threading.Event()
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, args=(iterable,), name='discovery', daemon=True)
+        self._thread.start()
+
+    def _run(self, iterable: Iterable) -> None:
+        try:
+            for item in iterable:
+                if not self._put(item):
+                    return  # Closed by the consumer
+        except BaseException as e:
+            self.error = e
+        self._put(self._DONE)
+
+    def _put(self, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def take(self, limit: int, timeout: Optional[float] = None) -> List:
+        """Up to ``limit`` items that are ready; waits up to ``timeout`` for the first"""
+        items = []
+        block = timeout is not None
+        while len(items) < limit and not self.done:
+            try:
+                item = self._queue.get(block=block and not items, timeout=timeout)
+            except queue.Empty:
+                break
+            if item is self._DONE:
+                self.done = True
+                if self.error is not None:
+                    raise self.error
+                break
+            items.append(item)
+        return items
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+def discover(root: Optional[str], config: dict, file_list: Optional[str] = None) -> InputDiscovery:
+    """InputDiscovery configured from the ``discovery`` config section"""
+    discovery = config.get('discovery', {})
+    return InputDiscovery(
+        root,
+        include=discovery.get('include') or ['*.pdf'],
+        exclude=discovery.get('exclude') or [],
+        follow_symlinks=discovery.get('follow_symlinks', False),
+        file_list=file_list
+    )
+
+
+__all__ = ['InputDiscovery', 'Prefetcher', 'discover']
@@ -0,0 +1,245 @@
+# src/pipeline/executor.py
+"""Supervised worker pool that enforces per-task resource limits.
+
+multiprocessing.Pool cannot stop a task that hangs or a worker that keeps
+growing, so SupervisedExecutor runs its own worker processes, each talking
+to the parent over a private pipe. The parent hands out one task at a time
+and, between results, checks every worker against:
+
+- ``timeout``: wall-clock seconds a single task may run
+- ``max_memory_mb``: resident set size a worker may reach
+- ``max_tasks_per_worker``: tasks a worker runs before it is replaced
+
+A worker that breaks a limit is killed and replaced, and its task is
+reported through ``failure_result`` with status ``timeout``,
+``memory_exceeded`` or ``worker_crashed``. Because each worker has its own
+pipe, killing one never corrupts a queue shared with the others.
+
+Tasks are pulled lazily, and a task source may yield NO_TASK when it has
+nothing ready yet (e.g. a long-running server waiting for jobs); the pool
+keeps collecting results and asks again after ``poll_interval``.
+
+Workers are started from a fork server where the platform has one. The
+parent runs threads (discovery, the output writer, queue heartbeats)
+whose locks a plain fork would copy mid-use, leaving a replacement
+worker deadlocked in its initializer.
+"""
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = 'timeout'
+MEMORY_EXCEEDED = 'memory_exceeded'
+WORKER_CRASHED = 'worker_crashed'
+
+# Yielded by a task source that has no task ready yet but is not exhausted
+NO_TASK = object()
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB, or None if it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:
+        # Linux fallback without psutil
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _worker_main(conn, func: Callable, initializer: Optional[Callable], initargs: tuple) -> None:
+    """Worker loop: run the initializer, then tasks until told to stop"""
+    # Ctrl-C is handled by the parent, which shuts workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        task_id, args = message
+        conn.send(('start', task_id, None))
+        conn.send(('done', task_id, func(args)))
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, func, initializer, initargs):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, func, initializer, initargs),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.task = None        # (task_id, args) currently assigned
+        self.started = None     # When the worker reported starting it
+        self.completed = 0
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def retire(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, EOFError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class SupervisedExecutor:
+    """Process pool with per-task timeouts, RSS caps and worker recycling"""
+
+    def __init__(
+        self,
+        func: Callable,
+        processes: int,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        timeout: Optional[float] = None,
+        max_memory_mb: Optional[float] = None,
+        max_tasks_per_worker: Optional[int] = None,
+        failure_result: Optional[Callable[[Any, str, str], Any]] = None,
+        poll_interval: float = 0.5
+    ):
+        self.func = func
+        self.processes = max(1, processes)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.failure_result = failure_result or (lambda args, status, error: {'status': status, 'error': error})
+        self.poll_interval = poll_interval
+        self.stats: Dict[str, int] = {TIMEOUT: 0, MEMORY_EXCEEDED: 0, WORKER_CRASHED: 0, 'recycled': 0}
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else None)
+        self._workers = []
+
+    def imap_unordered(self, tasks: Iterable[Any]) -> Iterator[Any]:
+        """Yield results as tasks finish; tasks are pulled lazily"""
+        pending = iter(tasks)
+        task_ids = itertools.count()
+        exhausted = False
+        self._workers = [self._spawn() for _ in range(self.processes)]
+        try:
+            while True:
+                # Hand a task to every idle worker
+                for worker in self._workers:
+                    if worker.task is None and not exhausted:
+                        try:
+                            args = next(pending)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        if args is NO_TASK:
+                            break
+                        worker.task = (next(task_ids), args)
+                        worker.started = None
+                        worker.conn.send(worker.task)
+
+                busy = [worker for worker in self._workers if worker.task is not None]
+                if exhausted and not busy:
+                    break
+
+                if busy:
+                    ready = wait([worker.conn for worker in busy], timeout=self.poll_interval)
+                    for worker in busy:
+                        if worker.conn in ready:
+                            result = self._receive(worker)
+                            if result is not None:
+                                yield result
+                else:
+                    # Idle pool and the task source has nothing ready
+                    time.sleep(self.poll_interval)
+                for result in self._enforce_limits():
+                    yield result
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        for worker in self._workers:
+            if worker.task is None:
+                worker.retire()
+            else:
+                worker.kill()
+        self._workers = []
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.func, self.initializer, self.initargs)
+
+    def _replace(self, worker: _Worker, graceful: bool = False) -> None:
+        worker.retire() if graceful else worker.kill()
+        self._workers[self._workers.index(worker)] = self._spawn()
+
+    def _receive(self, worker: _Worker) -> Optional[Any]:
+        """Read one message from a worker; returns a result if the task finished"""
+        try:
+            kind, task_id, payload = worker.conn.recv()
+        except (EOFError, OSError):
+            return self._fail(worker, WORKER_CRASHED, f"Worker exited with code {worker.process.exitcode}")
+        if kind == 'start':
+            worker.started = time.monotonic()
+            return None
+
+        worker.task = None
+        worker.completed += 1
+        if self.max_tasks_per_worker and worker.completed >= self.max_tasks_per_worker:
+            self.stats['recycled'] += 1
+            self._replace(worker, graceful=True)
+        return payload
+
+    def _fail(self, worker: _Worker, status: str, error: str) -> Any:
+        """Kill a worker, replace it and build the failure result for its task"""
+        _, args = worker.task
+        self.stats[status] += 1
+        logger.error(f"Worker {worker.process.pid}: {error}")
+        self._replace(worker)
+        return self.failure_result(args, status, error)
+
+    def _enforce_limits(self) -> Iterator[Any]:
+        now = time.monotonic()
+        for worker in list(self._workers):
+            if worker.task is None:
+                if not worker.process.is_alive():
+                    self._replace(worker)
+                elif self.max_memory_mb and (rss_mb(worker.process.pid) or 0) > self.max_memory_mb:
+                    # Idle but bloated: recycle before it takes more work
+                    self.stats['recycled'] += 1
+                    self._replace(worker, graceful=True)
+                continue
+
+            if not worker.process.is_alive() and not worker.conn.poll():
+                yield self._fail(worker, WORKER_CRASHED, f"Worker exited with code {worker.process.exitcode}")
+            elif self.timeout and worker.started and now - worker.started > self.timeout:
+                yield self._fail(worker, TIMEOUT, f"Task exceeded {self.timeout}s timeout")
+            elif self.max_memory_mb:
+                rss = rss_mb(worker.process.pid)
+                if rss is not None and rss > self.max_memory_mb:
+                    yield self._fail(
+                        worker, MEMORY_EXCEEDED,
+                        f"Worker RSS {rss:.0f} MB exceeded {self.max_memory_mb} MB"
+                    )
+
+
+__all__ = ['SupervisedExecutor', 'rss_mb', 'NO_TASK', 'TIMEOUT', 'MEMORY_EXCEEDED', 'WORKER_CRASHED']
@@ -0,0 +1,104 @@
+# src/pipeline/manifest.py
+"""Durable per-file job manifest for resumable batch runs.
+
+Every input file has one row recording its state (pending, running, done,
+failed), how many times it has been attempted and how long the last
+attempt took. Workers mark files running when they pick them up and the
+parent marks them done/failed as results arrive, committing each update,
+so a crash or Ctrl-C loses nothing and ``--resume`` can schedule only the
+files that never finished.
+"""
+import logging
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class JobManifest:
+    """SQLite-backed record of per-file batch state"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " duration REAL,"
+            " output TEXT,"
+            " error TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_state ON files (state)")
+        self._conn.commit()
+
+    def reset(self) -> None:
+        """Forget every file; used when a run starts from scratch"""
+        with self._conn:
+            self._conn.execute("DELETE FROM files")
+
+    def register(self, paths: Iterable[str]) -> None:
+        """Add files as pending, keeping the state of files already known"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO files (path, state) VALUES (?, ?)",
+                ((str(p), PENDING) for p in paths)
+            )
+
+    def unfinished(self, paths: Iterable[str]) -> List[str]:
+        """The given files that are not yet done (pending, running, failed or unknown)"""
+        paths = [str(p) for p in paths]
+        done = set()
+        # Look up only the given paths, so calling this per discovery window stays cheap
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            done.update(row[0] for row in self._conn.execute(
+                f"SELECT path FROM files WHERE state = ? AND path IN ({','.join('?' * len(chunk))})",
+                (DONE, *chunk)
+            ))
+        return [p for p in paths if p not in done]
+
+    def mark_running(self, path: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "UPDATE files SET state = ?, attempts = attempts + 1, started_at = ?, "
+                "finished_at = NULL, duration = NULL, error = NULL WHERE path = ?",
+                (RUNNING, time.time(), str(path))
+            )
+
+    def mark_finished(self, result: Dict) -> None:
+        """Record a worker result dict as done or failed"""
+        state = DONE if result['status'] == 'success' else FAILED
+        with self._conn:
+            self._conn.execute(
+                "UPDATE files SET state = ?, finished_at = ?, duration = ?, output = ?, error = ? "
+                "WHERE path = ?",
+                (state, time.time(), result.get('elapsed'), result.get('output'),
+                 result.get('error'), result['input'])
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Number of files in each state"""
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for state, count in self._conn.execute("SELECT state, COUNT(*) FROM files GROUP BY state"):
+            counts[state] = count
+        return counts
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+__all__ = ['JobManifest', 'PENDING', 'RUNNING', 'DONE', 'FAILED']
@@ -0,0 +1,177 @@
+# src/pipeline/scheduler.py
+"""Size-aware task planning for batch runs.
+
+Page counts are read up front so large documents can be split into
+page-range tasks and all work ordered longest-first. This keeps a single
+1,000-page scan from holding one core for the whole tail of the batch.
+Page-range results are stitched back into one document by
+DocumentAssembler once every part has arrived.
+"""
+import logging
+import math
+from typing import Dict, Iterable, List, Optional
+
+import fitz
+
+from utils.metrics import merge_metrics, percentile
+
+logger = logging.getLogger(__name__)
+
+
+def page_count(pdf_path: str) -> Optional[int]:
+    """Number of pages, or None if the file cannot be opened"""
+    try:
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    except Exception as e:
+        logger.warning(f"Could not read page count of {pdf_path}: {str(e)}")
+        return None
+
+
+def document_thin_text(pdf_path: str, config: dict) -> Optional[bool]:
+    """The whole-document thin-text-layer decision, or None to leave it to the worker"""
+    from extraction.text_extraction import thin_text_layer
+    try:
+        return thin_text_layer(pdf_path, config)
+    except Exception as e:
+        logger.warning(f"Could not check the text layer of {pdf_path}: {str(e)}")
+        return None
+
+
+def plan_tasks(pdf_files: Iterable[str], config: dict, cache=None, first_doc_id: int = 0) -> List[Dict]:
+    """Build the task list for a batch, largest work first.
+
+    Documents with more than ``scheduling.split_pages`` pages become
+    ``pages_per_task``-page range tasks. Documents already in the cache are
+    never split so the worker can serve them without opening the PDF; files
+    the cache has seen with the same size and mtime are found there before
+    their page count is read.
+    Doc ids start at ``first_doc_id`` so successive windows of one batch
+    never share an id. Range tasks carry the document's ``thin_text``
+    decision so their pages are routed as in an unsplit run.
+    """
+    scheduling = config.get('scheduling', {})
+    split_pages = scheduling.get('split_pages', 50)
+    pages_per_task = max(1, scheduling.get('pages_per_task', 25))
+    refresh = config.get('cache', {}).get('refresh', False)
+
+    tasks = []
+    for doc_id, pdf_path in enumerate(pdf_files, start=first_doc_id):
+        pdf_path = str(pdf_path)
+        if cache is not None and not refresh:
+            known_key = cache.known_key(pdf_path, config)
+            if known_key and cache.contains(known_key):
+                tasks.append({'input': pdf_path, 'doc_id': doc_id, 'pages': None, 'part': 0, 'parts': 1,
+                              'weight': 1})
+                continue
+
+        pages = page_count(pdf_path)
+        if pages is None or pages <= split_pages:
+            # Unknown page counts get weight 1 and go to the back of the queue
+            tasks.append({'input': pdf_path, 'doc_id': doc_id, 'pages': None, 'part': 0, 'parts': 1,
+                          'weight': pages or 1})
+            continue
+
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(pdf_path, config)
+            if not refresh and cache.contains(cache_key):
+                tasks.append({'input': pdf_path, 'doc_id': doc_id, 'pages': None, 'part': 0, 'parts': 1,
+                              'weight': 1})
+                continue
+
+        thin_text = document_thin_text(pdf_path, config)
+        parts = math.ceil(pages / pages_per_task)
+        for part in range(parts):
+            start = part * pages_per_task
+            end = min(start + pages_per_task, pages)
+            tasks.append({
+                'input': pdf_path,
+                'doc_id': doc_id,
+                'pages': (start, end),
+                'part': part,
+                'parts': parts,
+                'weight': end - start,
+                'cache_key': cache_key,
+                'thin_text': thin_text
+            })
+
+    # Longest-processing-time-first ordering
+    tasks.sort(key=lambda task: task['weight'], reverse=True)
+    return tasks
+
+
+class DocumentAssembler:
+    """Collects page-range results and stitches them back per document"""
+
+    def __init__(self):
+        self._parts: Dict[int, Dict[int, Dict]] = {}
+
+    def add(self, result: Dict) -> Optional[Dict]:
+        """Add a part result; returns the merged document once all parts are in"""
+        parts = self._parts.setdefault(result['doc_id'], {})
+        parts[result['part']] = result
+        if len(parts) < result['parts']:
+            return None
+        del self._parts[result['doc_id']]
+        ordered = [parts[i] for i in range(result['parts'])]
+
+        merged = {
+            'input': result['input'],
+            'parts': result['parts'],
+            'task_durations': [part.get('elapsed', 0.0) for part in ordered],
+            'elapsed': sum(part.get('elapsed', 0.0) for part in ordered),
+            'cache_key': result.get('cache_key')
+        }
+        failed = [part for part in ordered if part['status'] != 'success']
+        if failed:
+            # The document takes the outcome of its first failed part
+            merged.update({
+                'status': failed[0]['status'],
+                'error': '; '.join(part.get('error', 'Unknown error') for part in failed)
+            })
+            return merged
+
+        merged.update({
+            'status': 'success',
+            'text': "\n".join(part['text'] for part in ordered),
+            'pages': [page for part in ordered for page in part['pages']],
+            'timings': {
+                key: sum(part['timings'][key] for part in ordered)
+                for key in ordered[0]['timings']
+            },
+            'metrics': merge_metrics(part.get('metrics') for part in ordered),
+            'cache': 'miss'
+        })
+        if all('elements' in part for part in ordered):
+            merged['elements'] = [element for part in ordered for element in part['elements']]
+        return merged
+
+    def pending(self) -> List[str]:
+        """Documents still waiting for parts"""
+        return [next(iter(parts.values()))['input'] for parts in self._parts.values()]
+
+
+def tail_latency_summary(results: List[Dict]) -> Dict[str, float]:
+    """Task-duration percentiles and the tail that splitting avoided.
+
+    ``longest_document_seconds`` is the summed work of the slowest document,
+    i.e. how long its single task would have run without page-range
+    splitting; ``longest_task_seconds`` is the actual longest task.
+    """
+    task_durations = []
+    for result in results:
+        if 'parts' not in result:
+            continue  # Never dispatched (e.g. skipped as oversize)
+        task_durations.extend(result.get('task_durations', [result.get('elapsed', 0.0)]))
+    return {
+        'tasks': len(task_durations),
+        'split_documents': sum(1 for result in results if result.get('parts', 1) > 1),
+        'p50_task_seconds': percentile(task_durations, 50),
+        'p95_task_seconds': percentile(task_durations, 95),
+        'longest_task_seconds': max(task_durations, default=0.0),
+        'longest_document_seconds': max((result.get('elapsed', 0.0) for result in results), default=0.0)
+    }
+
+
+__all__ = ['plan_tasks', 'page_count', 'document_thin_text', 'DocumentAssembler', 'tail_latency_summary', 'percentile']
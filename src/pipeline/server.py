@@ -0,0 +1,387 @@
+# src/pipeline/server.py
+"""Long-running extraction daemon with warm workers and a local job API.
+
+A one-shot cli.py run pays interpreter start, imports, worker spawn and
+model loads before its first page. ``cli.py --serve`` pays them once: the
+SupervisedExecutor pool stays up (workers warm their engines in the
+initializer) and jobs arrive over a small asyncio HTTP/1.1 front end on a
+local TCP port or Unix socket.
+
+Endpoints:
+
+- ``POST /jobs`` with ``{"path": "/abs/file.pdf"}`` (optionally
+  ``"pages_per_task"``): the document is split into page-range tasks and
+  the response streams NDJSON events as they finish: ``accepted``, one
+  ``pages`` event per task (page records and cleaned text, in completion
+  order) and a final ``done``. Disconnecting cancels the job's queued tasks.
+- ``GET /metrics``: Prometheus text with queue depth, jobs in flight,
+  rejections, job latency and time-to-first-page quantiles, and the
+  per-stage metrics of finished jobs.
+- ``GET /health``: JSON liveness and pool size.
+
+Admission control: with ``serve.max_jobs`` jobs in flight, or a document
+over ``serve.max_pages_per_job`` pages, new jobs are refused with 503 (and
+Retry-After) or 413 instead of queueing without bound.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from pipeline.executor import NO_TASK, SupervisedExecutor
+from pipeline.scheduler import document_thin_text, page_count
+from utils.metrics import MetricsAggregator, merge_metrics, percentile
+
+logger = logging.getLogger(__name__)
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+class Job:
+    """One accepted document: its remaining tasks and the events for its client"""
+
+    def __init__(self, job_id: str, path: str, parts: int):
+        self.job_id = job_id
+        self.path = path
+        self.parts = parts
+        self.remaining = parts
+        self.events: asyncio.Queue = asyncio.Queue()
+        self.accepted = time.monotonic()
+        self.first_result: Optional[float] = None
+        self.metrics: List[Dict] = []
+        self.pages = 0
+        self.status = 'success'
+        self.cancelled = False
+
+
+class ExtractionServer:
+    """Warm worker pool behind an asyncio HTTP front end.
+
+    ``func``, ``initializer`` and ``failure_result`` are the batch pipeline's
+    process_single_file, init_worker and task_failure; tasks are submitted
+    as page-range tasks with ``stream`` set, so workers return cleaned text
+    instead of writing output files.
+    """
+
+    def __init__(self, config: dict, func: Callable, initializer: Callable, failure_result: Callable):
+        self.config = config
+        self.serve_config = config.get('serve', {})
+        self.func = func
+        self.initializer = initializer
+        self.failure_result = failure_result
+        self.workers = self.serve_config.get('workers') or config.get('max_workers', os.cpu_count() or 1)
+        self.max_jobs = self.serve_config.get('max_jobs', 4 * self.workers)
+        self.max_pages_per_job = self.serve_config.get('max_pages_per_job')
+        self.pages_per_task = max(1, self.serve_config.get('pages_per_task', 1))
+
+        self.metrics = MetricsAggregator()
+        self.latencies = deque(maxlen=self.serve_config.get('latency_window', 1000))
+        self.first_page_latencies = deque(maxlen=self.latencies.maxlen)
+        self.counters = {'jobs_accepted': 0, 'jobs_rejected': 0, 'jobs_cancelled': 0}
+        self.started = time.time()
+
+        self._jobs: Dict[str, Job] = {}
+        self._admitting = 0  # Jobs past the max_jobs check still reading their PDF
+        self._tasks: queue.Queue = queue.Queue()
+        # Each written by one thread only: dispatched by the dispatcher, completed by the loop
+        self._tasks_dispatched = 0
+        self._tasks_completed = 0
+        self._stopping = threading.Event()
+        self._executor: Optional[SupervisedExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def run(self, host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None) -> None:
+        """Start the pool and serve until SIGINT/SIGTERM"""
+        self._loop = asyncio.get_running_loop()
+        self._dispatcher = threading.Thread(target=self._dispatch, name='dispatcher', daemon=True)
+        self._dispatcher.start()
+
+        if socket_path:
+            server = await asyncio.start_unix_server(self._handle, path=socket_path)
+            where = socket_path
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            where = f"http://{host}:{port}"
+        logger.info(f"Serving on {where} with {self.workers} workers")
+
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl-C raises KeyboardInterrupt instead
+        async with server:
+            try:
+                await stop.wait()
+            finally:
+                logger.info("Shutting down: finishing running tasks")
+                server.close()
+                self._stopping.set()
+                await self._loop.run_in_executor(None, self._dispatcher.join)
+                for job in list(self._jobs.values()):
+                    job.events.put_nowait({'event': 'done', 'job_id': job.job_id, 'status': 'interrupted',
+                                           'pages': job.pages, 'elapsed': None, 'first_page_seconds': None})
+                if socket_path and os.path.exists(socket_path):
+                    os.unlink(socket_path)
+
+    # Worker side (dispatcher thread)
+
+    def _dispatch(self) -> None:
+        limits = self.config.get('resource_limits', {})
+        self._executor = SupervisedExecutor(
+            self.func,
+            processes=self.workers,
+            initializer=self.initializer,
+            initargs=(self.config,),
+            timeout=limits.get('timeout_per_file'),
+            max_memory_mb=limits.get('max_memory_per_worker'),
+            max_tasks_per_worker=limits.get('max_tasks_per_worker'),
+            failure_result=self.failure_result,
+            poll_interval=self.serve_config.get('poll_interval', 0.02)
+        )
+        for result in self._executor.imap_unordered(self._task_source()):
+            self._loop.call_soon_threadsafe(self._deliver, result)
+
+    def _task_source(self):
+        """Queued tasks for the executor; NO_TASK while idle, ends on shutdown"""
+        while not self._stopping.is_set():
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                yield NO_TASK
+                continue
+            job = self._jobs.get(task[0]['doc_id'])
+            if job is None or job.cancelled:
+                self._loop.call_soon_threadsafe(self._skipped, task[0]['doc_id'])
+                continue
+            self._tasks_dispatched += 1
+            yield task
+
+    # Event loop side
+
+    def _deliver(self, result: Dict) -> None:
+        self._tasks_completed += 1
+        job = self._jobs.get(result.get('doc_id'))
+        if job is None:
+            return
+        if job.first_result is None:
+            job.first_result = time.monotonic()
+            self.first_page_latencies.append(job.first_result - job.accepted)
+        job.remaining -= 1
+        if result.get('metrics'):
+            job.metrics.append(result['metrics'])
+
+        if result['status'] == 'success':
+            job.pages += len(result.get('pages', []))
+            job.events.put_nowait({
+                'event': 'pages',
+                'job_id': job.job_id,
+                'part': result['part'],
+                'pages': result.get('pages', []),
+                'text': result.get('text', '')
+            })
+        else:
+            job.status = result['status']
+            job.events.put_nowait({
+                'event': 'error',
+                'job_id': job.job_id,
+                'part': result['part'],
+                'status': result['status'],
+                'error': result.get('error', 'Unknown error')
+            })
+        if job.remaining == 0:
+            self._finish(job)
+
+    def _finish(self, job: Job) -> None:
+        elapsed = time.monotonic() - job.accepted
+        del self._jobs[job.job_id]
+        if job.cancelled:
+            return
+        self.latencies.append(elapsed)
+        self.metrics.add({'status': job.status, 'metrics': merge_metrics(job.metrics)})
+        job.events.put_nowait({
+            'event': 'done',
+            'job_id': job.job_id,
+            'status': job.status,
+            'pages': job.pages,
+            'elapsed': round(elapsed, 4),
+            'first_page_seconds': round(job.first_result - job.accepted, 4) if job.first_result else None
+        })
+
+    def _skipped(self, job_id: str) -> None:
+        """A cancelled job's task was dropped from the queue"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job.remaining -= 1
+            if job.remaining == 0:
+                self._finish(job)
+
+    def _cancel(self, job: Job) -> None:
+        """Client went away: queued tasks are dropped, running ones finish unreported"""
+        if not job.cancelled and job.job_id in self._jobs:
+            job.cancelled = True
+            self.counters['jobs_cancelled'] += 1
+
+    async def _submit(self, body: Dict):
+        """Validate and enqueue a job; returns (job, None) or (None, (status, error))"""
+        path = body.get('path')
+        if not isinstance(path, str):
+            return None, (400, "Body must be JSON with a 'path' string")
+        if not os.path.isfile(path):
+            return None, (404, f"No such file: {path}")
+        in_flight = len(self._jobs) + self._admitting
+        if in_flight >= self.max_jobs:
+            self.counters['jobs_rejected'] += 1
+            return None, (503, f"Queue full ({in_flight} jobs in flight)")
+
+        # Hold the slot across the awaits so concurrent requests cannot overshoot max_jobs
+        self._admitting += 1
+        try:
+            pages = await self._loop.run_in_executor(None, page_count, path)
+            if not pages:
+                return None, (400, f"Not a readable PDF: {path}")
+            if self.max_pages_per_job and pages > self.max_pages_per_job:
+                self.counters['jobs_rejected'] += 1
+                return None, (413, f"{pages} pages exceeds the {self.max_pages_per_job}-page limit")
+
+            per_task = max(1, int(body.get('pages_per_task') or self.pages_per_task))
+            starts = list(range(0, pages, per_task))
+            thin_text = await self._loop.run_in_executor(None, document_thin_text, path, self.config)
+            job = Job(uuid.uuid4().hex[:12], path, len(starts))
+            self._jobs[job.job_id] = job
+        finally:
+            self._admitting -= 1
+        self.counters['jobs_accepted'] += 1
+        for part, start in enumerate(starts):
+            task = {
+                'input': path,
+                'doc_id': job.job_id,
+                'pages': (start, min(start + per_task, pages)),
+                'part': part,
+                'parts': len(starts),
+                'thin_text': thin_text,
+                'stream': True
+            }
+            self._tasks.put((task, self.config))
+        return job, None
+
+    def format_metrics(self) -> str:
+        prefix = 'pdf_mining'
+        gauges = {
+            'serve_queue_depth_tasks': self._tasks.qsize(),
+            'serve_tasks_running': self._tasks_dispatched - self._tasks_completed,
+            'serve_jobs_in_flight': len(self._jobs),
+            'serve_workers': self.workers,
+            'serve_uptime_seconds': round(time.time() - self.started, 1)
+        }
+        if self._executor is not None:
+            gauges['serve_workers_recycled'] = self._executor.stats['recycled']
+        lines = [self.metrics.format_prometheus(extra=gauges, prefix=prefix).rstrip("\n")]
+        for name, value in self.counters.items():
+            lines += [f"# TYPE {prefix}_serve_{name}_total counter", f"{prefix}_serve_{name}_total {value}"]
+        for name, values in (('serve_job_latency_seconds', self.latencies),
+                             ('serve_first_page_seconds', self.first_page_latencies)):
+            values = list(values)
+            lines.append(f"# TYPE {prefix}_{name} summary")
+            for quantile in (50, 95, 99):
+                lines.append(f'{prefix}_{name}{{quantile="{quantile / 100}"}} {percentile(values, quantile):.6f}')
+            lines += [f"{prefix}_{name}_sum {sum(values):.6f}", f"{prefix}_{name}_count {len(values)}"]
+        return "\n".join(lines) + "\n"
+
+    # HTTP
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            body = await reader.readexactly(length) if length else b''
+
+            if target == '/health' and method == 'GET':
+                await self._respond(writer, 200, {'status': 'ok', 'workers': self.workers, 'jobs': len(self._jobs)})
+            elif target == '/metrics' and method == 'GET':
+                await self._respond(writer, 200, self.format_metrics(), 'text/plain; version=0.0.4')
+            elif target == '/jobs' and method == 'POST':
+                await self._stream_job(writer, body)
+            elif target in ('/health', '/metrics', '/jobs'):
+                await self._respond(writer, 405, {'error': f"{method} not allowed on {target}"})
+            else:
+                await self._respond(writer, 404, {'error': f"Unknown endpoint {target}"})
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            await self._respond(writer, 400, {'error': f"Malformed request: {str(e)}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _stream_job(self, writer: asyncio.StreamWriter, body: bytes) -> None:
+        try:
+            request = json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            await self._respond(writer, 400, {'error': f"Invalid JSON: {str(e)}"})
+            return
+        job, error = await self._submit(request if isinstance(request, dict) else {})
+        if error:
+            status, message = error
+            extra = {'Retry-After': str(self.serve_config.get('retry_after', 5))} if status == 503 else None
+            await self._respond(writer, status, {'error': message}, headers=extra)
+            return
+
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        event = {'event': 'accepted', 'job_id': job.job_id, 'tasks': job.parts}
+        try:
+            while True:
+                data = (json.dumps(event) + "\n").encode('utf-8')
+                writer.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                # Backpressure: a slow reader holds up only its own job's stream
+                await writer.drain()
+                if event['event'] == 'done':
+                    break
+                event = await job.events.get()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            logger.info(f"Client disconnected, cancelling job {job.job_id}")
+            self._cancel(job)
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload,
+                       content_type: str = 'application/json', headers: Optional[Dict[str, str]] = None) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        data = data.encode('utf-8')
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                f"Content-Length: {len(data)}", "Connection: close"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + data)
+        await writer.drain()
+
+
+def serve(config: dict, func: Callable, initializer: Callable, failure_result: Callable,
+          host: Optional[str] = None, port: Optional[int] = None, socket_path: Optional[str] = None) -> None:
+    """Run the extraction daemon in the foreground"""
+    serve_config = config.get('serve', {})
+    server = ExtractionServer(config, func, initializer, failure_result)
+    asyncio.run(server.run(
+        host or serve_config.get('host', '127.0.0.1'),
+        port or serve_config.get('port', 8765),
+        socket_path or serve_config.get('socket')
+    ))
+
+
+__all__ = ['ExtractionServer', 'serve']
@@ -0,0 +1,431 @@
+# src/pipeline/work_queue.py
+"""Lease-based task queue on shared disk for multi-node batch runs.
+
+A coordinator creates a batch, stores its config and enqueues the planned
+tasks (whole documents or page ranges); worker nodes claim tasks with a
+lease, extend the leases of running tasks with heartbeats and post each
+result back. A task whose lease runs out (node crashed, lost the share)
+returns to pending for another node, up to ``max_attempts`` times.
+Results are numbered in completion order so the coordinator can read
+them incrementally and build one batch report. The coordinator holds a
+lease on its batch as well; a batch whose coordinator stopped renewing
+it (killed, lost the share) is abandoned, and nodes move on to the next.
+
+The queue is a single SQLite file. It uses the rollback journal rather
+than WAL, which needs shared memory and does not work across hosts, and
+takes claims in BEGIN IMMEDIATE transactions so two nodes never lease
+the same task. This relies on the share's file locking (NFSv4, SMB).
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+def node_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseQueue:
+    """SQLite-backed queue of batch tasks with leases and heartbeats"""
+
+    def __init__(self, path: str, lease_seconds: float = 120, max_attempts: int = 3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = self._connect()
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS batches ("
+                " id TEXT PRIMARY KEY,"
+                " config TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " closed INTEGER NOT NULL DEFAULT 0,"
+                " lease_until REAL)"
+            )
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(batches)")]
+            if 'lease_until' not in columns:
+                # Queue files from before coordinator leases; their batches count as abandoned
+                self._conn.execute("ALTER TABLE batches ADD COLUMN lease_until REAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " id INTEGER PRIMARY KEY,"
+                " batch TEXT NOT NULL,"
+                " task TEXT NOT NULL,"
+                " weight INTEGER NOT NULL DEFAULT 1,"
+                " state TEXT NOT NULL,"
+                " owner TEXT,"
+                " lease_until REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " expired INTEGER NOT NULL DEFAULT 0,"
+                " seq INTEGER,"
+                " result TEXT,"
+                " error TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_claim ON tasks (state, batch, weight)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seq ON tasks (seq)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS nodes ("
+                " name TEXT PRIMARY KEY,"
+                " batch TEXT,"
+                " last_seen REAL,"
+                " tasks_done INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        return conn
+
+    def _transaction(self, conn: Optional[sqlite3.Connection] = None):
+        return _Immediate(conn or self._conn)
+
+    # Coordinator side
+
+    def create_batch(self, batch: str, config: dict) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("INSERT INTO batches (id, config, created, lease_until) VALUES (?, ?, ?, ?)",
+                         (batch, json.dumps(config, default=str), now, now + self.lease_seconds))
+
+    def renew_batch(self, batch: str, conn: Optional[sqlite3.Connection] = None) -> None:
+        """Extend the coordinator's lease; nodes abandon the batch once it runs out"""
+        with self._transaction(conn) as conn:
+            conn.execute("UPDATE batches SET lease_until = ? WHERE id = ?",
+                         (time.time() + self.lease_seconds, batch))
+
+    def enqueue(self, batch: str, tasks: Iterable[Dict]) -> int:
+        """Add tasks to a batch; returns how many were added"""
+        rows = [(batch, json.dumps(task), task.get('weight', 1), PENDING) for task in tasks]
+        with self._transaction() as conn:
+            conn.executemany("INSERT INTO tasks (batch, task, weight, state) VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def close_batch(self, batch: str) -> None:
+        """No more tasks will be added; workers leave once the batch is drained"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE batches SET closed = 1 WHERE id = ?", (batch,))
+
+    def cancel(self, batch: str) -> int:
+        """Drop the batch's pending tasks; leased ones still finish"""
+        with self._transaction() as conn:
+            cancelled = conn.execute(
+                "UPDATE tasks SET state = ? WHERE batch = ? AND state = ?", (CANCELLED, batch, PENDING)
+            ).rowcount
+            conn.execute("UPDATE batches SET closed = 1 WHERE id = ?", (batch,))
+        return cancelled
+
+    def results(self, batch: str, after: int = 0) -> List[Tuple[int, Dict, Optional[Dict], str, Optional[str]]]:
+        """(seq, task, result, owner, error) of tasks finished after ``after``, in completion order.
+
+        ``result`` is None for tasks failed by the queue itself (too many
+        expired leases); ``error`` then says why.
+        """
+        self.requeue_expired()
+        rows = self._conn.execute(
+            "SELECT seq, task, result, owner, error FROM tasks WHERE batch = ? AND seq > ? ORDER BY seq",
+            (batch, after)
+        ).fetchall()
+        return [(seq, json.loads(task), json.loads(result) if result else None, owner, error)
+                for seq, task, result, owner, error in rows]
+
+    def counts(self, batch: str) -> Dict[str, int]:
+        counts = dict.fromkeys((PENDING, LEASED, DONE, FAILED, CANCELLED), 0)
+        for state, count in self._conn.execute(
+            "SELECT state, COUNT(*) FROM tasks WHERE batch = ? GROUP BY state", (batch,)
+        ):
+            counts[state] = count
+        counts['expired_leases'] = self._conn.execute(
+            "SELECT COALESCE(SUM(expired), 0) FROM tasks WHERE batch = ?", (batch,)
+        ).fetchone()[0]
+        return counts
+
+    def nodes(self, batch: str) -> Dict[str, Dict]:
+        return {
+            name: {'last_seen': last_seen, 'tasks_done': done}
+            for name, last_seen, done in self._conn.execute(
+                "SELECT name, last_seen, tasks_done FROM nodes WHERE batch = ?", (batch,)
+            )
+        }
+
+    # Worker side
+
+    def open_batch(self) -> Optional[Tuple[str, dict]]:
+        """Oldest live batch that still has work (or may get more), with its config"""
+        row = self._conn.execute(
+            "SELECT id, config FROM batches b WHERE COALESCE(lease_until, 0) >= ? AND (closed = 0 OR EXISTS ("
+            " SELECT 1 FROM tasks t WHERE t.batch = b.id AND t.state IN (?, ?)))"
+            " ORDER BY created LIMIT 1",
+            (time.time(), PENDING, LEASED)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def batch_finished(self, batch: str) -> bool:
+        """Whether the batch is drained, or abandoned by its coordinator"""
+        row = self._conn.execute(
+            "SELECT closed, COALESCE(lease_until, 0),"
+            " EXISTS (SELECT 1 FROM tasks WHERE batch = ? AND state IN (?, ?)) FROM batches"
+            " WHERE id = ?", (batch, PENDING, LEASED, batch)
+        ).fetchone()
+        if row is None:
+            return True
+        closed, lease_until, has_work = row
+        if lease_until < time.time():
+            logger.warning(f"Coordinator of batch {batch} stopped renewing its lease; leaving the batch")
+            return True
+        return closed == 1 and not has_work
+
+    def claim(self, batch: str, owner: str, limit: int = 1) -> List[Tuple[int, Dict]]:
+        """Lease up to ``limit`` pending tasks, largest first"""
+        self.requeue_expired()
+        now = time.time()
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, task FROM tasks WHERE state = ? AND batch = ? ORDER BY weight DESC, id LIMIT ?",
+                (PENDING, batch, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE tasks SET state = ?, owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                [(LEASED, owner, now + self.lease_seconds, task_id) for task_id, _ in rows]
+            )
+            self._seen(conn, owner, batch, 0)
+        return [(task_id, json.loads(task)) for task_id, task in rows]
+
+    def heartbeat(self, owner: str, batch: str, task_ids: Iterable[int],
+                  conn: Optional[sqlite3.Connection] = None) -> int:
+        """Extend the owner's leases; returns how many are still held"""
+        task_ids = list(task_ids)
+        until = time.time() + self.lease_seconds
+        with self._transaction(conn) as conn:
+            held = sum(conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE id = ? AND owner = ? AND state = ?",
+                (until, task_id, owner, LEASED)
+            ).rowcount for task_id in task_ids)
+            self._seen(conn, owner, batch, 0)
+        return held
+
+    def complete(self, task_id: int, owner: str, batch: str, result: Dict) -> bool:
+        """Post a result; False if the lease was lost (the task may be running elsewhere)"""
+        state = DONE if result.get('status') == 'success' else FAILED
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE tasks SET state = ?, result = ?, lease_until = NULL,"
+                " seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks)"
+                " WHERE id = ? AND owner = ? AND state = ?",
+                (state, json.dumps(result, default=str), task_id, owner, LEASED)
+            ).rowcount
+            self._seen(conn, owner, batch, updated)
+        if not updated:
+            logger.warning(f"Lease on task {task_id} was lost before its result was posted")
+        return bool(updated)
+
+    def release(self, owner: str) -> int:
+        """Return the owner's leased tasks to pending (clean shutdown)"""
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, lease_until = NULL, attempts = attempts - 1"
+                " WHERE owner = ? AND state = ?", (PENDING, owner, LEASED)
+            ).rowcount
+
+    def requeue_expired(self) -> int:
+        """Re-queue tasks whose lease ran out; fail those out of attempts"""
+        now = time.time()
+        with self._transaction() as conn:
+            failed = conn.execute(
+                "UPDATE tasks SET state = ?, lease_until = NULL, expired = expired + 1,"
+                " error = 'lease expired on each of ' || attempts || ' attempts',"
+                " seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks)"
+                " WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, LEASED, now, self.max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE tasks SET state = ?, owner = NULL, lease_until = NULL, expired = expired + 1"
+                " WHERE state = ? AND lease_until < ?",
+                (PENDING, LEASED, now)
+            ).rowcount
+        if requeued or failed:
+            logger.warning(f"Leases expired: {requeued} tasks re-queued, {failed} failed")
+        return requeued
+
+    def _seen(self, conn: sqlite3.Connection, owner: str, batch: str, done: int) -> None:
+        conn.execute(
+            "INSERT INTO nodes (name, batch, last_seen, tasks_done) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET batch = excluded.batch, last_seen = excluded.last_seen,"
+            " tasks_done = tasks_done + excluded.tasks_done",
+            (owner, batch, time.time(), done)
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class _Immediate:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK on an autocommit connection"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class Heartbeat:
+    """Thread that extends the leases of a node's running tasks"""
+
+    def __init__(self, queue: LeaseQueue, owner: str, batch: str, interval: float):
+        self.queue = queue
+        self.owner = owner
+        self.batch = batch
+        self.interval = interval
+        self.task_ids = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+        self._thread.start()
+
+    def add(self, task_id: int) -> None:
+        with self._lock:
+            self.task_ids.add(task_id)
+
+    def discard(self, task_id: int) -> None:
+        with self._lock:
+            self.task_ids.discard(task_id)
+
+    def _run(self) -> None:
+        conn = self.queue._connect()
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    self._beat(conn)
+                except sqlite3.Error as e:
+                    logger.warning(f"Heartbeat failed: {str(e)}")
+        finally:
+            conn.close()
+
+    def _beat(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            task_ids = list(self.task_ids)
+        self.queue.heartbeat(self.owner, self.batch, task_ids, conn=conn)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+class BatchLease(Heartbeat):
+    """Thread that renews the coordinator's lease on its batch"""
+
+    def __init__(self, queue: LeaseQueue, batch: str, interval: float):
+        super().__init__(queue, node_name(), batch, interval)
+
+    def _beat(self, conn: sqlite3.Connection) -> None:
+        self.queue.renew_batch(self.batch, conn=conn)
+
+
+def run_node(path: str, config: dict, func, initializer, failure_result, processes: int = 1,
+             owner: Optional[str] = None) -> Dict[str, int]:
+    """Work through the queue's batches with a local pool until none has work left.
+
+    Each batch runs with the config its coordinator stored (minus the
+    coordinator's manifest) and this node's process count. Returns the
+    number of tasks completed per batch.
+    """
+    owner = owner or node_name()
+    queue = open_queue(path, config)
+    completed = {}
+    try:
+        while True:
+            opened = queue.open_batch()
+            if opened is None:
+                break
+            batch, batch_config = opened
+            batch_config = {**batch_config, 'max_workers': processes}
+            batch_config.pop('manifest', None)
+            logger.info(f"Node {owner} joining batch {batch} with {processes} workers")
+            completed[batch] = _run_batch(queue, batch, batch_config, func, initializer, failure_result,
+                                          processes, owner)
+    finally:
+        queue.close()
+    return completed
+
+
+def _run_batch(queue: LeaseQueue, batch: str, config: dict, func, initializer, failure_result,
+               processes: int, owner: str) -> int:
+    from pipeline.executor import NO_TASK, SupervisedExecutor
+
+    distributed = config.get('distributed', {})
+    poll_seconds = distributed.get('poll_seconds', 1.0)
+    limits = config.get('resource_limits', {})
+    heartbeat = Heartbeat(queue, owner, batch, distributed.get('heartbeat_seconds', queue.lease_seconds / 4))
+    claimed = []  # Leased here, not yet handed to a worker
+
+    def task_source():
+        next_poll = 0.0
+        while True:
+            if not claimed and time.monotonic() >= next_poll:
+                for task_id, task in queue.claim(batch, owner, limit=processes):
+                    heartbeat.add(task_id)
+                    claimed.append((task_id, task))
+                if not claimed:
+                    if queue.batch_finished(batch):
+                        return
+                    next_poll = time.monotonic() + poll_seconds
+            if claimed:
+                task_id, task = claimed.pop(0)
+                yield ({**task, 'queue_id': task_id}, config)
+            else:
+                yield NO_TASK
+
+    executor = SupervisedExecutor(
+        func,
+        processes=processes,
+        initializer=initializer,
+        initargs=(config,),
+        timeout=limits.get('timeout_per_file'),
+        max_memory_mb=limits.get('max_memory_per_worker'),
+        max_tasks_per_worker=limits.get('max_tasks_per_worker'),
+        failure_result=failure_result
+    )
+    completed = 0
+    try:
+        for result in executor.imap_unordered(task_source()):
+            task_id = result.pop('queue_id')
+            heartbeat.discard(task_id)
+            completed += queue.complete(task_id, owner, batch, result)
+    finally:
+        executor.shutdown()
+        heartbeat.stop()
+        released = queue.release(owner)
+        if released:
+            logger.info(f"Returned {released} unfinished tasks to the queue")
+    return completed
+
+
+def open_queue(path: str, config: dict) -> LeaseQueue:
+    distributed = config.get('distributed', {})
+    return LeaseQueue(
+        path,
+        lease_seconds=distributed.get('lease_seconds', 120),
+        max_attempts=distributed.get('max_attempts', 3)
+    )
+
+
+__all__ = ['LeaseQueue', 'Heartbeat', 'BatchLease', 'open_queue', 'run_node', 'node_name',
+           'PENDING', 'LEASED', 'DONE', 'FAILED', 'CANCELLED']
@@ -4,8 +4,5 @@ from postprocessing.text_cleaner import TextCleaner
 
 __all__ = [
     'structure_table',
-    'process_pymupdf_output',
-    'process_donut_output',
-    'clean_text',
-    TextCleaner
+    'TextCleaner'
 ]
\ No newline at end of file
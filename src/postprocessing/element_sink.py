@@ -0,0 +1,236 @@
+# src/postprocessing/element_sink.py
+"""Partitioned Parquet dataset of extracted layout elements.
+
+Each element (a native text or image block, or the text of an OCR'd page)
+becomes one typed row: doc id, source path, page, element index, type,
+bbox as four float32 columns, text, confidence and route. Rows are
+buffered per partition and appended as row groups once ``row_group_size``
+rows are waiting, so the sink never holds more than one row group per
+partition. The layout is hive-style,
+
+    <root>/run_date=YYYY-MM-DD/doc_type=<native|scanned|mixed>/part-<writer>-<seq>.parquet
+
+which pyarrow.dataset, pandas.read_parquet, DuckDB and Spark read as one
+table. Files are written under a dot-prefixed temporary name (ignored by
+dataset readers) and renamed when closed, once ``max_rows_per_file`` rows
+or ``max_file_seconds`` are reached. A part is only readable once closed,
+so documents come back from committed() when the file holding their rows
+is final; callers record them as done only then. Each sink holds a lock
+file for its lifetime, and temporary parts of writers whose lock is free
+(a killed run) are deleted when a sink opens. pyarrow is optional;
+ElementSink raises ImportError without it.
+"""
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('doc_id', 'source', 'page', 'element', 'type', 'x0', 'y0', 'x1', 'y1', 'text', 'confidence', 'route')
+
+
+def element_schema():
+    import pyarrow as pa
+    label = pa.dictionary(pa.int8(), pa.string())
+    return pa.schema([
+        ('doc_id', pa.string()),
+        ('source', pa.string()),
+        ('page', pa.int32()),
+        ('element', pa.int32()),
+        ('type', label),
+        ('x0', pa.float32()),
+        ('y0', pa.float32()),
+        ('x1', pa.float32()),
+        ('y1', pa.float32()),
+        ('text', pa.string()),
+        ('confidence', pa.float32()),
+        ('route', label)
+    ])
+
+
+def document_type(pages: List[Dict]) -> str:
+    """'native', 'scanned', 'mixed' or 'blank' from a document's page routes"""
+    routes = {page['route'] for page in pages} - {'blank'}
+    if not routes:
+        return 'blank'
+    if routes == {'native'}:
+        return 'native'
+    return 'scanned' if routes == {'ocr'} else 'mixed'
+
+
+class ElementSink:
+    """Appends element rows to a partitioned Parquet dataset"""
+
+    def __init__(self, root: str, row_group_size: int = 50000, max_rows_per_file: int = 1000000,
+                 compression: str = 'zstd', max_file_seconds: float = 300):
+        import pyarrow.parquet  # noqa: F401  (fail early if pyarrow is missing)
+        self.root = root
+        self.row_group_size = row_group_size
+        self.max_rows_per_file = max_rows_per_file
+        self.max_file_seconds = max_file_seconds
+        self.compression = compression
+        self.schema = element_schema()
+        self._buffers: Dict[tuple, Dict[str, list]] = {}
+        self._writers: Dict[tuple, tuple] = {}  # partition -> (writer, tmp_path, path, rows)
+        self._pending: Dict[tuple, list] = {}  # partition -> tokens of documents not yet in a closed file
+        self._started: Dict[tuple, float] = {}  # partition -> when its oldest pending document arrived
+        self._committed: List[Tuple[Any, Optional[str]]] = []
+        self._sequence = 0
+        self.rows_written = 0
+        os.makedirs(root, exist_ok=True)
+        self._writer_id = uuid.uuid4().hex[:12]
+        self._lock = FileLock(self._lock_path(self._writer_id))
+        self._lock.acquire()
+        self._remove_orphans()
+
+    def add(self, doc_id: str, source: str, doc_type: str, elements: List[Dict],
+            run_date: Optional[str] = None, token: Any = None) -> int:
+        """Buffer a document's elements; returns the number of rows added.
+
+        ``token`` comes back from committed() once the rows are in a closed file.
+        """
+        self._close_stale()
+        if not elements:
+            self._committed.append((token, None))
+            return 0
+        partition = (run_date or time.strftime('%Y-%m-%d'), doc_type)
+        self._pending.setdefault(partition, []).append(token)
+        self._started.setdefault(partition, time.monotonic())
+        buffer = self._buffers.setdefault(partition, {column: [] for column in COLUMNS})
+        for index, element in enumerate(elements):
+            x0, y0, x1, y1 = element.get('bbox') or (None, None, None, None)
+            buffer['doc_id'].append(doc_id)
+            buffer['source'].append(source)
+            buffer['page'].append(element['page'])
+            buffer['element'].append(index)
+            buffer['type'].append(element.get('type', 'unknown'))
+            buffer['x0'].append(x0)
+            buffer['y0'].append(y0)
+            buffer['x1'].append(x1)
+            buffer['y1'].append(y1)
+            buffer['text'].append(element.get('text', ''))
+            buffer['confidence'].append(element.get('confidence'))
+            buffer['route'].append(element.get('route', 'unknown'))
+        if len(buffer['doc_id']) >= self.row_group_size:
+            try:
+                self._flush(partition)
+            except Exception as e:
+                logger.error(f"Failed to write elements: {str(e)}")
+                if partition in self._writers:
+                    self._close_file(partition)
+                self._publish(partition, str(e))
+        return len(elements)
+
+    def committed(self) -> List[Tuple[Any, Optional[str]]]:
+        """(token, error) for documents finalised since the last call; error is None on success.
+
+        Also finalises partitions past ``max_file_seconds``, so documents are
+        reported while callers poll even if no new ones arrive.
+        """
+        self._close_stale()
+        done, self._committed = self._committed, []
+        return done
+
+    def flush(self) -> None:
+        """Write every buffered row as a row group, keeping files open"""
+        for partition in list(self._buffers):
+            self._flush(partition)
+
+    def close(self) -> None:
+        """Flush and finalise every open file"""
+        for partition in list(self._pending):
+            self._finish(partition)
+        self._lock.release(remove=True)
+
+    def _finish(self, partition: tuple) -> None:
+        """Write and close everything pending for a partition and publish its documents"""
+        error = None
+        try:
+            self._flush(partition)
+        except Exception as e:
+            logger.error(f"Failed to write elements: {str(e)}")
+            error = str(e)
+        if partition in self._writers:
+            error = self._close_file(partition) or error
+        self._publish(partition, error)
+
+    def _close_stale(self) -> None:
+        """Finalise partitions whose oldest pending document waited max_file_seconds"""
+        now = time.monotonic()
+        for partition, started in list(self._started.items()):
+            if now - started >= self.max_file_seconds:
+                self._finish(partition)
+
+    def _publish(self, partition: tuple, error: Optional[str] = None) -> None:
+        self._started.pop(partition, None)
+        self._committed.extend((token, error) for token in self._pending.pop(partition, []))
+
+    def _lock_path(self, writer_id: str) -> str:
+        return os.path.join(self.root, f".writer-{writer_id}.lock")
+
+    def _remove_orphans(self) -> None:
+        """Delete temporary parts left by writers that are no longer running.
+
+        A part without its footer cannot be read back, and its documents
+        were never reported as committed, so they are simply redone.
+        """
+        alive = {self._writer_id: True}
+        stale_locks = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if not (name.startswith('.part-') and name.endswith('.tmp')):
+                    continue
+                writer_id = name[len('.part-'):].split('-')[0]
+                if writer_id not in alive:
+                    lock = FileLock(self._lock_path(writer_id))
+                    alive[writer_id] = os.path.exists(lock.path) and not lock.acquire()
+                    if lock.held:
+                        stale_locks.append(lock)
+                if not alive[writer_id]:
+                    os.remove(os.path.join(directory, name))
+                    logger.warning(f"Removed unfinished element part {name} of a stopped run")
+        for lock in stale_locks:
+            lock.release(remove=True)
+
+    def _flush(self, partition: tuple) -> None:
+        import pyarrow as pa
+        buffer = self._buffers.pop(partition, None)
+        if not buffer or not buffer['doc_id']:
+            return
+        table = pa.Table.from_pydict(buffer, schema=self.schema)
+        writer, tmp_path, path, rows = self._writers.get(partition) or self._open_file(partition)
+        writer.write_table(table, row_group_size=self.row_group_size)
+        rows += table.num_rows
+        self.rows_written += table.num_rows
+        self._writers[partition] = (writer, tmp_path, path, rows)
+        if rows >= self.max_rows_per_file:
+            self._publish(partition, self._close_file(partition))
+
+    def _open_file(self, partition: tuple) -> tuple:
+        import pyarrow.parquet as pq
+        run_date, doc_type = partition
+        directory = os.path.join(self.root, f"run_date={run_date}", f"doc_type={doc_type}")
+        os.makedirs(directory, exist_ok=True)
+        self._sequence += 1
+        name = f"part-{self._writer_id}-{self._sequence:05d}.parquet"
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        writer = pq.ParquetWriter(tmp_path, self.schema, compression=self.compression)
+        return writer, tmp_path, os.path.join(directory, name), 0
+
+    def _close_file(self, partition: tuple) -> Optional[str]:
+        """Finalise a partition's open file; returns the error if that failed"""
+        writer, tmp_path, path, _ = self._writers.pop(partition)
+        try:
+            writer.close()
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Failed to finalise {path}: {str(e)}")
+            return str(e)
+        return None
+
+
+__all__ = ['ElementSink', 'document_type', 'element_schema', 'COLUMNS']
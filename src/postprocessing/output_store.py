@@ -0,0 +1,274 @@
+# src/postprocessing/output_store.py
+"""Sharded, write-behind store for cleaned document text.
+
+Instead of one small .txt file per PDF, documents are appended as JSON
+lines to rolling compressed shards,
+
+    <root>/shard-<run>-<seq>.jsonl.zst   (or .jsonl.gz / .jsonl)
+    <root>/index.sqlite                  doc_id, source -> shard, offset, length
+
+Every record is compressed as its own zstd frame or gzip member, so a
+shard is still one valid stream for zstdcat/zcat, and a single document
+can be read by seeking to its offset and decompressing ``length`` bytes.
+
+Writes happen on a dedicated thread fed by a bounded queue, so callers
+only block when ``max_pending`` documents are waiting. The shard being
+written has a dot-prefixed .tmp name and is renamed once it reaches
+``max_shard_mb`` or the store is closed, so readers listing the directory
+never see a partial shard. Index rows are committed after their bytes
+are flushed; a .tmp shard left by a killed run is truncated to its last
+indexed record and renamed when the store is next opened. Only one store
+writes to a root at a time: it holds ``<root>/.writer.lock`` while open,
+so recovery never touches the live shard of another run, and a second
+writer on a locked root is refused. If the writer thread fails, its
+error is raised from put() and committed() rather than leaving callers
+blocked on a queue nobody drains. zstandard is optional; without it
+'zstd' falls back to gzip.
+"""
+import gzip
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz', 'none': '.jsonl'}
+
+
+def _codec(compression: str, level: int):
+    """(name, compress, decompress) for a compression setting"""
+    if compression == 'zstd':
+        try:
+            import zstandard
+            compressor = zstandard.ZstdCompressor(level=level)
+            return 'zstd', compressor.compress, lambda data: zstandard.ZstdDecompressor().decompress(data)
+        except ImportError:
+            logger.warning("zstandard is not installed; writing gzip shards instead")
+            compression = 'gzip'
+    if compression == 'gzip':
+        return 'gzip', lambda data: gzip.compress(data, compresslevel=min(max(level, 1), 9)), \
+            lambda data: zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if compression == 'none':
+        return 'none', bytes, bytes
+    raise ValueError(f"Unknown output compression: {compression}")
+
+
+class OutputStore:
+    """Appends documents to compressed JSONL shards from a writer thread"""
+
+    _CLOSE = object()
+
+    def __init__(self, root: str, compression: str = 'zstd', level: int = 3, max_shard_mb: float = 256,
+                 max_pending: int = 64, commit_every: int = 64):
+        self.root = root
+        self.compression, self._compress, self._decompress = _codec(compression, level)
+        self.max_shard_bytes = int(max_shard_mb * 1024 * 1024)
+        self.commit_every = max(1, commit_every)
+        self.index_path = os.path.join(root, 'index.sqlite')
+        self.stats = {'documents': 0, 'shards': 0, 'bytes_in': 0, 'bytes_out': 0, 'errors': 0}
+        self.error: Optional[BaseException] = None  # Set if the writer thread stopped on an error
+        os.makedirs(root, exist_ok=True)
+        self._lock = FileLock(os.path.join(root, '.writer.lock'))
+        if not self._lock.acquire():
+            raise RuntimeError(f"Output store {root} is in use by another run")
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " doc_id TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " shard TEXT NOT NULL,"
+                " offset INTEGER NOT NULL,"
+                " length INTEGER NOT NULL,"
+                " written_at REAL,"
+                " PRIMARY KEY (doc_id, source))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_source ON documents (source)")
+            self._recover(conn)
+        self._run = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._committed: List[Tuple[Any, Optional[str]]] = []
+        self._committed_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._writer, name='output-store', daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def put(self, doc_id: str, source: str, text: str, meta: Optional[Dict] = None, token: Any = None) -> None:
+        """Queue a document; blocks while ``max_pending`` documents are waiting.
+
+        ``token`` comes back from committed() once the document is durable.
+        Raises the writer's error if it has stopped.
+        """
+        self._put((doc_id, source, text, meta or {}, token))
+
+    def committed(self) -> List[Tuple[Any, Optional[str]]]:
+        """(token, error) for documents written since the last call; error is None on success.
+
+        Raises the writer's error if it has stopped.
+        """
+        if self.error is not None:
+            raise self.error
+        with self._committed_lock:
+            done, self._committed = self._committed, []
+        return done
+
+    def close(self) -> None:
+        """Write everything queued, finalise the open shard and stop the writer"""
+        try:
+            if self._thread.is_alive():
+                self._put(self._CLOSE)
+                self._thread.join()
+        except Exception:
+            pass  # The writer failed; committed() reports it
+        finally:
+            self._lock.release()
+
+    def _put(self, item) -> None:
+        while True:
+            if self.error is not None:
+                raise self.error
+            if not self._thread.is_alive():
+                raise RuntimeError("Output store is closed")
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def read(self, doc_id: str, source: Optional[str] = None) -> Optional[Dict]:
+        """The stored record for a doc id (and source, if several files share the content)"""
+        with self._connect() as conn:
+            query = "SELECT shard, offset, length FROM documents WHERE doc_id = ?"
+            params = [doc_id]
+            if source is not None:
+                query += " AND source = ?"
+                params.append(source)
+            row = conn.execute(query + " ORDER BY written_at DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        shard, offset, length = row
+        path = os.path.join(self.root, shard)
+        if not os.path.exists(path):
+            path = self._tmp_path(shard)  # Still being written
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(self._decompress(f.read(length)))
+
+    def _tmp_path(self, shard: str) -> str:
+        return os.path.join(self.root, f".{shard}.tmp")
+
+    def _recover(self, conn: sqlite3.Connection) -> None:
+        """Finalise .tmp shards left by a run that did not close its store.
+
+        Only called with the root's lock held, so no other run is writing them.
+        """
+        for name in os.listdir(self.root):
+            if not (name.startswith('.shard-') and name.endswith('.tmp')):
+                continue
+            shard = name[1:-len('.tmp')]
+            end = conn.execute(
+                "SELECT MAX(offset + length) FROM documents WHERE shard = ?", (shard,)
+            ).fetchone()[0]
+            tmp_path = os.path.join(self.root, name)
+            if not end:
+                os.remove(tmp_path)
+                continue
+            with open(tmp_path, 'r+b') as f:
+                f.truncate(end)
+            os.replace(tmp_path, os.path.join(self.root, shard))
+            logger.warning(f"Recovered unfinished output shard {shard} ({end} bytes)")
+
+    def _writer(self) -> None:
+        conn = self._connect()
+        shard, f, rows, tokens = None, None, [], []
+        sequence = 0
+        try:
+            while True:
+                item = self._queue.get()
+                if item is not self._CLOSE:
+                    doc_id, source, text, meta, token = item
+                    try:
+                        if f is None:
+                            sequence += 1
+                            shard = f"shard-{self._run}-{sequence:05d}{EXTENSIONS[self.compression]}"
+                            f = open(self._tmp_path(shard), 'wb')
+                            self.stats['shards'] += 1
+                        record = json.dumps({'doc_id': doc_id, 'source': source, **meta, 'text': text},
+                                            ensure_ascii=False).encode('utf-8') + b'\n'
+                        frame = self._compress(record)
+                        offset = f.tell()
+                        f.write(frame)
+                        rows.append((doc_id, source, shard, offset, len(frame), time.time()))
+                        tokens.append((token, None))
+                        self.stats['documents'] += 1
+                        self.stats['bytes_in'] += len(record)
+                        self.stats['bytes_out'] += len(frame)
+                    except Exception as e:
+                        logger.error(f"Failed to write output for {source}: {str(e)}")
+                        self.stats['errors'] += 1
+                        tokens.append((token, str(e)))
+                # Group commit once the queue is drained (or every commit_every documents)
+                closing = item is self._CLOSE
+                if closing or self._queue.empty() or len(rows) >= self.commit_every:
+                    rotate = f is not None and (closing or f.tell() >= self.max_shard_bytes)
+                    self._commit(conn, f, rows, tokens)
+                    rows, tokens = [], []
+                    if rotate:
+                        self._rotate(f, shard)
+                        f = None
+                if closing:
+                    return
+        except Exception as e:
+            logger.error(f"Output writer stopped: {str(e)}")
+            self.stats['errors'] += 1
+            self._publish([(token, str(e)) for token, _ in tokens])
+            self.error = e
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, f, rows: list, tokens: list) -> None:
+        if f is not None:
+            f.flush()
+        if rows:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self._publish(tokens)
+
+    def _rotate(self, f, shard: str) -> None:
+        os.fsync(f.fileno())
+        f.close()
+        os.replace(self._tmp_path(shard), os.path.join(self.root, shard))
+
+    def _publish(self, tokens: list) -> None:
+        if tokens:
+            with self._committed_lock:
+                self._committed.extend(tokens)
+
+
+def open_output_store(config: dict) -> Optional[OutputStore]:
+    """OutputStore for ``output.mode: shards``, else None (one .txt file per PDF)"""
+    output = config.get('output', {})
+    if output.get('mode', 'files') != 'shards':
+        return None
+    return OutputStore(
+        output.get('path', 'data/out/shards'),
+        compression=output.get('compression', 'zstd'),
+        level=output.get('level', 3),
+        max_shard_mb=output.get('max_shard_mb', 256),
+        max_pending=output.get('max_pending', 64)
+    )
+
+
+__all__ = ['OutputStore', 'open_output_store', 'EXTENSIONS']
@@ -1,8 +1,8 @@
 # src/postprocessing/structure_data.py
-import pandas as pd
 from typing import List, Dict
 
 def structure_table(elements):
+    import pandas as pd  # Heavy; only table structuring needs it
     structured = []
     for element in elements:
         # Skip non-dict elements
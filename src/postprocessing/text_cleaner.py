@@ -1,7 +1,96 @@
 import re
-from typing import Dict, List, Any
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Characters that make a pattern a regex rather than a literal string
+_REGEX_META = set('.^$*+?{}[]\\|()')
+# Pattern fragments that can match past a line break or depend on text
+# outside the current line; rules containing them disable chunked cleaning
+_CROSS_LINE = ('\\n', '\\s', '\\W', '\\D', '\\Z', '\\A', '\\x', '\\u', '\\U', '\\N', '\\0',
+               '[^', '(?<', '^', '$')
+_DOTALL_FLAG = re.compile(r'\(\?[aiLmux]*s')
+
+
+def _is_literal(pattern: str, replacement: str) -> bool:
+    return not _REGEX_META.intersection(pattern) and '\\' not in replacement
+
+
+def _line_local(pattern: str) -> bool:
+    """True if matches of ``pattern`` can never extend past a newline"""
+    # A trailing \s or \n may consume the newline itself but nothing after it
+    body = pattern
+    if pattern.endswith(('\\s', '\\n')) and not pattern.endswith('\\\\', 0, -1):
+        body = pattern[:-2]
+    if _is_literal(pattern, ''):
+        return '\n' not in pattern[:-1]
+    return ('\n' not in body and not _DOTALL_FLAG.search(body)
+            and not any(token in body for token in _CROSS_LINE))
+
+
+def _required_literal(pattern: re.Pattern) -> Optional[str]:
+    """Longest run of literal characters every match must contain, if any.
+
+    A regex pass is skipped outright when this string is absent from the
+    text, which saves scanning documents that cannot match.
+    """
+    if pattern.flags & re.IGNORECASE:
+        return None
+    try:
+        tokens = list(sre_parse.parse(pattern.pattern, pattern.flags))
+    except Exception:
+        return None
+    best, run = '', ''
+    for op, value in tokens:
+        if op == sre_parse.LITERAL:
+            run += chr(value)
+            best = max(best, run, key=len)
+        else:
+            run = ''
+    return best or None
+
+
+@lru_cache(maxsize=32)
+def _compile_rules(rules: Tuple[Tuple[str, str], ...]) -> Tuple[List[Tuple], bool]:
+    """Compile (pattern, replacement) rules into ordered passes, once per process.
+
+    Consecutive literal rules become a single ``literal`` pass applied with
+    str.replace; regex rules are compiled once along with a literal that
+    must be present for them to match. Returns the passes and whether
+    every rule is line-local (safe for chunked cleaning).
+    """
+    passes = []
+    literals = []
+
+    def flush():
+        if literals:
+            passes.append(('literal', list(literals), None))
+            literals.clear()
+
+    for pattern, replacement in rules:
+        if _is_literal(pattern, replacement):
+            literals.append((pattern, replacement))
+        else:
+            flush()
+            compiled = re.compile(pattern)
+            passes.append(('regex', (compiled, _required_literal(compiled)), replacement))
+    flush()
+    return passes, all(_line_local(pattern) for pattern, _ in rules)
+
 
 class TextCleaner:
+    """Applies configured replacements and common OCR fixes.
+
+    Rules run in order (``replace_patterns`` then ``common_errors``) with
+    the same results as calling re.sub for each, but are compiled once per
+    process: literal rules use str.replace and regex rules reuse their
+    compiled pattern.
+    """
+
     def __init__(self, config: dict):
         self.replace_patterns = config.get('replace_patterns', [])
         self.common_errors = {
@@ -9,22 +98,85 @@ class TextCleaner:
             r'Neugi': 'Ngugi',
             r'[oO0¢]\s': '• '
         }
+        self.chunk_size = config.get('chunk_size', 1 << 20)
+        rules = tuple((pattern, replacement) for pattern, replacement in self.replace_patterns)
+        rules += tuple(self.common_errors.items())
+        self._passes, self._line_local = _compile_rules(rules)
 
     def clean(self, text: str) -> str:
         """Multi-stage text cleaning"""
         # Standardize line endings
         text = text.replace('\r\n', '\n')
         
-        # Apply configured replacements
-        for pattern, replacement in self.replace_patterns:
-            text = re.sub(pattern, replacement, text)
-            
-        # Fix common OCR errors
-        for error, fix in self.common_errors.items():
-            text = re.sub(error, fix, text)
+        # Apply configured replacements, then fix common OCR errors
+        text = self._apply(text)
             
         return text.strip()
 
+    def iter_clean(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Clean text arriving in pieces, yielding cleaned pieces.
+
+        Input is regrouped into line-aligned chunks of about ``chunk_size``
+        characters, so memory stays bounded by the chunk rather than the
+        document. Joining the output gives exactly ``clean()`` of the joined
+        input. If a rule can match across a line break, the input is
+        buffered and cleaned in one go instead.
+        """
+        if not self._line_local:
+            yield self.clean(''.join(chunks))
+            return
+
+        buffer = []
+        buffered = 0
+        started = False   # Leading whitespace has been stripped
+        held = ''         # Trailing whitespace kept back in case it is the end
+
+        def emit(segment: str):
+            nonlocal started, held
+            segment = self._apply(segment.replace('\r\n', '\n'))
+            if not started:
+                segment = segment.lstrip()
+                if not segment:
+                    return None
+                started = True
+            body = segment.rstrip()
+            if not body:
+                held += segment
+                return None
+            out = held + body
+            held = segment[len(body):]
+            return out
+
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered < self.chunk_size:
+                continue
+            text = ''.join(buffer)
+            cut = text.rfind('\n') + 1
+            if cut == 0:
+                buffer, buffered = [text], len(text)
+                continue
+            buffer, buffered = [text[cut:]], len(text) - cut
+            out = emit(text[:cut])
+            if out:
+                yield out
+
+        out = emit(''.join(buffer))
+        if out:
+            yield out
+
+    def _apply(self, text: str) -> str:
+        for kind, rule, extra in self._passes:
+            if kind == 'regex':
+                pattern, required = rule
+                if required is None or required in text:
+                    text = pattern.sub(extra, text)
+                continue
+            for pattern, replacement in rule:
+                text = text.replace(pattern, replacement)
+        return text
+
     def clean_text(text: str) -> str:
         """Clean while preserving meaningful newlines"""
         # Preserve multiple newlines between paragraphs
@@ -0,0 +1,67 @@
+# src/preprocessing/blank_detector.py
+"""Blank and near-blank page detection ahead of OCR.
+
+Separator sheets, blank duplex backs and "intentionally left blank" pages
+would otherwise go through denoising, Tesseract and, because their text
+is short, a full EasyOCR pass. classify_blank looks at a low-resolution
+render: ink is anything clearly darker than the paper level, and the page
+is judged by the ink ratio and the number of ink components after specks
+and scanner-edge shadows (components touching the border) are dropped.
+Pages whose paper level is dark (dark scans, inverted pages) or that are
+mostly dark are never called blank, since their ink cannot be measured
+against the paper.
+"""
+import logging
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def ink_stats(image: np.ndarray, dpi: float, ink_delta: int = 60) -> Dict[str, float]:
+    """Paper level, dark share, ink ratio and component count of a grayscale page rendered at ``dpi``"""
+    height, width = image.shape[:2]
+    paper = float(np.percentile(image, 90))
+    dark_ratio = round(float(np.count_nonzero(image < 128)) / (height * width), 5)
+    ink = (image < paper - ink_delta).astype(np.uint8)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    if count <= 1:
+        return {'paper': paper, 'dark_ratio': dark_ratio, 'ink_ratio': 0.0, 'components': 0}
+
+    stats = stats[1:]
+    left, top = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    right = left + stats[:, cv2.CC_STAT_WIDTH]
+    bottom = top + stats[:, cv2.CC_STAT_HEIGHT]
+    areas = stats[:, cv2.CC_STAT_AREA]
+    # Specks: smaller than about 1pt x 1pt at this resolution
+    min_area = max(2.0, (dpi / 72.0) ** 2)
+    on_border = (left == 0) | (top == 0) | (right >= width) | (bottom >= height)
+    keep = (areas >= min_area) & ~on_border
+    return {
+        'paper': paper,
+        'dark_ratio': dark_ratio,
+        'ink_ratio': round(float(areas[keep].sum()) / (height * width), 5),
+        'components': int(np.count_nonzero(keep))
+    }
+
+
+def classify_blank(image: np.ndarray, dpi: float, profile_config: dict) -> Tuple[Optional[str], Dict[str, float]]:
+    """Classify a page as 'blank', 'near_blank' or None (has content).
+
+    Returns the class and the ink stats it was based on.
+    """
+    stats = ink_stats(image, dpi, profile_config.get('blank_ink_delta', 60))
+    if (stats['paper'] < profile_config.get('blank_min_paper', 160)
+            or stats['dark_ratio'] > profile_config.get('blank_max_dark_ratio', 0.3)):
+        return None, stats  # Dark or inverted page: OCR it rather than guess
+    if stats['components'] <= profile_config.get('blank_max_components', 2):
+        return 'blank', stats
+    if (stats['components'] <= profile_config.get('near_blank_max_components', 40)
+            and stats['ink_ratio'] <= profile_config.get('near_blank_max_ink', 0.002)):
+        return 'near_blank', stats
+    return None, stats
+
+
+__all__ = ['classify_blank', 'ink_stats']
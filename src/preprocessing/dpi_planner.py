@@ -0,0 +1,97 @@
+# src/preprocessing/dpi_planner.py
+"""Per-page render DPI selection for OCR.
+
+A fixed profile DPI over-renders large-font forms and under-resolves fine
+print. plan_page_dpi renders a cheap low-DPI probe of the page, estimates
+the typical glyph height from its connected components, and picks the
+lowest DPI that puts that height at ``target_x_height_px`` pixels, clamped
+to the profile's ``min_dpi``/``max_dpi``. Pages with no measurable text
+fall back to the embedded image resolution, then to the profile DPI.
+"""
+import logging
+from typing import Dict, Optional
+
+import cv2
+import fitz
+import numpy as np
+
+from preprocessing.pdf_to_image import render_page_gray
+
+logger = logging.getLogger(__name__)
+
+
+def probe_page(page, probe_dpi: int = 100) -> np.ndarray:
+    """Low-resolution grayscale render used for cheap page measurements"""
+    return render_page_gray(page, probe_dpi)
+
+
+def estimate_glyph_height(probe: np.ndarray, probe_dpi: int, min_glyphs: int = 20) -> Optional[float]:
+    """Median glyph height in points, or None if too few glyph-like components"""
+    _, ink = cv2.threshold(probe, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    if count <= 1:
+        return None
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    # Glyphs: taller than specks, smaller than half an inch (rules, photos, borders)
+    limit = probe_dpi / 2
+    glyphs = (heights >= 2) & (heights <= limit) & (widths <= limit) & (areas >= 3)
+    if np.count_nonzero(glyphs) < min_glyphs:
+        return None
+    return float(np.median(heights[glyphs])) * 72.0 / probe_dpi
+
+
+def embedded_image_dpi(page) -> Optional[float]:
+    """Resolution of the largest image on the page, in pixels per inch"""
+    best = None
+    best_area = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info['bbox'])
+        if bbox.is_empty or bbox.width <= 0:
+            continue
+        if abs(bbox) > best_area:
+            best_area = abs(bbox)
+            best = info['width'] / (bbox.width / 72.0)
+    return best
+
+
+def plan_page_dpi(page, profile_config: dict, probe: Optional[np.ndarray] = None) -> Dict:
+    """Choose the render DPI for one page.
+
+    Returns {'dpi', 'dpi_reason', 'glyph_height_pt'}; ``probe`` may be passed
+    in when the caller already rendered one at ``probe_dpi``.
+    """
+    default_dpi = profile_config.get('dpi', 300)
+    min_dpi = profile_config.get('min_dpi', 150)
+    max_dpi = profile_config.get('max_dpi', 400)
+    probe_dpi = profile_config.get('probe_dpi', 100)
+    target = profile_config.get('target_x_height_px', 20)
+
+    try:
+        if probe is None:
+            probe = probe_page(page, probe_dpi)
+        glyph_height = estimate_glyph_height(probe, probe_dpi)
+    except Exception as e:
+        logger.warning(f"DPI probe failed on page {page.number}: {str(e)}")
+        glyph_height = None
+
+    if glyph_height:
+        dpi, reason = target * 72.0 / glyph_height, 'glyph_height'
+    else:
+        source_dpi = embedded_image_dpi(page)
+        if source_dpi:
+            dpi, reason = source_dpi, 'image_resolution'
+        else:
+            dpi, reason = default_dpi, 'profile'
+
+    # Round up to a multiple of 25 so similar pages share render sizes
+    dpi = int(min(max(25 * np.ceil(dpi / 25), min_dpi), max_dpi))
+    return {
+        'dpi': dpi,
+        'dpi_reason': reason,
+        'glyph_height_pt': round(glyph_height, 2) if glyph_height else None
+    }
+
+
+__all__ = ['plan_page_dpi', 'probe_page', 'estimate_glyph_height', 'embedded_image_dpi']
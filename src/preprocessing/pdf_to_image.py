@@ -2,10 +2,10 @@ import os
 from pathlib import Path
 import tempfile
 import shutil
-from PIL import Image
-from pdf2image import convert_from_path
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
 import fitz  # PyMuPDF
-from utils.config_loader import config
+from utils.config_loader import get_config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,7 +16,7 @@ def get_poppler_path():
         r"C:\Program Files\poppler-25.04.0\Library\bin",  # Chocolatey default
         r"C:\Program Files\poppler\Library\bin",          # Alternate install path
         os.environ.get("POPPLER_PATH", ""),               # Environment variable
-        config["paths"]["poppler_path"]                   # Config file
+        get_config()["paths"]["poppler_path"]             # Config file
     ]
     
     for path in paths:
@@ -31,8 +31,61 @@ def get_poppler_path():
         "3. Then add to PATH or set POPPLER_PATH environment variable"
     )
 
-def convert_pdf_to_images(pdf_path, dpi=200):
-    """Convert PDF file to list of images with enhanced error handling."""
+class PixmapArray(np.ndarray):
+    """numpy view over a PyMuPDF pixmap's samples.
+
+    ``pix.samples_mv`` does not keep the pixmap alive, so the array holds a
+    reference to it; slices and other views inherit that reference, while
+    results that own their data (e.g. OpenCV outputs) do not.
+    """
+
+    def __new__(cls, pix):
+        samples = np.frombuffer(pix.samples_mv, dtype=np.uint8)
+        rows = samples.reshape(pix.height, pix.stride)[:, :pix.width * pix.n]
+        shape = (pix.height, pix.width) if pix.n == 1 else (pix.height, pix.width, pix.n)
+        obj = rows.reshape(shape).view(cls)
+        obj.pixmap = pix
+        return obj
+
+    def __array_finalize__(self, obj):
+        self.pixmap = getattr(obj, 'pixmap', None)
+
+    def __array_wrap__(self, out_arr, context=None, return_scalar=False):
+        # ufunc results own their memory; hand them back as plain arrays
+        out_arr = out_arr.view(np.ndarray)
+        return out_arr[()] if return_scalar else out_arr
+
+
+def render_page_gray(page, dpi: int) -> np.ndarray:
+    """Render a PyMuPDF page straight to a single-channel array without copying"""
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return PixmapArray(pix)
+
+
+def render_page_bgr(page, dpi: int) -> np.ndarray:
+    """Render a PyMuPDF page to a BGR array, the channel order OpenCV-based models expect"""
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    return np.ascontiguousarray(PixmapArray(pix)[:, :, ::-1]).view(np.ndarray)
+
+
+def iter_pdf_pages_gray(pdf_path, dpi=300, pages: Optional[List[int]] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (0-based page number, grayscale array) one page at a time.
+
+    ``dpi`` is either a number or a callable taking the fitz page and
+    returning the DPI to render it at.
+    """
+    with fitz.open(pdf_path) as doc:
+        for num in (range(doc.page_count) if pages is None else pages):
+            page = doc[num]
+            yield num, render_page_gray(page, dpi(page) if callable(dpi) else dpi)
+
+
+def convert_pdf_to_images(pdf_path, dpi=200, grayscale=False):
+    """Convert PDF file to list of images with enhanced error handling.
+
+    With ``grayscale=True`` pages come back as single-channel numpy arrays
+    that view the pixmap memory directly instead of RGB PIL images.
+    """
     try:
         # Validate input file
         pdf_path = Path(pdf_path)
@@ -50,8 +103,12 @@ def convert_pdf_to_images(pdf_path, dpi=200):
                 
             images = []
             for page in doc:
+                if grayscale:
+                    images.append(render_page_gray(page, dpi))
+                    continue
+                from PIL import Image
                 pix = page.get_pixmap(matrix=fitz.Matrix(dpi/72, dpi/72))
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples_mv)
                 images.append(img)
                 
             if images:
@@ -63,14 +120,17 @@ def convert_pdf_to_images(pdf_path, dpi=200):
 
         # Fallback to pdf2image
         logger.debug("Attempting conversion with pdf2image...")
+        from pdf2image import convert_from_path
         poppler_path = get_poppler_path()
         images = convert_from_path(
             str(pdf_path),
             dpi=dpi,
             poppler_path=poppler_path,
             thread_count=2,
-            grayscale=False  # Changed to color for better results
+            grayscale=grayscale  # Color by default for better results
         )
+        if grayscale:
+            images = [np.asarray(img) for img in images]
         
         if not images:
             raise ValueError(f"No images extracted from PDF: {pdf_path}")
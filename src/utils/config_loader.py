@@ -1,5 +1,4 @@
 # src/utils/config_loader.py
-import yaml
 import os
 from pathlib import Path
 import logging
@@ -29,6 +28,8 @@ def load_config(config_name="default"):
     config_path = config_dir / f"{config_name}.yaml"
     
     try:
+        import yaml
+        
         # Create config directory if missing
         config_dir.mkdir(exist_ok=True)
         
@@ -56,5 +57,18 @@ def load_config(config_name="default"):
         logger.info("Using default configuration")
         return DEFAULT_CONFIG
 
-# Initialize config at module level
-config = load_config()
\ No newline at end of file
+_config = None
+
+def get_config():
+    """Default configuration, loaded on first use"""
+    global _config
+    if _config is None:
+        _config = load_config()
+    return _config
+
+def __getattr__(name):
+    # `from utils.config_loader import config` keeps working without reading
+    # (or creating) the YAML file whenever the module is imported
+    if name == 'config':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
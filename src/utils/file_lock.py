@@ -0,0 +1,60 @@
+# src/utils/file_lock.py
+"""Non-blocking exclusive locks on lock files.
+
+Writers that leave temporary files behind (Parquet parts, output shards)
+hold a FileLock for as long as they run. The operating system drops the
+lock when its holder exits or is killed, so a lock that can be taken
+means the files it guards belong to a dead run and may be cleaned up.
+Uses flock on POSIX and msvcrt.locking on Windows.
+"""
+import os
+from typing import Optional
+
+
+class FileLock:
+    """Exclusive lock on ``path``, created if missing"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        """Take the lock without waiting; False if another process holds it"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self, remove: bool = False) -> None:
+        """Drop the lock, optionally deleting the lock file"""
+        if self._fd is None:
+            return
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+
+__all__ = ['FileLock']
@@ -0,0 +1,202 @@
+# src/utils/metrics.py
+"""Lightweight per-document instrumentation for batch runs.
+
+Workers fill a StageMetrics for each task (stage timers, page counts,
+bytes read and written, extraction route) and return it as a plain dict
+in the result, so it pickles across the process boundary. The parent
+feeds every finished document into a MetricsAggregator, which produces
+the p50/p95/max table for the batch report and exports JSON or a
+Prometheus textfile for the node exporter's textfile collector.
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+class StageMetrics:
+    """Stage timers and counters for one task; safe to use from threads"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.route: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed_iter(self, stage: str, iterable: Iterable) -> Iterator:
+        """Yield from ``iterable``, charging the time spent producing items to ``stage``"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - start)
+                return
+            self.add_time(stage, time.perf_counter() - start)
+            yield item
+
+    def add_pages(self, pages: List[Dict]) -> None:
+        """Count pages per route and derive the document route"""
+        routes = {}
+        for page in pages:
+            routes[page['route']] = routes.get(page['route'], 0) + 1
+        self.count('pages', len(pages))
+        for route, n in routes.items():
+            self.count(f'pages_{route}', n)
+        if self.route is None and routes:
+            content = [route for route in routes if route != 'blank']
+            self.route = content[0] if len(content) == 1 else ('mixed' if content else 'blank')
+
+    def as_dict(self) -> Dict:
+        return {'stages': dict(self.stages), 'counters': dict(self.counters), 'route': self.route}
+
+
+def merge_metrics(parts: Iterable[Optional[Dict]]) -> Dict:
+    """Sum the metrics dicts of a document's page-range parts"""
+    merged = {'stages': {}, 'counters': {}, 'route': None}
+    routes = set()
+    for part in parts:
+        if not part:
+            continue
+        for key in ('stages', 'counters'):
+            for name, value in part.get(key, {}).items():
+                merged[key][name] = merged[key].get(name, 0) + value
+        if part.get('route'):
+            routes.add(part['route'])
+    content = routes - {'blank'}
+    if routes:
+        merged['route'] = content.pop() if len(content) == 1 else ('mixed' if content else 'blank')
+    return merged
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+class MetricsAggregator:
+    """Collects per-document metrics and summarises them for the batch"""
+
+    def __init__(self):
+        self.stage_values: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.routes: Dict[str, int] = {}
+        self.statuses: Dict[str, int] = {}
+
+    def add(self, result: Dict) -> None:
+        status = result.get('status', 'unknown')
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        metrics = result.get('metrics')
+        if not metrics:
+            return
+        for stage, seconds in metrics.get('stages', {}).items():
+            self.stage_values.setdefault(stage, []).append(seconds)
+        for name, value in metrics.get('counters', {}).items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        if metrics.get('route'):
+            self.routes[metrics['route']] = self.routes.get(metrics['route'], 0) + 1
+
+    def summary(self) -> Dict:
+        return {
+            'stages': {
+                stage: {
+                    'count': len(values),
+                    'total': sum(values),
+                    'p50': percentile(values, 50),
+                    'p95': percentile(values, 95),
+                    'max': max(values)
+                }
+                for stage, values in sorted(self.stage_values.items())
+            },
+            'counters': dict(sorted(self.counters.items())),
+            'routes': dict(sorted(self.routes.items())),
+            'statuses': dict(sorted(self.statuses.items()))
+        }
+
+    def format_table(self) -> str:
+        """Per-document stage times as a fixed-width p50/p95/max table"""
+        summary = self.summary()
+        lines = [f"{'Stage':<14}{'docs':>6}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'max s':>9}"]
+        for stage, row in summary['stages'].items():
+            lines.append(
+                f"{stage:<14}{row['count']:>6}{row['total']:>10.2f}"
+                f"{row['p50']:>9.3f}{row['p95']:>9.3f}{row['max']:>9.3f}"
+            )
+        counters = ', '.join(f"{name}={value}" for name, value in summary['counters'].items())
+        routes = ', '.join(f"{route}={count}" for route, count in summary['routes'].items())
+        lines.append(f"Counters: {counters or 'none'}")
+        lines.append(f"Routes: {routes or 'none'}")
+        return "\n".join(lines)
+
+    def to_json(self, path: str, extra: Optional[Dict] = None) -> None:
+        _atomic_write(path, json.dumps({**(extra or {}), **self.summary()}, indent=2))
+
+    def to_prometheus(self, path: str, extra: Optional[Dict[str, float]] = None, prefix: str = 'pdf_mining') -> None:
+        """Write a Prometheus textfile (written atomically, as the collector requires)"""
+        _atomic_write(path, self.format_prometheus(extra, prefix))
+
+    def format_prometheus(self, extra: Optional[Dict[str, float]] = None, prefix: str = 'pdf_mining') -> str:
+        """Prometheus text exposition of the summary plus ``extra`` gauges"""
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Per-document time spent in each pipeline stage",
+            f"# TYPE {prefix}_stage_seconds summary"
+        ]
+        for stage, row in summary['stages'].items():
+            for quantile in ('0.5', '0.95'):
+                value = row['p50'] if quantile == '0.5' else row['p95']
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {row["total"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {row["count"]}')
+        lines += [f"# HELP {prefix}_stage_seconds_max Slowest document per stage",
+                  f"# TYPE {prefix}_stage_seconds_max gauge"]
+        lines += [f'{prefix}_stage_seconds_max{{stage="{stage}"}} {row["max"]:.6f}'
+                  for stage, row in summary['stages'].items()]
+        lines += [f"# HELP {prefix}_events_total Pages, bytes and other per-batch counters",
+                  f"# TYPE {prefix}_events_total counter"]
+        lines += [f'{prefix}_events_total{{name="{name}"}} {value}' for name, value in summary['counters'].items()]
+        lines += [f"# HELP {prefix}_documents_total Documents by final status",
+                  f"# TYPE {prefix}_documents_total counter"]
+        lines += [f'{prefix}_documents_total{{status="{status}"}} {count}' for status, count in summary['statuses'].items()]
+        lines += [f"# HELP {prefix}_document_routes_total Extracted documents by route",
+                  f"# TYPE {prefix}_document_routes_total counter"]
+        lines += [f'{prefix}_document_routes_total{{route="{route}"}} {count}' for route, count in summary['routes'].items()]
+        for name, value in (extra or {}).items():
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _atomic_write(path: str, content: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+__all__ = ['StageMetrics', 'MetricsAggregator', 'merge_metrics', 'percentile']
@@ -0,0 +1,143 @@
+# src/utils/startup.py
+"""Import-time breakdown of the CLI and its workers.
+
+Every spawned worker pays for the modules it imports before it extracts
+a single page, so heavy backends (torch, EasyOCR, layoutparser, pandas)
+are imported on first use. This module measures that: each phase runs in
+a fresh interpreter under ``python -X importtime`` and reports its wall
+time, the import time per top-level package and which heavy modules got
+loaded. Phases:
+
+- ``cli``: ``import cli``
+- ``worker``: ``cli.init_worker(config)``, including the warm engines
+- ``native``: a worker without warm engines extracting and cleaning a
+  generated one-page native-text PDF; it must not import HEAVY_MODULES
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PHASES = ('cli', 'worker', 'native')
+# Backends the native-text path must never load
+HEAVY_MODULES = ('torch', 'easyocr', 'layoutparser')
+# Reported when loaded, but allowed anywhere
+TRACKED_MODULES = HEAVY_MODULES + ('pandas', 'pyarrow', 'pytesseract', 'tesserocr', 'pdf2image', 'PIL', 'yaml')
+
+SRC_DIR = Path(__file__).parent.parent
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Seconds of ``-X importtime`` self time per top-level package"""
+    packages: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        package = fields[2].strip().split('.')[0]
+        packages[package] = packages.get(package, 0.0) + int(fields[0]) / 1e6
+    return packages
+
+
+def measure_phase(phase: str, config: dict) -> Dict:
+    """Run one phase in a fresh interpreter and return its measurements"""
+    code = f"import sys; sys.path.insert(0, {str(SRC_DIR)!r}); from utils.startup import _run_phase; _run_phase()"
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        input=json.dumps({'phase': phase, 'config': config}, default=str),
+        capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['no output']
+        return {'phase': phase, 'status': 'failed', 'error': tail[0]}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    packages = parse_importtime(proc.stderr)
+    return {
+        'phase': phase,
+        'status': 'ok',
+        'process_seconds': wall,
+        'seconds': result['seconds'],
+        'import_seconds': sum(packages.values()),
+        'packages': dict(sorted(packages.items(), key=lambda item: -item[1])),
+        'loaded': result['loaded']
+    }
+
+
+def startup_report(config: dict, budget_ms: Optional[Dict[str, float]] = None) -> Dict:
+    """Measure every phase and check the native path and the budget"""
+    phases = [measure_phase(phase, config) for phase in PHASES]
+    problems: List[str] = []
+    for phase in phases:
+        if phase['status'] != 'ok':
+            problems.append(f"{phase['phase']}: {phase['error']}")
+            continue
+        limit = (budget_ms or {}).get(phase['phase'])
+        if limit and phase['seconds'] * 1000 > limit:
+            problems.append(f"{phase['phase']}: {phase['seconds'] * 1000:.0f} ms over its {limit:.0f} ms budget")
+        if phase['phase'] == 'native':
+            heavy = [module for module in phase['loaded'] if module in HEAVY_MODULES]
+            if heavy:
+                problems.append(f"native: text-only extraction imported {', '.join(heavy)}")
+    return {'phases': phases, 'problems': problems}
+
+
+def format_report(report: Dict, top: int = 12) -> str:
+    lines = []
+    for phase in report['phases']:
+        if phase['status'] != 'ok':
+            lines.append(f"{phase['phase']}: failed ({phase['error']})")
+            continue
+        lines.append(
+            f"{phase['phase']}: {phase['seconds'] * 1000:.0f} ms in-process "
+            f"({phase['import_seconds'] * 1000:.0f} ms importing), "
+            f"{phase['process_seconds'] * 1000:.0f} ms with interpreter start"
+        )
+        for package, seconds in list(phase['packages'].items())[:top]:
+            lines.append(f"    {package:24s} {seconds * 1000:8.1f} ms")
+        lines.append(f"    loaded: {', '.join(phase['loaded']) or 'none of ' + ', '.join(TRACKED_MODULES)}")
+    for problem in report['problems']:
+        lines.append(f"FAIL {problem}")
+    return "\n".join(lines)
+
+
+def _native_sample(path: str) -> None:
+    import fitz
+    with fitz.open() as doc:
+        page = doc.new_page()
+        text = "\n".join(f"Line {i}: native text layer for the startup check." for i in range(40))
+        page.insert_text((50, 60), text, fontsize=9)
+        doc.save(path)
+
+
+def _run_phase() -> None:
+    """Child side of measure_phase: request on stdin, result on stdout"""
+    import tempfile
+
+    request = json.loads(sys.stdin.read())
+    phase, config = request['phase'], request['config']
+    start = time.perf_counter()
+    import cli
+    if phase == 'worker':
+        cli.init_worker(config)
+    elif phase == 'native':
+        cli.init_worker({**config, 'warm_engines': []})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'native.pdf')
+            _native_sample(path)
+            result = cli._worker_state['extractor'].extract(path)
+            if result is None or result['pages'][0]['route'] != 'native':
+                raise RuntimeError("Native sample was not extracted as native text")
+            cli._worker_state['cleaner'].clean(result['text'])
+    seconds = time.perf_counter() - start
+    loaded = [module for module in TRACKED_MODULES if module in sys.modules]
+    print(json.dumps({'seconds': seconds, 'loaded': loaded}))
+
+
+__all__ = ['startup_report', 'format_report', 'measure_phase', 'parse_importtime', 'HEAVY_MODULES', 'PHASES']
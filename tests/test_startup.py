@@ -0,0 +1,27 @@
+# tests/test_startup.py
+"""The native-text path must not import the OCR and layout backends."""
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from utils.startup import HEAVY_MODULES, measure_phase
+
+
+def _config() -> dict:
+    with open(ROOT / 'configs' / 'batch_config.yaml', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    config.pop('manifest', None)
+    config['cache'] = {'enabled': False}
+    return config
+
+
+def test_native_extraction_skips_heavy_backends(monkeypatch):
+    # cli.py logs to data/out/logs relative to the working directory
+    monkeypatch.chdir(ROOT)
+    phase = measure_phase('native', _config())
+    assert phase['status'] == 'ok', phase.get('error')
+    assert not [module for module in phase['loaded'] if module in HEAVY_MODULES]